@@ -1,6 +1,9 @@
 #!/usr/bin/env bash
 # /opt/gateway/scripts/healthcheck.sh
 # Liveness check for the Gateway (minimal). No secrets.
+# /health answers from process memory. Set GATEWAY_HEALTH_PATH=/ready for the
+# readiness view (JWKS age, policy version, upstream circuits); /ready is also
+# served from memory, its dependency probes run on the gateway's own schedule.
 
 set -euo pipefail
 
@@ -1,91 +1,349 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from functools import lru_cache
-import os
+from collections.abc import Iterator
+import socket
+import time
 from typing import Any
 
-from flask import Flask, Response, jsonify, request
-import jwt
+from flask import Flask, Response, g, jsonify, request
 import requests
+from werkzeug.serving import make_server
 
+from gateway.audit import api_call_event
+from gateway.auth import extract_bearer_token, validate_bearer_token
+from gateway.authz import BATCH_MAX_BODY_BYTES
+from gateway.breaker import CircuitOpenError
+from gateway.claims_cache import ClaimsCache
+from gateway.compression import compress_chunks
+from gateway.config import GatewayConfig, load_config
+from gateway.ingest import IngestError
+from gateway.jwks import JwksCache
+from gateway.metrics import observe_request, prepare_directory, reject, render, worker_exited
+from gateway.pipeline import Admission, Incoming, Pipeline, Refusal, Reply, upstream_refusal
+from gateway.proxy import (
+    CORRELATION_ID_HEADER,
+    PROXY_FAMILIES,
+    PROXY_METHODS,
+    BodyTooLarge,
+    LimitedBody,
+    SizedLimitedBody,
+    correlation_id,
+    forward_response_headers,
+    is_chunked,
+    retry_after_value,
+)
+from gateway.readiness import probe_targets
+from gateway.response_cache import body_chunks, buffer_body
+from gateway.upstream import UpstreamPool
+from gateway.workers import NotifyRelay, listen, serve_workers, watch_spawned_workers
 
-@dataclass(frozen=True)
-class GatewayConfig:
-    upstream_url: str
-    issuer: str
-    audience: str | None
+__all__ = [
+    "ClaimsCache",
+    "GatewayConfig",
+    "JwksCache",
+    "app",
+    "load_config",
+    "main",
+    "validate_bearer_token",
+]
 
 
-def load_config() -> GatewayConfig:
-    return GatewayConfig(
-        upstream_url=os.getenv("UPSTREAM_URL", "http://reference-app:5000"),
-        issuer=os.getenv("KEYCLOAK_ISSUER", "http://keycloak:8080/realms/master"),
-        audience=os.getenv("KEYCLOAK_AUDIENCE") or None,
+app = Flask(__name__)
+config = load_config()
+pipeline = Pipeline(config)
+jwks_cache = pipeline.jwks_cache
+policy_watcher = pipeline.policy_watcher
+audit = pipeline.audit
+readiness = pipeline.readiness
+upstream_pool = UpstreamPool(config)
+for _name, _url in probe_targets(config).items():
+    readiness.add_probe(
+        _name,
+        lambda url=_url: upstream_pool.health(f"{url}/health").status,
+        lambda url=_url: upstream_pool.circuit_state(url),
     )
 
 
-@lru_cache(maxsize=1)
-def discover_openid(issuer: str) -> dict[str, Any]:
-    response = requests.get(f"{issuer}/.well-known/openid-configuration", timeout=5)
-    response.raise_for_status()
-    return response.json()
+@app.before_request
+def _start_timer() -> None:
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response: Response) -> Response:
+    elapsed = time.perf_counter() - g.started
+    observe_request(request.endpoint, request.method, response.status_code, elapsed)
+    call = g.get("audit_call")
+    if call is not None:
+        subject, family, request_id = call
+        status, duration_ms = response.status_code, elapsed * 1000
+        event = api_call_event(
+            subject, request.remote_addr, request.method, request.path, family, status, duration_ms, request_id
+        )
+        audit.emit(event)
+    return response
+
+
+def _error(error: str, status: int, request_id: str | None = None, **extra: Any) -> Response:
+    reject(error)
+    response = jsonify({"error": error, **extra})
+    response.status_code = status
+    if request_id is not None:
+        response.headers[CORRELATION_ID_HEADER] = request_id
+    return response
 
 
-@lru_cache(maxsize=1)
-def jwks_client(issuer: str) -> jwt.PyJWKClient:
-    metadata = discover_openid(issuer)
-    return jwt.PyJWKClient(metadata["jwks_uri"])
+def _retry_later(error: str, status: int, seconds: float, request_id: str | None = None) -> Response:
+    response = _error(error, status, request_id)
+    response.headers["Retry-After"] = retry_after_value(seconds)
+    return response
 
 
-def validate_bearer_token(token: str, cfg: GatewayConfig) -> dict[str, Any]:
-    signing_key = jwks_client(cfg.issuer).get_signing_key_from_jwt(token)
-    options = {"verify_aud": cfg.audience is not None}
-    claims = jwt.decode(
-        token,
-        signing_key.key,
-        algorithms=["RS256"],
-        issuer=cfg.issuer,
-        audience=cfg.audience,
-        options=options,
+def _refuse(refusal: Refusal, request_id: str | None = None) -> Response:
+    if refusal.retry_after is not None:
+        return _retry_later(refusal.error, refusal.status, refusal.retry_after, request_id)
+    return _error(refusal.error, refusal.status, request_id)
+
+
+def _incoming() -> Incoming:
+    return Incoming(
+        request.method,
+        request.path,
+        request.query_string.decode("latin-1"),
+        request.headers,
+        request.args,
+        request.remote_addr,
+        correlation_id(request.headers),
     )
-    return claims
 
 
-app = Flask(__name__)
-config = load_config()
+def _gate(incoming: Incoming, project_scoped: bool = True, allowlist: bool = True) -> Admission | Response:
+    admitted, event = pipeline.gate(incoming, project_scoped, allowlist)
+    if event is not None:
+        audit.emit(event)
+    if isinstance(admitted, Refusal):
+        return _refuse(admitted, incoming.request_id)
+    return admitted
 
 
 @app.route("/health")
-def health() -> tuple[dict[str, str], int]:
-    return {"status": "ok"}, 200
+def health() -> tuple[dict[str, Any], int]:
+    return {"status": "ok", "policy_version": policy_watcher.snapshot.version}, 200
+
+
+@app.route("/ready")
+def ready() -> tuple[dict[str, Any], int]:
+    body, is_ready = readiness.report()
+    return body, 200 if is_ready else 503
+
+
+@app.route("/metrics")
+def metrics() -> Response:
+    payload, content_type = render()
+    return Response(payload, mimetype=content_type)
 
 
 @app.route("/api/protected/health", methods=["GET"])
 def protected_health() -> Response:
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
-        return jsonify({"error": "missing_bearer_token"}), 401
-
-    token = auth_header.removeprefix("Bearer ").strip()
-    if not token:
-        return jsonify({"error": "missing_bearer_token"}), 401
+    token = extract_bearer_token(request.headers.get("Authorization", ""))
+    if token is None:
+        return _error("missing_bearer_token", 401)
 
     try:
-        claims = validate_bearer_token(token, config)
+        claims = validate_bearer_token(
+            token, config, pipeline.jwks_cache, pipeline.claims_cache, pipeline.rejected_tokens
+        )
     except Exception as exc:  # noqa: BLE001
-        return jsonify({"error": "invalid_token", "detail": str(exc)}), 401
+        return _error("invalid_token", 401, detail=str(exc))
 
-    upstream = requests.get(f"{config.upstream_url}/health", timeout=5)
+    try:
+        upstream = upstream_pool.health(f"{config.upstream_url}/health")
+    except CircuitOpenError as exc:
+        return _retry_later("upstream_circuit_open", 503, exc.retry_after)
+    except requests.RequestException:
+        return _error("upstream_unavailable", 502)
     return jsonify(
         {
             "gateway_auth": "success",
             "claims_subject": claims.get("sub", "unknown"),
-            "upstream_status": upstream.status_code,
-            "upstream_body": upstream.json(),
+            "upstream_status": upstream.status,
+            "upstream_body": upstream.body,
         }
     ), 200
 
 
+@app.route("/whoami", methods=["GET"])
+def whoami() -> Response:
+    gated = _gate(_incoming(), project_scoped=False, allowlist=False)
+    if isinstance(gated, Response):
+        return gated
+    return jsonify(pipeline.whoami(gated)), 200
+
+
+@app.route("/authz/batch", methods=["POST"])
+def authz_batch() -> Response:
+    incoming = _incoming()
+    request_id = incoming.request_id
+    gated = _gate(incoming, project_scoped=False)
+    if isinstance(gated, Response):
+        return gated
+
+    length = pipeline.body_length(incoming, BATCH_MAX_BODY_BYTES)
+    if isinstance(length, Refusal):
+        return _refuse(length, request_id)
+    body = request.stream.read(BATCH_MAX_BODY_BYTES + 1)
+    if len(body) > BATCH_MAX_BODY_BYTES:
+        return _error("request_body_too_large", 413, request_id)
+    result = pipeline.authz_batch(gated, body)
+    if isinstance(result, Refusal):
+        return _refuse(result, request_id)
+    response = jsonify(result)
+    response.headers[CORRELATION_ID_HEADER] = request_id
+    return response
+
+
+def _relay(upstream: requests.Response) -> Iterator[bytes]:
+    try:
+        yield from upstream.raw.stream(config.proxy_chunk_bytes, decode_content=False)
+    finally:
+        upstream.close()
+
+
+def _reply(reply: Reply) -> Response:
+    if reply.status == 304:
+        return Response(status=304, headers=reply.headers)
+    chunks = body_chunks(reply.body, config.proxy_chunk_bytes)
+    if reply.encoding is not None:
+        chunks = compress_chunks(chunks, pipeline.compression.compressor(reply.encoding))
+    return Response(chunks, status=reply.status, headers=reply.headers, direct_passthrough=True)
+
+
+def proxy(family: str, subpath: str = "") -> Response:
+    incoming = _incoming()
+    request_id = incoming.request_id
+    gated = _gate(incoming)
+    if isinstance(gated, Response):
+        return gated
+    g.audit_call = pipeline.api_call(gated, request_id)
+
+    cache_keys = pipeline.cache_keys(incoming, gated)
+    if cache_keys is not None:
+        cached = pipeline.cached(cache_keys, gated)
+        if cached is not None:
+            return _reply(pipeline.reply(incoming, cached))
+
+    length = pipeline.body_length(incoming, config.proxy_max_body_bytes)
+    if isinstance(length, Refusal):
+        return _refuse(length, request_id)
+    body = None
+    if length:
+        body = SizedLimitedBody(request.stream.read, config.proxy_max_body_bytes, config.proxy_chunk_bytes, length)
+    elif is_chunked(request.headers):
+        body = LimitedBody(request.stream.read, config.proxy_max_body_bytes, config.proxy_chunk_bytes)
+
+    url, headers = pipeline.upstream_request(incoming, family, gated, length, cache_keys is not None)
+    try:
+        upstream = upstream_pool.stream(request.method, url, headers, body)
+    except (CircuitOpenError, BodyTooLarge, requests.RequestException) as exc:
+        refusal = upstream_refusal(exc, body is not None and body.exceeded, isinstance(exc, requests.Timeout))
+        return _refuse(refusal, request_id)
+
+    chunks = _relay(upstream)
+    status = upstream.status_code
+    response_headers = forward_response_headers(upstream.headers.items(), request_id)
+    if cache_keys is not None and status == 200:
+        body, chunks = buffer_body(chunks, pipeline.response_cache.max_body_bytes)
+        if body is not None:
+            cached = pipeline.store(cache_keys, gated, response_headers, body)
+            if cached is not None:
+                return _reply(pipeline.reply(incoming, cached))
+    encoding, response_headers = pipeline.encoding_for(incoming, request.method, status, response_headers)
+    if encoding is not None:
+        chunks = compress_chunks(chunks, pipeline.compression.compressor(encoding))
+    return Response(chunks, status=status, headers=response_headers, direct_passthrough=True)
+
+
+def ingest_upload() -> Response:
+    incoming = _incoming()
+    request_id = incoming.request_id
+    gated = _gate(incoming)
+    if isinstance(gated, Response):
+        return gated
+    g.audit_call = pipeline.api_call(gated, request_id)
+
+    upload = pipeline.start_upload(incoming, gated)
+    if isinstance(upload, Refusal):
+        return _refuse(upload, request_id)
+    try:
+        read = request.stream.read
+        while chunk := read(config.proxy_chunk_bytes):
+            upload.feed(chunk)
+        upload.feed(None)
+        result, status = pipeline.finish_upload(upload, gated, request_id)
+    except IngestError as exc:
+        return _error(exc.error, exc.status, request_id)
+    except BaseException:
+        upload.abort()  # client went away mid-body
+        raise
+
+    response = jsonify(result)
+    response.status_code = status
+    response.headers[CORRELATION_ID_HEADER] = request_id
+    return response
+
+
+for _family in PROXY_FAMILIES:
+    app.add_url_rule(
+        f"/{_family}/<path:subpath>",
+        endpoint=f"proxy_{_family}",
+        view_func=proxy,
+        methods=PROXY_METHODS,
+        defaults={"family": _family},
+    )
+if pipeline.ingest_store is not None:
+    app.add_url_rule("/ingest/upload", view_func=ingest_upload, methods=["POST"])
+
+
+def _serve_sync(sock: socket.socket | None = None) -> None:
+    pipeline.start()
+    if sock is None:
+        app.run(host=config.bind_host, port=config.bind_port, threaded=True)
+    else:
+        make_server(config.bind_host, config.bind_port, app, threaded=True, fd=sock.fileno()).serve_forever()
+
+
+def main() -> None:
+    prepare_directory()
+    # Only the main process may talk to systemd under NotifyAccess=main; with workers it relays for them.
+    relay = NotifyRelay.from_environment(config.workers)
+    try:
+        if config.server_mode == "async":
+            import uvicorn
+
+            # uvicorn spawns its workers, so threads here are never forked.
+            if relay is not None:
+                relay.start()
+            if config.workers > 1:
+                watch_spawned_workers(worker_exited)
+            # A factory, so each uvicorn worker builds its own app instead of inheriting one built at import.
+            uvicorn.run(
+                "gateway.asgi:create_app",
+                factory=True,
+                host=config.bind_host,
+                port=config.bind_port,
+                workers=config.workers if config.workers > 1 else None,
+                log_level="warning",
+            )
+        elif config.workers > 1:
+            # Fork before any background thread exists; each worker starts its own.
+            sock = listen(config.bind_host, config.bind_port)
+            serve_workers(config.workers, sock, _serve_sync, worker_exited, relay)
+        else:
+            _serve_sync()
+    finally:
+        if relay is not None:
+            relay.close()
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8081)
+    main()
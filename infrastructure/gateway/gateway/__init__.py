@@ -0,0 +1 @@
+"""Backend gateway internals shared by the sync (Flask) and async (ASGI) serving modes."""
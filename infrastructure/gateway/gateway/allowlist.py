@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+import csv
+import ipaddress
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from gateway.config import GatewayConfig
+
+ADMIN_ALLOWLIST_FILE = "admin-allowlist.yaml"
+# Same columns as infrastructure/vm-provisioning/access/admin-workstation-inventory.csv.
+ADMIN_INVENTORY_FILE = "admin-workstation-inventory.csv"
+_INVENTORY_COLUMN = "lan_ip"
+
+IPAddress = ipaddress.IPv4Address | ipaddress.IPv6Address
+_TERMINAL = object()
+
+
+def _parse_address(value: str) -> IPAddress | None:
+    try:
+        address = ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+        return address.ipv4_mapped  # ::ffff:a.b.c.d from a dual-stack listener
+    return address
+
+
+class PrefixTrie:
+    """Binary trie over address bits, one root per IP version.
+
+    A node is ``[zero_child, one_child]``; a prefix ends in a terminal
+    marker, and anything below a shorter prefix is dropped because it is
+    already covered. ``contains`` walks at most 32 (IPv4) or 128 (IPv6) bits
+    however many networks were added, and stops at the first covering prefix.
+    """
+
+    def __init__(self, networks: Iterable[str] = ()) -> None:
+        self._roots: dict[int, Any] = {4: [None, None], 6: [None, None]}
+        self.size = 0
+        for network in networks:
+            self.add(network)
+
+    def add(self, network: str) -> None:
+        parsed = ipaddress.ip_network(network.strip(), strict=False)
+        mapped = parsed.network_address.ipv4_mapped if parsed.version == 6 else None
+        if mapped is not None and parsed.prefixlen >= 96:
+            parsed = ipaddress.ip_network(f"{mapped}/{parsed.prefixlen - 96}")
+        self.size += 1
+        bits, value = parsed.max_prefixlen, int(parsed.network_address)
+        node = self._roots[parsed.version]
+        if parsed.prefixlen == 0:
+            self._roots[parsed.version] = _TERMINAL
+            return
+        if node is _TERMINAL:
+            return
+        for depth in range(parsed.prefixlen - 1):
+            bit = (value >> (bits - 1 - depth)) & 1
+            child = node[bit]
+            if child is _TERMINAL:
+                return
+            if child is None:
+                child = node[bit] = [None, None]
+            node = child
+        node[(value >> (bits - parsed.prefixlen)) & 1] = _TERMINAL
+
+    def contains(self, address: str | IPAddress | None) -> bool:
+        if address is None:
+            return False
+        parsed = _parse_address(address) if isinstance(address, str) else address
+        if parsed is None:
+            return False
+        node = self._roots[parsed.version]
+        bits, value = parsed.max_prefixlen, int(parsed)
+        for depth in range(bits):
+            if node is _TERMINAL:
+                return True
+            node = node[(value >> (bits - 1 - depth)) & 1]
+            if node is None:
+                return False
+        return node is _TERMINAL
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def _inventory_addresses(path: Path) -> list[str]:
+    with path.open(encoding="utf-8", newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    addresses = []
+    for line, row in enumerate(rows, start=2):
+        value = (row.get(_INVENTORY_COLUMN) or "").strip()
+        if not value or value.startswith("<"):
+            continue  # unfilled template row
+        if _parse_address(value.split("/")[0]) is None:
+            raise ValueError(f"{path.name}:{line}: invalid {_INVENTORY_COLUMN} {value!r}")
+        addresses.append(value)
+    return addresses
+
+
+def load_admin_allowlist(policy_dir: str | Path) -> PrefixTrie:
+    """``cidrs`` from ``admin-allowlist.yaml`` plus ``lan_ip`` from the workstation inventory.
+
+    Either file may be absent; with neither the trie is empty and every
+    ``admin_allowlist_required`` route is denied.
+    """
+    base = Path(policy_dir)
+    networks: list[str] = []
+    allowlist = base / ADMIN_ALLOWLIST_FILE
+    if allowlist.is_file():
+        config = yaml.safe_load(allowlist.read_text(encoding="utf-8")) or {}
+        networks.extend(str(cidr) for cidr in config.get("cidrs") or ())
+    inventory = base / ADMIN_INVENTORY_FILE
+    if inventory.is_file():
+        networks.extend(_inventory_addresses(inventory))
+    try:
+        return PrefixTrie(networks)
+    except ValueError as exc:
+        raise ValueError(f"admin-allowlist: {exc}") from None
+
+
+def client_address(
+    remote_addr: str | None, forwarded_for: str | None, trusted_proxies: PrefixTrie | None
+) -> str | None:
+    """The address the admin allowlist is checked against.
+
+    ``X-Forwarded-For`` is only believed when the connecting peer is a trusted
+    proxy; it is then walked right to left past further trusted hops, so a
+    client cannot prepend an address of its choosing.
+    """
+    if trusted_proxies is None or not forwarded_for or not trusted_proxies.contains(remote_addr):
+        return remote_addr
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not trusted_proxies.contains(hop):
+            return hop
+    return hops[0] if hops else remote_addr
+
+
+def trusted_proxies_from_config(cfg: GatewayConfig) -> PrefixTrie | None:
+    """``TRUSTED_PROXY_IP`` as a trie, or ``None`` (``X-Forwarded-For`` ignored) unless forwarded headers are on."""
+    if not cfg.forwarded_headers_enabled or not cfg.trusted_proxies:
+        return None
+    return PrefixTrie(cfg.trusted_proxies)
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+import time
+from typing import Any
+
+import httpx
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from gateway.audit import AuditEmitter, api_call_event
+from gateway.auth import extract_bearer_token, validate_bearer_token
+from gateway.authz import BATCH_MAX_BODY_BYTES
+from gateway.breaker import CircuitOpenError
+from gateway.compression import compress_async_chunks
+from gateway.config import GatewayConfig, load_config
+from gateway.ingest import IngestError
+from gateway.metrics import observe_request, reject, render
+from gateway.pipeline import Admission, Incoming, Pipeline, Refusal, Reply, upstream_refusal
+from gateway.proxy import (
+    CORRELATION_ID_HEADER,
+    PROXY_FAMILIES,
+    PROXY_METHODS,
+    AsyncLimitedBody,
+    BodyTooLarge,
+    correlation_id,
+    forward_response_headers,
+    is_chunked,
+    retry_after_value,
+)
+from gateway.readiness import probe_targets
+from gateway.response_cache import async_body_chunks, buffer_async_body
+from gateway.upstream import AsyncUpstreamPool
+
+
+async def emit_audit(audit: AuditEmitter, event: dict[str, Any]) -> None:
+    """Enqueue on the event loop; only a full queue (block/spill overflow) moves to a worker thread."""
+    if not audit.try_put(event):
+        await run_in_threadpool(audit.emit, event)
+
+
+class RequestMetricsMiddleware:
+    """Records ``http_requests_total`` / ``http_request_duration_seconds`` per route name.
+
+    Latency is measured until the response headers are sent, matching the
+    Flask ``after_request`` hook in sync mode. Requests whose handler left an
+    ``audit_call`` in the request state also get a ``data_access.api_call``
+    audit event with the final status.
+    """
+
+    def __init__(self, app: ASGIApp, audit: AuditEmitter | None = None) -> None:
+        self.app = app
+        self.audit = audit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+
+        async def send_with_metrics(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                endpoint = getattr(route, "name", None)
+                elapsed = time.perf_counter() - started
+                observe_request(endpoint, scope["method"], message["status"], elapsed)
+                call = scope.get("state", {}).get("audit_call")
+                if self.audit is not None and call is not None:
+                    subject, family, request_id = call
+                    client_ip = scope["client"][0] if scope.get("client") else None
+                    status, duration_ms = message["status"], elapsed * 1000
+                    event = api_call_event(
+                        subject, client_ip, scope["method"], scope["path"], family, status, duration_ms, request_id
+                    )
+                    await emit_audit(self.audit, event)
+            await send(message)
+
+        await self.app(scope, receive, send_with_metrics)
+
+
+def error_response(error: str, status: int, headers: dict[str, str] | None = None, **extra: Any) -> JSONResponse:
+    reject(error)
+    return JSONResponse({"error": error, **extra}, status_code=status, headers=headers)
+
+
+def retry_later_response(
+    error: str, status: int, seconds: float, headers: dict[str, str] | None = None
+) -> JSONResponse:
+    return error_response(error, status, headers={**(headers or {}), "Retry-After": retry_after_value(seconds)})
+
+
+def refusal_response(refusal: Refusal, request_id: str | None = None) -> JSONResponse:
+    headers = {CORRELATION_ID_HEADER: request_id} if request_id is not None else None
+    if refusal.retry_after is not None:
+        return retry_later_response(refusal.error, refusal.status, refusal.retry_after, headers)
+    return error_response(refusal.error, refusal.status, headers)
+
+
+def encode_headers(headers: list[tuple[str, str]]) -> list[tuple[bytes, bytes]]:
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+def incoming(request: Request) -> Incoming:
+    return Incoming(
+        request.method,
+        request.url.path,
+        request.url.query,
+        request.headers,
+        request.query_params,
+        request.client.host if request.client else None,
+        correlation_id(request.headers),
+    )
+
+
+def create_app(cfg: GatewayConfig | None = None) -> Starlette:
+    """Build the ASGI app; ``uvicorn --factory gateway.asgi:create_app`` calls it once per worker."""
+    cfg = cfg or load_config()
+    pipeline = Pipeline(cfg)
+    pool = AsyncUpstreamPool(cfg)
+    audit = pipeline.audit
+    probe_timeout = cfg.upstream_connect_timeout_seconds + cfg.upstream_read_timeout_seconds
+
+    def upstream_check(url: str, loop: asyncio.AbstractEventLoop) -> Callable[[], int]:
+        # Probes run on the readiness thread; the pool belongs to the event loop.
+        def check() -> int:
+            future = asyncio.run_coroutine_threadsafe(pool.health(f"{url}/health"), loop)
+            try:
+                return future.result(probe_timeout).status
+            except BaseException:
+                future.cancel()
+                raise
+
+        return check
+
+    async def gate(current: Incoming, project_scoped: bool = True, allowlist: bool = True) -> Admission | JSONResponse:
+        # Token verification can fetch the JWKS inline and rate limits may hit the shared store.
+        admitted, event = await run_in_threadpool(pipeline.gate, current, project_scoped, allowlist)
+        if event is not None:
+            await emit_audit(audit, event)
+        if isinstance(admitted, Refusal):
+            return refusal_response(admitted, current.request_id)
+        return admitted
+
+    async def health(request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok", "policy_version": pipeline.policy_watcher.snapshot.version})
+
+    async def ready(request: Request) -> JSONResponse:
+        body, is_ready = pipeline.readiness.report()
+        return JSONResponse(body, status_code=200 if is_ready else 503)
+
+    async def metrics(request: Request) -> Response:
+        payload, content_type = render()
+        return Response(payload, headers={"Content-Type": content_type})
+
+    async def protected_health(request: Request) -> JSONResponse:
+        token = extract_bearer_token(request.headers.get("Authorization", ""))
+        if token is None:
+            return error_response("missing_bearer_token", 401)
+
+        try:
+            # A cold or expired JWKS cache fetches inline; keep that off the event loop.
+            claims = await run_in_threadpool(
+                validate_bearer_token,
+                token,
+                cfg,
+                pipeline.jwks_cache,
+                pipeline.claims_cache,
+                pipeline.rejected_tokens,
+            )
+        except Exception as exc:  # noqa: BLE001
+            return error_response("invalid_token", 401, detail=str(exc))
+
+        try:
+            upstream = await pool.health(f"{cfg.upstream_url}/health")
+        except CircuitOpenError as exc:
+            return retry_later_response("upstream_circuit_open", 503, exc.retry_after)
+        except httpx.HTTPError:
+            return error_response("upstream_unavailable", 502)
+        return JSONResponse(
+            {
+                "gateway_auth": "success",
+                "claims_subject": claims.get("sub", "unknown"),
+                "upstream_status": upstream.status,
+                "upstream_body": upstream.body,
+            }
+        )
+
+    async def whoami(request: Request) -> JSONResponse:
+        gated = await gate(incoming(request), project_scoped=False, allowlist=False)
+        if isinstance(gated, Response):
+            return gated
+        return JSONResponse(pipeline.whoami(gated))
+
+    async def authz_batch(request: Request) -> JSONResponse:
+        current = incoming(request)
+        request_id = current.request_id
+        gated = await gate(current, project_scoped=False)
+        if isinstance(gated, Response):
+            return gated
+
+        length = pipeline.body_length(current, BATCH_MAX_BODY_BYTES)
+        if isinstance(length, Refusal):
+            return refusal_response(length, request_id)
+        body = bytearray()
+        async for chunk in request.stream():
+            body += chunk
+            if len(body) > BATCH_MAX_BODY_BYTES:
+                return error_response("request_body_too_large", 413, {CORRELATION_ID_HEADER: request_id})
+        result = pipeline.authz_batch(gated, bytes(body))
+        if isinstance(result, Refusal):
+            return refusal_response(result, request_id)
+        return JSONResponse(result, headers={CORRELATION_ID_HEADER: request_id})
+
+    def streaming_response(
+        chunks: AsyncIterator[bytes], status: int, response_headers: list[tuple[str, str]]
+    ) -> StreamingResponse:
+        response = StreamingResponse(chunks, status_code=status)
+        response.raw_headers = encode_headers(response_headers)
+        return response
+
+    def reply_response(reply: Reply) -> Response:
+        if reply.status == 304:
+            response = Response(status_code=304)
+            response.raw_headers = encode_headers(reply.headers)
+            return response
+        chunks: AsyncIterator[bytes] = async_body_chunks(reply.body, cfg.proxy_chunk_bytes)
+        if reply.encoding is not None:
+            chunks = compress_async_chunks(chunks, pipeline.compression.compressor(reply.encoding))
+        return streaming_response(chunks, reply.status, reply.headers)
+
+    async def proxy(request: Request) -> Response:
+        current = incoming(request)
+        request_id = current.request_id
+        family = current.path.split("/", 2)[1]
+        gated = await gate(current)
+        if isinstance(gated, Response):
+            return gated
+        request.state.audit_call = pipeline.api_call(gated, request_id)
+
+        cache_keys = pipeline.cache_keys(current, gated)
+        if cache_keys is not None:
+            cached = pipeline.cached(cache_keys, gated)
+            if cached is not None:
+                return reply_response(pipeline.reply(current, cached))
+
+        length = pipeline.body_length(current, cfg.proxy_max_body_bytes)
+        if isinstance(length, Refusal):
+            return refusal_response(length, request_id)
+        body = None
+        if length or is_chunked(request.headers):
+            body = AsyncLimitedBody(request.stream(), cfg.proxy_max_body_bytes)
+
+        url, headers = pipeline.upstream_request(current, family, gated, length, cache_keys is not None)
+        try:
+            upstream = await pool.stream(request.method, url, headers, body)
+        except (CircuitOpenError, BodyTooLarge, httpx.HTTPError) as exc:
+            refusal = upstream_refusal(exc, body is not None and body.exceeded, isinstance(exc, httpx.TimeoutException))
+            return refusal_response(refusal, request_id)
+
+        async def relay() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in upstream.response.aiter_raw(cfg.proxy_chunk_bytes):
+                    yield chunk
+            finally:
+                await upstream.aclose()
+
+        chunks: AsyncIterator[bytes] = relay()
+        status = upstream.response.status_code
+        response_headers = forward_response_headers(upstream.response.headers.multi_items(), request_id)
+        if cache_keys is not None and status == 200:
+            body, chunks = await buffer_async_body(chunks, pipeline.response_cache.max_body_bytes)
+            if body is not None:
+                cached = pipeline.store(cache_keys, gated, response_headers, body)
+                if cached is not None:
+                    return reply_response(pipeline.reply(current, cached))
+        # Compression runs on the event loop: one PROXY_CHUNK_BYTES chunk at a time keeps each step short.
+        encoding, response_headers = pipeline.encoding_for(current, request.method, status, response_headers)
+        if encoding is not None:
+            chunks = compress_async_chunks(chunks, pipeline.compression.compressor(encoding))
+        return streaming_response(chunks, status, response_headers)
+
+    async def ingest_upload(request: Request) -> JSONResponse:
+        current = incoming(request)
+        request_id = current.request_id
+        gated = await gate(current)
+        if isinstance(gated, Response):
+            return gated
+        request.state.audit_call = pipeline.api_call(gated, request_id)
+
+        upload = await run_in_threadpool(pipeline.start_upload, current, gated)
+        if isinstance(upload, Refusal):
+            return refusal_response(upload, request_id)
+        try:
+            # Parsing, hashing and the temp-file write are blocking, so each chunk goes to a worker thread.
+            async for chunk in request.stream():
+                if chunk:
+                    await run_in_threadpool(upload.feed, chunk)
+            await run_in_threadpool(upload.feed, None)
+            result, status = await run_in_threadpool(pipeline.finish_upload, upload, gated, request_id)
+        except IngestError as exc:
+            return error_response(exc.error, exc.status, {CORRELATION_ID_HEADER: request_id})
+        except BaseException:
+            upload.abort()  # client went away mid-body
+            raise
+        return JSONResponse(result, status_code=status, headers={CORRELATION_ID_HEADER: request_id})
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        for name, url in probe_targets(cfg).items():
+            pipeline.readiness.add_probe(name, upstream_check(url, loop), lambda url=url: pool.circuit_state(url))
+        pipeline.start()
+        yield
+        pipeline.stop()
+        await pool.aclose()
+
+    return Starlette(
+        routes=[
+            Route("/health", health, methods=["GET"]),
+            Route("/ready", ready, methods=["GET"]),
+            Route("/metrics", metrics, methods=["GET"]),
+            Route("/api/protected/health", protected_health, methods=["GET"]),
+            Route("/whoami", whoami, methods=["GET"]),
+            Route("/authz/batch", authz_batch, methods=["POST"]),
+            *([Route("/ingest/upload", ingest_upload, methods=["POST"])] if pipeline.ingest_store is not None else []),
+            *(
+                Route(f"/{family}/{{subpath:path}}", proxy, methods=PROXY_METHODS, name=f"proxy_{family}")
+                for family in PROXY_FAMILIES
+            ),
+        ],
+        middleware=[Middleware(RequestMetricsMiddleware, audit=audit)],
+        lifespan=lifespan,
+    )
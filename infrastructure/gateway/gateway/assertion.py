@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import base64
+from collections.abc import Callable, Mapping
+import hashlib
+import hmac
+import json
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+from gateway.config import GatewayConfig
+
+ASSERTION_HEADER = "X-Internal-Assertion"
+ASSERTION_VERSION = "v1"
+MIN_KEY_BYTES = 32
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+class AssertionSigner:
+    """Mints the internal identity assertion forwarded to upstreams.
+
+    Format: ``v1.<base64url(JSON payload)>.<base64url(HMAC-SHA256)>``, the MAC
+    covering ``v1.<payload>``. The payload is the ``/whoami`` view of the
+    principal (sub, platform role, project-role map, policy version) plus the
+    correlation ID and ``iat``/``exp``. It is bound to the one upstream call it
+    was minted for: ``aud`` is the ``host:port`` of the upstream URL, and
+    ``method``/``path`` are the upstream request's. Upstreams verify it with
+    one HMAC (``services/reference-app/internal_assertion.py``) instead of
+    repeating JWKS fetches and RSA verification, and reject an assertion
+    replayed against another upstream, method or path.
+    """
+
+    def __init__(self, key: bytes, ttl_seconds: float = 30.0, clock: Callable[[], float] = time.time) -> None:
+        if len(key) < MIN_KEY_BYTES:
+            raise ValueError(f"INTERNAL_ASSERTION_KEY must be at least {MIN_KEY_BYTES} bytes")
+        self._key = key
+        self._ttl = ttl_seconds
+        self._clock = clock
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig) -> AssertionSigner | None:
+        """``None`` (no assertion header) when ``INTERNAL_ASSERTION_KEY`` is unset."""
+        if not cfg.internal_assertion_key:
+            return None
+        return cls(cfg.internal_assertion_key.encode("utf-8"), cfg.internal_assertion_ttl_seconds)
+
+    def sign(self, identity: Mapping[str, Any], request_id: str, method: str, url: str) -> str:
+        """Assertion for ``method url``, the upstream request it will be sent with."""
+        now = int(self._clock())
+        target = urlsplit(url)
+        payload = {
+            **identity,
+            "aud": target.netloc,
+            "method": method.upper(),
+            "path": target.path or "/",
+            "rid": request_id,
+            "iat": now,
+            "exp": now + int(self._ttl),
+        }
+        body = _b64(json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+        signing_input = f"{ASSERTION_VERSION}.{body}"
+        mac = hmac.new(self._key, signing_input.encode("ascii"), hashlib.sha256).digest()
+        return f"{signing_input}.{_b64(mac)}"
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Mapping
+import json
+import logging
+import os
+from pathlib import Path
+import socket
+import threading
+import time
+from typing import Any, Protocol
+from urllib.parse import urlsplit
+import uuid
+
+from gateway.config import GatewayConfig
+from gateway.metrics import AUDIT_OUTCOMES, audit_events_total, audit_flush_duration, audit_queue_depth
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop", "spill")
+SOURCE_SYSTEM = "gateway"
+TIMESTAMP_TZ = "Africa/Johannesburg"
+
+
+class AuditSink(Protocol):
+    def write(self, data: bytes) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class FileSink:
+    """Appends JSON lines to a local spool file read by the log shipper.
+
+    The file is reopened when its inode changes, so rename-based rotation
+    does not leave the gateway writing to a rotated-away file.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._handle: Any = None
+        self._inode: int | None = None
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = open(self.path, "ab")
+        self._inode = os.fstat(self._handle.fileno()).st_ino
+
+    def write(self, data: bytes) -> None:
+        try:
+            current = self.path.stat().st_ino
+        except OSError:
+            current = None
+        if self._handle is None or current != self._inode:
+            self.close()
+            self._open()
+        self._handle.write(data)
+        self._handle.flush()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class SocketSink:
+    """Sends JSON lines over one TCP connection to a local collector, reconnecting on error."""
+
+    def __init__(self, host: str, port: int, timeout_seconds: float = 2.0) -> None:
+        self.address = (host, port)
+        self.timeout_seconds = timeout_seconds
+        self._sock: socket.socket | None = None
+
+    def write(self, data: bytes) -> None:
+        if self._sock is None:
+            self._sock = socket.create_connection(self.address, timeout=self.timeout_seconds)
+        try:
+            self._sock.sendall(data)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def open_sink(target: str) -> AuditSink:
+    """``file:/path/audit.jsonl`` or ``tcp://host:port``."""
+    parts = urlsplit(target)
+    if parts.scheme == "file":
+        return FileSink(parts.path)
+    if parts.scheme == "tcp" and parts.hostname and parts.port:
+        return SocketSink(parts.hostname, parts.port)
+    raise ValueError(f"AUDIT_SINK must be file:<path> or tcp://host:port, got {target!r}")
+
+
+def _render(enqueued_at: float, event: Mapping[str, Any]) -> bytes:
+    millis = int(enqueued_at * 1000) % 1000
+    record = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(enqueued_at)) + f".{millis:03d}Z",
+        "timestamp_tz": TIMESTAMP_TZ,
+        "event_id": str(uuid.uuid4()),
+        "source_system": SOURCE_SYSTEM,
+        **event,
+    }
+    return json.dumps(record, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+
+
+class AuditEmitter:
+    """Bounded in-memory audit queue drained in batches by a background thread.
+
+    ``emit`` only appends ``(time, event)`` to a deque; timestamps, event IDs
+    and JSON are rendered on the flusher thread, which writes up to
+    ``batch_size`` events per sink write every ``flush_interval_seconds`` (or
+    as soon as a full batch is waiting). When the queue is full, ``overflow``
+    decides:
+
+    - ``block``: wait up to ``block_timeout_seconds`` for room, then drop
+    - ``drop``: discard the event and count it
+    - ``spill``: append the event to ``spill_path`` on the caller's thread
+
+    A batch the sink rejects goes to ``spill_path`` when set, else it is
+    counted as failed.
+    """
+
+    def __init__(
+        self,
+        sink: AuditSink,
+        *,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval_seconds: float = 1.0,
+        overflow: str = "drop",
+        spill_path: str | Path | None = None,
+        block_timeout_seconds: float = 0.05,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"AUDIT_OVERFLOW must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        if overflow == "spill" and spill_path is None:
+            raise ValueError("AUDIT_OVERFLOW=spill needs AUDIT_SPILL_PATH")
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.overflow = overflow
+        self.block_timeout_seconds = block_timeout_seconds
+        self._spill = FileSink(spill_path) if spill_path is not None else None
+        self._spill_lock = threading.Lock()
+        self._queue: deque[tuple[float, Mapping[str, Any]]] = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._outcomes = {outcome: audit_events_total.labels(outcome=outcome) for outcome in AUDIT_OUTCOMES}
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig) -> AuditEmitter | None:
+        """``None`` (auditing off) when ``AUDIT_SINK`` is unset."""
+        if not cfg.audit_sink:
+            return None
+        return cls(
+            open_sink(cfg.audit_sink),
+            max_queue=cfg.audit_queue_max_events,
+            batch_size=cfg.audit_batch_max_events,
+            flush_interval_seconds=cfg.audit_flush_interval_seconds,
+            overflow=cfg.audit_overflow,
+            spill_path=cfg.audit_spill_path or None,
+            block_timeout_seconds=cfg.audit_block_timeout_seconds,
+        )
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def try_put(self, event: Mapping[str, Any]) -> bool:
+        """Enqueue without waiting; False when the queue is full."""
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                return False
+            self._queue.append((time.time(), event))
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def emit(self, event: Mapping[str, Any]) -> None:
+        """Enqueue ``event``, applying the overflow policy when the queue is full."""
+        if self.try_put(event):
+            return
+        if self.overflow == "block":
+            deadline = time.monotonic() + self.block_timeout_seconds
+            with self._cond:
+                self._cond.notify_all()
+                while len(self._queue) >= self.max_queue:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                else:
+                    self._queue.append((time.time(), event))
+                    return
+        elif self.overflow == "spill":
+            self._spill_lines(_render(time.time(), event), 1)
+            return
+        self._outcomes["dropped"].inc()
+
+    def _spill_lines(self, data: bytes, count: int) -> None:
+        try:
+            with self._spill_lock:
+                self._spill.write(data)
+        except OSError as exc:
+            logger.error("audit spill failed, %d events lost: %s", count, exc)
+            self._outcomes["failed"].inc(count)
+            return
+        self._outcomes["spilled"].inc(count)
+
+    def _drain(self) -> list[tuple[float, Mapping[str, Any]]]:
+        with self._cond:
+            if len(self._queue) < self.batch_size and not self._stop.is_set():
+                self._cond.wait(self.flush_interval_seconds)
+            audit_queue_depth.set(len(self._queue))
+            count = min(len(self._queue), self.batch_size)
+            batch = [self._queue.popleft() for _ in range(count)]
+            if batch:
+                self._cond.notify_all()  # wake producers blocked on a full queue
+        return batch
+
+    def _write(self, batch: list[tuple[float, Mapping[str, Any]]]) -> None:
+        started = time.perf_counter()
+        data = b"".join(_render(enqueued_at, event) for enqueued_at, event in batch)
+        try:
+            self.sink.write(data)
+        except OSError as exc:
+            logger.warning("audit sink write failed: %s", exc)
+            if self._spill is not None:
+                self._spill_lines(data, len(batch))
+            else:
+                self._outcomes["failed"].inc(len(batch))
+        else:
+            self._outcomes["written"].inc(len(batch))
+        audit_flush_duration.observe(time.perf_counter() - started)
+
+    def flush(self) -> None:
+        """Write everything queued so far on the calling thread."""
+        while True:
+            with self._cond:
+                count = min(len(self._queue), self.batch_size)
+                batch = [self._queue.popleft() for _ in range(count)]
+                self._cond.notify_all()
+            if not batch:
+                return
+            self._write(batch)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._drain()
+            if batch:
+                self._write(batch)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+        self.sink.close()
+        if self._spill is not None:
+            self._spill.close()
+
+
+def _actor(subject: str | None, source_ip: str | None) -> dict[str, Any]:
+    return {
+        "id": subject or "anonymous",
+        "type": "human",
+        "name": subject or "anonymous",
+        "source_ip": source_ip or "unknown",
+    }
+
+
+def rbac_decision_event(
+    decision: Any,
+    subject: str | None,
+    source_ip: str | None,
+    method: str,
+    path: str,
+    project_code: str | None,
+    policy_version: str,
+    request_id: str,
+) -> dict[str, Any]:
+    return {
+        "correlation_id": request_id,
+        "event_type": "authorization.rbac_decision",
+        "event_category": "authorization",
+        "actor": _actor(subject, source_ip),
+        "target": {"type": "api_endpoint", "id": decision.family or "unmatched", "resource_path": path},
+        "action": "authorize",
+        "outcome": "success" if decision.allowed else "failure",
+        "outcome_reason": decision.reason,
+        "severity": "info" if decision.allowed else "warning",
+        "metadata": {
+            "method": method,
+            "status": decision.status,
+            "project_code": project_code,
+            "policy_version": policy_version,
+        },
+    }
+
+
+def api_call_event(
+    subject: str | None,
+    source_ip: str | None,
+    method: str,
+    path: str,
+    family: str,
+    response_code: int,
+    duration_ms: float,
+    request_id: str,
+) -> dict[str, Any]:
+    return {
+        "correlation_id": request_id,
+        "event_type": "data_access.api_call",
+        "event_category": "data_access",
+        "actor": _actor(subject, source_ip),
+        "target": {"type": "api_endpoint", "id": family, "resource_path": path},
+        "action": "invoke",
+        "outcome": "success" if response_code < 400 else "failure",
+        "outcome_reason": str(response_code),
+        "severity": "info" if response_code < 500 else "warning",
+        "metadata": {"method": method, "response_code": response_code, "duration_ms": round(duration_ms, 2)},
+    }
+
+
+def config_change_event(old_version: str | None, new_version: str | None, policy_dir: str) -> dict[str, Any]:
+    return {
+        "correlation_id": f"policy-reload-{new_version}",
+        "event_type": "admin.config_change",
+        "event_category": "admin",
+        "actor": {"id": SOURCE_SYSTEM, "type": "system", "name": SOURCE_SYSTEM, "source_ip": "local"},
+        "target": {"type": "config", "id": "gateway-policy", "resource_path": policy_dir},
+        "action": "reload",
+        "outcome": "success",
+        "outcome_reason": "policy files changed",
+        "severity": "info",
+        "metadata": {"previous_version": old_version, "policy_version": new_version},
+    }
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import jwt
+
+from gateway.claims_cache import CachedClaims, ClaimsCache, RejectedTokenCache, token_digest
+from gateway.config import GatewayConfig
+from gateway.jwks import JwksCache
+from gateway.metrics import cache_lookup, reject_token, timed
+from gateway.policy import CompiledPolicy
+from gateway.principal import Principal
+
+# Reasons a token fails the same way however often it is retried. A token not
+# yet valid will pass once its nbf arrives, and an unknown kid may be a key
+# rotation not yet visible here, so neither is remembered.
+_LASTING_REJECTIONS = frozenset(
+    {"malformed", "unsupported_alg", "expired", "wrong_issuer", "wrong_audience", "missing_claim", "bad_signature"}
+)
+
+
+def extract_bearer_token(auth_header: str) -> str | None:
+    if not auth_header.startswith("Bearer "):
+        return None
+    token = auth_header.removeprefix("Bearer ").strip()
+    return token or None
+
+
+def validate_bearer_token(
+    token: str,
+    cfg: GatewayConfig,
+    jwks: JwksCache,
+    claims_cache: ClaimsCache | None = None,
+    rejected: RejectedTokenCache | None = None,
+) -> dict[str, Any]:
+    """Verify ``token`` and return its claims.
+
+    With a ``claims_cache`` a token that already passed full verification is
+    answered from memory (no RSA work) until it expires, as long as the key
+    that signed it is still published in the JWKS. With ``rejected`` a token
+    that recently failed is refused again without being parsed.
+    """
+    claims, _, _ = _verify(token, cfg, jwks, claims_cache, rejected)
+    return claims
+
+
+def authenticate(
+    token: str,
+    cfg: GatewayConfig,
+    jwks: JwksCache,
+    claims_cache: ClaimsCache | None,
+    policy: CompiledPolicy,
+    rejected: RejectedTokenCache | None = None,
+) -> tuple[dict[str, Any], Principal]:
+    """Verify ``token`` and resolve its ``Principal`` under ``policy``.
+
+    The principal is cached alongside the verified claims, so the groups claim
+    is parsed once per token and policy version rather than once per request.
+    """
+    claims, digest, entry = _verify(token, cfg, jwks, claims_cache, rejected)
+    if entry is not None and entry.principal is not None and entry.principal.policy_version == policy.version:
+        return claims, entry.principal
+
+    principal = policy.principal_from_claims(claims)
+    if claims_cache is not None:
+        claims_cache.attach_principal(digest, principal)
+    return claims, principal
+
+
+def prevalidate(token: str, cfg: GatewayConfig, now: float | None = None) -> dict[str, Any]:
+    """Reject obviously bad tokens before any key lookup or signature check.
+
+    Decodes header and payload without verifying them and checks ``alg``
+    against ``allowed_algs``, ``iss`` against the configured issuer and
+    ``exp``/``nbf`` against the clock with ``clock_skew_seconds`` of leeway.
+    Returns the unverified header.
+    """
+    unverified = jwt.decode_complete(token, options={"verify_signature": False})
+    header, payload = unverified["header"], unverified["payload"]
+    if header.get("alg") not in cfg.allowed_algs:
+        raise jwt.InvalidAlgorithmError(f"alg {header.get('alg')!r} is not allowed")
+    if header.get("kid") is not None and not isinstance(header["kid"], str):
+        raise jwt.DecodeError("kid must be a string")
+    if payload.get("iss") != cfg.issuer:
+        raise jwt.InvalidIssuerError("Invalid issuer")
+
+    now = time.time() if now is None else now
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)):
+        raise jwt.MissingRequiredClaimError("exp")
+    if exp + cfg.clock_skew_seconds <= now:
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    nbf = payload.get("nbf")
+    if isinstance(nbf, (int, float)) and nbf - cfg.clock_skew_seconds > now:
+        raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+    return header
+
+
+def rejection_reason(exc: jwt.PyJWTError) -> str:
+    if isinstance(exc, jwt.InvalidSignatureError):
+        return "bad_signature"
+    if isinstance(exc, jwt.DecodeError):
+        return "malformed"
+    if isinstance(exc, jwt.PyJWKClientError):
+        return "unknown_kid"
+    for error_type, reason in (
+        (jwt.InvalidAlgorithmError, "unsupported_alg"),
+        (jwt.ExpiredSignatureError, "expired"),
+        (jwt.ImmatureSignatureError, "not_yet_valid"),
+        (jwt.InvalidIssuerError, "wrong_issuer"),
+        (jwt.InvalidAudienceError, "wrong_audience"),
+        (jwt.MissingRequiredClaimError, "missing_claim"),
+    ):
+        if isinstance(exc, error_type):
+            return reason
+    return "other"
+
+
+def _verify(
+    token: str,
+    cfg: GatewayConfig,
+    jwks: JwksCache,
+    claims_cache: ClaimsCache | None,
+    rejected: RejectedTokenCache | None = None,
+) -> tuple[dict[str, Any], bytes | None, CachedClaims | None]:
+    digest = None
+    if claims_cache is not None or rejected is not None:
+        digest = token_digest(token)
+    if rejected is not None:
+        recently_rejected = digest in rejected
+        cache_lookup("rejected_tokens", hit=recently_rejected)
+        if recently_rejected:
+            reject_token("recently_rejected")
+            raise jwt.InvalidTokenError("token was recently rejected")
+    if claims_cache is not None:
+        cached = claims_cache.get(digest)
+        if cached is not None:
+            if jwks.has_key(cached.kid):
+                cache_lookup("claims", hit=True)
+                return cached.claims, digest, cached
+            claims_cache.discard(digest)
+        cache_lookup("claims", hit=False)
+
+    try:
+        with timed("token_parse"):
+            header = prevalidate(token, cfg)
+        kid = header.get("kid")
+        signing_key = jwks.get_signing_key(kid)
+        options = {"verify_aud": cfg.audience is not None}
+        with timed("signature_verify"):
+            claims = jwt.decode(
+                token,
+                signing_key.key,
+                algorithms=list(cfg.allowed_algs),
+                issuer=cfg.issuer,
+                audience=cfg.audience,
+                leeway=cfg.clock_skew_seconds,
+                options=options,
+            )
+    except jwt.PyJWKClientConnectionError:
+        # The IdP is unreachable; that says nothing about the token itself.
+        raise
+    except jwt.PyJWTError as exc:
+        reason = rejection_reason(exc)
+        reject_token(reason)
+        # Repeats of an unknown kid are bounded by the JWKS refetch rate limit instead.
+        if rejected is not None and reason in _LASTING_REJECTIONS:
+            rejected.add(digest)
+        raise
+
+    if claims_cache is not None:
+        claims_cache.put(digest, claims, kid)
+    return claims, digest, None
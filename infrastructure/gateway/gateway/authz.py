@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any
+
+# Enough for a few thousand checks; the body is read whole before parsing.
+BATCH_MAX_BODY_BYTES = 256 * 1024
+
+
+class BatchRequestError(Exception):
+    """Malformed batch; ``error`` and ``status`` become the JSON error response."""
+
+    def __init__(self, error: str, status: int) -> None:
+        super().__init__(error)
+        self.error = error
+        self.status = status
+
+
+def parse_checks(body: bytes, max_checks: int) -> list[tuple[str, str | None, str]]:
+    """``{"checks": [[family, project_code, action], ...]}`` into check tuples.
+
+    ``project_code`` may be ``null`` for checks on non-project-scoped families
+    and ``action`` may be ``""`` for single-path families such as ``whoami``.
+    """
+    try:
+        payload: Any = json.loads(body)
+    except ValueError:
+        raise BatchRequestError("invalid_batch", 400) from None
+    checks = payload.get("checks") if isinstance(payload, dict) else None
+    if not isinstance(checks, list):
+        raise BatchRequestError("invalid_batch", 400)
+    if len(checks) > max_checks:
+        raise BatchRequestError("batch_too_large", 413)
+    parsed = []
+    for check in checks:
+        if not isinstance(check, list) or len(check) != 3:
+            raise BatchRequestError("invalid_batch", 400)
+        family, project_code, action = check
+        if not isinstance(family, str) or not isinstance(action, str):
+            raise BatchRequestError("invalid_batch", 400)
+        if project_code is not None and not isinstance(project_code, str):
+            raise BatchRequestError("invalid_batch", 400)
+        parsed.append((family, project_code or None, action))
+    return parsed
+
+
+def encode_bitmap(bitmap: int, count: int) -> str:
+    """Base64 of ``ceil(count / 8)`` bytes; check ``i`` is bit ``i % 8`` (LSB first) of byte ``i // 8``."""
+    return base64.b64encode(bitmap.to_bytes((count + 7) // 8, "little")).decode("ascii")
+
+
+def batch_response(bitmap: int, count: int, policy_version: str) -> dict[str, Any]:
+    return {"count": count, "bitmap": encode_bitmap(bitmap, count), "policy_version": policy_version}
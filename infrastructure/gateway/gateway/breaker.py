@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+import math
+import threading
+import time
+
+from gateway.config import GatewayConfig
+from gateway.metrics import circuit_state
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, upstream: str, retry_after: float) -> None:
+        super().__init__(f"circuit open for {upstream}")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Per-upstream breaker over a rolling window of call outcomes.
+
+    - A call counts as failed when it raises, returns 5xx or takes longer than
+      ``slow_call_seconds``; outcomes are kept in one-second buckets for
+      ``window_seconds``.
+    - Once the window holds ``min_calls`` calls and the failed share reaches
+      ``failure_rate``, the circuit opens and callers fail fast for
+      ``open_seconds``.
+    - After that up to ``half_open_calls`` trial calls are let through; all of
+      them succeeding closes the circuit, any failure re-opens it.
+
+    Every state change starts a new generation. ``acquire`` returns the one a
+    call was admitted under and ``record``/``cancel`` take it back, so a call
+    admitted while closed that finishes after the circuit went half-open is
+    not taken for a trial.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window_seconds: float = 30.0,
+        min_calls: int = 20,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 2.0,
+        open_seconds: float = 15.0,
+        half_open_calls: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self._window = window_seconds
+        self._min_calls = min_calls
+        self._failure_rate = failure_rate
+        self._slow = slow_call_seconds
+        self._open_seconds = open_seconds
+        self._half_open_calls = half_open_calls
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._buckets: deque[list[int]] = deque()  # [second, calls, failures]
+        self._calls = 0
+        self._failures = 0
+        self._state = CLOSED
+        self._generation = 0
+        self._opened_at = -math.inf
+        self._trials_started = 0
+        self._trials_passed = 0
+        self._gauge = circuit_state.labels(upstream=name)
+        self._gauge.set(STATE_VALUES[CLOSED])
+
+    @classmethod
+    def from_config(cls, name: str, cfg: GatewayConfig) -> CircuitBreaker:
+        return cls(
+            name,
+            window_seconds=cfg.breaker_window_seconds,
+            min_calls=cfg.breaker_min_calls,
+            failure_rate=cfg.breaker_failure_rate,
+            slow_call_seconds=cfg.breaker_slow_call_seconds,
+            open_seconds=cfg.breaker_open_seconds,
+            half_open_calls=cfg.breaker_half_open_calls,
+        )
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance(self._clock())
+            return self._state
+
+    def acquire(self) -> int:
+        """Admit one call or raise ``CircuitOpenError``; pass the returned generation to ``record`` or ``cancel``."""
+        now = self._clock()
+        with self._lock:
+            self._advance(now)
+            if self._state == CLOSED:
+                return self._generation
+            if self._state == HALF_OPEN and self._trials_started < self._half_open_calls:
+                self._trials_started += 1
+                return self._generation
+            retry_after = max(0.0, self._opened_at + self._open_seconds - now)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record(self, generation: int, success: bool, elapsed: float) -> None:
+        ok = success and elapsed < self._slow
+        now = self._clock()
+        with self._lock:
+            if generation != self._generation:
+                return  # decided under a state that has since changed
+            if self._state == HALF_OPEN:
+                if not ok:
+                    self._set_state(OPEN, now)
+                    return
+                self._trials_passed += 1
+                if self._trials_passed >= self._half_open_calls:
+                    self._set_state(CLOSED, now)
+                return
+            if self._state == OPEN:
+                return
+            self._add(now, ok)
+            if self._calls >= self._min_calls and self._failures >= self._failure_rate * self._calls:
+                self._set_state(OPEN, now)
+
+    def cancel(self, generation: int) -> None:
+        """Give back an admitted call that never reached the upstream (e.g. a client-side error)."""
+        with self._lock:
+            if generation != self._generation:
+                return
+            if self._state == HALF_OPEN and self._trials_started > self._trials_passed:
+                self._trials_started -= 1
+
+    def _add(self, now: float, ok: bool) -> None:
+        second = int(now)
+        if self._buckets and self._buckets[-1][0] == second:
+            bucket = self._buckets[-1]
+        else:
+            bucket = [second, 0, 0]
+            self._buckets.append(bucket)
+        bucket[1] += 1
+        self._calls += 1
+        if not ok:
+            bucket[2] += 1
+            self._failures += 1
+        self._expire(now)
+
+    def _expire(self, now: float) -> None:
+        horizon = now - self._window
+        while self._buckets and self._buckets[0][0] < horizon:
+            _, calls, failures = self._buckets.popleft()
+            self._calls -= calls
+            self._failures -= failures
+
+    def _advance(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self._open_seconds:
+            self._set_state(HALF_OPEN, now)
+
+    def _set_state(self, state: str, now: float) -> None:
+        self._state = state
+        self._generation += 1
+        self._trials_started = self._trials_passed = 0
+        if state == OPEN:
+            self._opened_at = now
+        elif state == CLOSED:
+            self._buckets.clear()
+            self._calls = self._failures = 0
+        self._gauge.set(STATE_VALUES[state])
+
+
+class BreakerRegistry:
+    """One ``CircuitBreaker`` per upstream origin, created on first use."""
+
+    def __init__(self, factory: Callable[[str], CircuitBreaker]) -> None:
+        self._factory = factory
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig) -> BreakerRegistry:
+        return cls(lambda name: CircuitBreaker.from_config(name, cfg))
+
+    def get(self, origin: str) -> CircuitBreaker:
+        breaker = self._breakers.get(origin)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(origin)
+                if breaker is None:
+                    breaker = self._breakers[origin] = self._factory(origin)
+        return breaker
+
+    def states(self) -> dict[str, str]:
+        return {origin: breaker.state for origin, breaker in list(self._breakers.items())}
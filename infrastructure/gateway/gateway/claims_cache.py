@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+import hashlib
+import threading
+import time
+from typing import Any
+
+from gateway.config import GatewayConfig
+from gateway.principal import Principal
+from gateway.shared_cache import SharedCache
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+@dataclass(frozen=True)
+class CachedClaims:
+    claims: dict[str, Any]
+    kid: str | None
+    expires_at: float
+    principal: Principal | None = None
+
+
+class ClaimsCache:
+    """Bounded LRU of already-verified token claims keyed by SHA-256(token).
+
+    Entries expire at ``min(exp, verified_at + ttl_seconds)`` so a cached token
+    is never accepted past its own expiry. The raw token is never stored.
+
+    With a ``shared`` store (several worker processes) a local miss is looked
+    up there before the token is verified again, and every verified token is
+    published to it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.time,
+        shared: SharedCache | None = None,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._shared = shared
+        self._entries: OrderedDict[bytes, CachedClaims] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig, shared: SharedCache | None = None) -> ClaimsCache:
+        return cls(max_entries=cfg.claims_cache_max_entries, ttl_seconds=cfg.claims_cache_ttl_seconds, shared=shared)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: bytes) -> CachedClaims | None:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[digest]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry
+        published = self._shared.get_claims(digest) if self._shared is not None else None
+        with self._lock:
+            if published is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            claims, kid, expires_at = published
+            entry = CachedClaims(claims=claims, kid=kid, expires_at=expires_at)
+            self._store(digest, entry)
+            return entry
+
+    def put(self, digest: bytes, claims: dict[str, Any], kid: str | None) -> None:
+        if self._max_entries <= 0:
+            return
+        now = self._clock()
+        expires_at = now + self._ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now:
+            return
+        with self._lock:
+            self._store(digest, CachedClaims(claims=claims, kid=kid, expires_at=expires_at))
+        if self._shared is not None:
+            self._shared.put_claims(digest, claims, kid, expires_at)
+
+    def _store(self, digest: bytes, entry: CachedClaims) -> None:
+        self._entries[digest] = entry
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def attach_principal(self, digest: bytes, principal: Principal) -> None:
+        """Store the group index result next to the claims it was derived from."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries[digest] = replace(entry, principal=principal)
+
+    def discard(self, digest: bytes) -> None:
+        # Local only: every worker re-checks the kid of a shared entry against its own keyset.
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class RejectedTokenCache:
+    """Bounded LRU of digests of tokens that recently failed validation.
+
+    A token that was malformed, expired, wrongly issued or badly signed will
+    fail the same way again, so repeats are refused on a dict lookup instead of
+    being parsed and verified each time. Entries live for ``ttl_seconds``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[bytes, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig) -> RejectedTokenCache:
+        return cls(max_entries=cfg.negative_cache_max_entries, ttl_seconds=cfg.negative_cache_ttl_seconds)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, digest: bytes) -> bool:
+        now = self._clock()
+        with self._lock:
+            expires_at = self._entries.get(digest)
+            if expires_at is None:
+                return False
+            if expires_at <= now:
+                del self._entries[digest]
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, digest: bytes) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = self._clock() + self._ttl
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
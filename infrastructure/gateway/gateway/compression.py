@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Iterable, Iterator
+import time
+from typing import Any
+import zlib
+
+from gateway.config import GatewayConfig
+from gateway.metrics import (
+    COMPRESSION_ENCODINGS,
+    COMPRESSION_SKIPS,
+    compressed_responses_total,
+    compression_bytes_saved_total,
+    compression_cpu_seconds_total,
+    compression_input_bytes_total,
+    compression_output_bytes_total,
+    compression_skipped_total,
+)
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
+
+# Brotli qualities run 0-11; COMPRESSION_LEVEL is on the gzip 1-9 scale and
+# maps onto the same relative position so one setting tunes both.
+_BROTLI_MAX_QUALITY = 11
+_NO_BODY_STATUSES = frozenset({204, 304})
+
+
+def available_encodings(requested: Iterable[str]) -> tuple[str, ...]:
+    """``requested`` in preference order, minus unknown codings and ``br`` without the brotli module."""
+    return tuple(
+        encoding
+        for encoding in requested
+        if encoding in COMPRESSION_ENCODINGS and (encoding != "br" or brotli is not None)
+    )
+
+
+def _accepted(accept_encoding: str) -> dict[str, float]:
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate(accept_encoding: str | None, offered: tuple[str, ...]) -> str | None:
+    """Highest-q coding the client accepts among ``offered``; ties go to the gateway's order."""
+    if not accept_encoding or not offered:
+        return None
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in offered:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionPolicy:
+    """When and how the gateway compresses proxied responses.
+
+    A response is compressed when the client accepts an offered coding, the
+    upstream did not encode it already, its media type is in the allowlist
+    and its declared ``Content-Length`` is at least ``min_bytes``. Chunked
+    responses of unknown length are compressed, because checking their size
+    would mean buffering them.
+    """
+
+    def __init__(
+        self,
+        encodings: tuple[str, ...],
+        min_bytes: int = 1024,
+        level: int = 5,
+        content_types: Iterable[str] = (),
+    ) -> None:
+        self.encodings = available_encodings(encodings)
+        self.min_bytes = min_bytes
+        self.level = level
+        self.content_types = frozenset(content_types)
+        self._skipped = {reason: compression_skipped_total.labels(reason=reason) for reason in COMPRESSION_SKIPS}
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig) -> CompressionPolicy | None:
+        """``None`` (responses relayed as-is) when no usable coding is configured."""
+        policy = cls(
+            cfg.compression_encodings, cfg.compression_min_bytes, cfg.compression_level, cfg.compression_content_types
+        )
+        return policy if policy.encodings else None
+
+    def _skip(self, reason: str) -> None:
+        self._skipped[reason].inc()
+
+    def choose(
+        self, accept_encoding: str | None, method: str, status: int, headers: Iterable[tuple[str, str]]
+    ) -> str | None:
+        """The coding to apply to this response, or ``None`` to relay it unchanged."""
+        if method == "HEAD" or status < 200 or status in _NO_BODY_STATUSES:
+            self._skip("no_body")
+            return None
+        encoding = negotiate(accept_encoding, self.encodings)
+        if encoding is None:
+            self._skip("not_accepted")
+            return None
+        content_type = content_encoding = content_length = cache_control = ""
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered == "content-type":
+                content_type = value
+            elif lowered == "content-encoding":
+                content_encoding = value
+            elif lowered == "content-length":
+                content_length = value
+            elif lowered == "cache-control":
+                cache_control = value
+        if content_encoding.strip().lower() not in ("", "identity") or "no-transform" in cache_control.lower():
+            self._skip("already_encoded")
+            return None
+        if content_type.partition(";")[0].strip().lower() not in self.content_types:
+            self._skip("content_type")
+            return None
+        if content_length.strip().isdigit() and int(content_length) < self.min_bytes:
+            self._skip("below_threshold")
+            return None
+        return encoding
+
+    def compressor(self, encoding: str) -> StreamCompressor:
+        return StreamCompressor(encoding, self.level)
+
+
+def compressed_headers(headers: Iterable[tuple[str, str]], encoding: str) -> list[tuple[str, str]]:
+    """Response headers for the compressed representation.
+
+    ``Content-Length`` is dropped (the body is now chunked), ``Vary`` gains
+    ``Accept-Encoding`` and a strong ``ETag`` is weakened, since the bytes no
+    longer match what the upstream tagged.
+    """
+    result = []
+    vary = None
+    for name, value in headers:
+        lowered = name.lower()
+        if lowered in ("content-length", "content-encoding"):
+            continue
+        if lowered == "vary":
+            vary = value
+            continue
+        if lowered == "etag" and not value.startswith("W/"):
+            value = f"W/{value}"
+        result.append((name, value))
+    if vary is None:
+        vary = "Accept-Encoding"
+    elif vary.strip() != "*" and "accept-encoding" not in vary.lower():
+        vary = f"{vary}, Accept-Encoding"
+    result.append(("Vary", vary))
+    result.append(("Content-Encoding", encoding))
+    return result
+
+
+class StreamCompressor:
+    """Incremental gzip or brotli encoder that counts bytes and thread CPU time.
+
+    Output is produced as the compressor's window fills rather than after the
+    whole body is seen, so memory stays bounded by the coding's window.
+    ``record`` publishes the counters once, whether or not the stream finished.
+    """
+
+    def __init__(self, encoding: str, level: int) -> None:
+        self.encoding = encoding
+        self._encoder: Any
+        if encoding == "br":
+            quality = round(level * _BROTLI_MAX_QUALITY / 9)
+            self._encoder = brotli.Compressor(quality=quality)
+            self._process, self._finish = self._encoder.process, self._encoder.finish
+        else:
+            self._encoder = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._process, self._finish = self._encoder.compress, self._encoder.flush
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        self._recorded = False
+
+    def compress(self, chunk: bytes) -> bytes:
+        started = time.thread_time()
+        output = self._process(chunk)
+        self.cpu_seconds += time.thread_time() - started
+        self.bytes_in += len(chunk)
+        self.bytes_out += len(output)
+        return output
+
+    def finish(self) -> bytes:
+        started = time.thread_time()
+        output = self._finish()
+        self.cpu_seconds += time.thread_time() - started
+        self.bytes_out += len(output)
+        return output
+
+    def record(self) -> None:
+        if self._recorded:
+            return
+        self._recorded = True
+        compressed_responses_total.labels(encoding=self.encoding).inc()
+        compression_input_bytes_total.labels(encoding=self.encoding).inc(self.bytes_in)
+        compression_output_bytes_total.labels(encoding=self.encoding).inc(self.bytes_out)
+        compression_bytes_saved_total.labels(encoding=self.encoding).inc(max(0, self.bytes_in - self.bytes_out))
+        compression_cpu_seconds_total.labels(encoding=self.encoding).inc(self.cpu_seconds)
+
+
+def compress_chunks(chunks: Iterator[bytes], compressor: StreamCompressor) -> Iterator[bytes]:
+    try:
+        for chunk in chunks:
+            output = compressor.compress(chunk)
+            if output:
+                yield output
+        yield compressor.finish()
+    finally:
+        compressor.record()
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()  # release the upstream connection if the client went away
+
+
+async def compress_async_chunks(chunks: AsyncIterator[bytes], compressor: StreamCompressor) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in chunks:
+            output = compressor.compress(chunk)
+            if output:
+                yield output
+        yield compressor.finish()
+    finally:
+        compressor.record()
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
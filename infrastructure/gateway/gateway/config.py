@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+import os
+
+
+SERVER_MODES = ("sync", "async")
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/ld+json",
+    "application/xml",
+    "text/plain",
+    "text/csv",
+    "text/html",
+    "image/svg+xml",
+)
+RESPONSE_CACHE_ROUTES = ("/graph/nodes", "/graph/edges", "/graph/mindmap", "/search/query")
+
+
+@dataclass(frozen=True)
+class GatewayConfig:
+    upstream_url: str
+    issuer: str
+    audience: str | None
+    server_mode: str = "sync"
+    bind_host: str = "0.0.0.0"
+    bind_port: int = 8081
+    workers: int = 1
+    shared_cache_dir: str = ""
+    upstream_pool_max_connections: int = 100
+    upstream_pool_max_per_host: int = 20
+    upstream_connect_timeout_seconds: float = 2.0
+    upstream_read_timeout_seconds: float = 5.0
+    upstream_keepalive_seconds: float = 30.0
+    jwks_cache_ttl_seconds: float = 900.0
+    jwks_refresh_ahead_seconds: float = 60.0
+    jwks_min_refetch_interval_seconds: float = 10.0
+    jwks_max_stale_seconds: float = 3600.0
+    claims_cache_max_entries: int = 10000
+    claims_cache_ttl_seconds: float = 300.0
+    allowed_algs: tuple[str, ...] = ("RS256",)
+    clock_skew_seconds: float = 60.0
+    negative_cache_max_entries: int = 10000
+    negative_cache_ttl_seconds: float = 60.0
+    policy_dir: str = "/opt/gateway/config"
+    policy_reload_interval_seconds: float = 5.0
+    upstream_routes: Mapping[str, str] = field(default_factory=dict)
+    proxy_max_body_bytes: int = 100 * 1024 * 1024
+    proxy_chunk_bytes: int = 64 * 1024
+    ingest_spool_dir: str = ""
+    ingest_max_body_bytes: int = 2 * 1024 * 1024 * 1024
+    authz_batch_max_checks: int = 1000
+    trusted_proxies: tuple[str, ...] = ()
+    forwarded_headers_enabled: bool = False
+    compression_encodings: tuple[str, ...] = ("br", "gzip")
+    compression_min_bytes: int = 1024
+    compression_level: int = 5
+    compression_content_types: tuple[str, ...] = COMPRESSIBLE_TYPES
+    response_cache_routes: tuple[str, ...] = RESPONSE_CACHE_ROUTES
+    response_cache_ttl_seconds: float = 10.0
+    response_cache_max_entries: int = 1024
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    response_cache_max_body_bytes: int = 1024 * 1024
+    breaker_window_seconds: float = 30.0
+    breaker_min_calls: int = 20
+    breaker_failure_rate: float = 0.5
+    breaker_slow_call_seconds: float = 2.0
+    breaker_open_seconds: float = 15.0
+    breaker_half_open_calls: int = 3
+    upstream_health_cache_seconds: float = 2.0
+    readiness_probe_interval_seconds: float = 5.0
+    internal_assertion_key: str | None = field(default=None, repr=False)
+    internal_assertion_ttl_seconds: float = 30.0
+    audit_sink: str = ""
+    audit_queue_max_events: int = 10000
+    audit_batch_max_events: int = 500
+    audit_flush_interval_seconds: float = 1.0
+    audit_overflow: str = "drop"
+    audit_spill_path: str = ""
+    audit_block_timeout_seconds: float = 0.05
+
+    def upstream_for(self, family: str) -> str:
+        return self.upstream_routes.get(family, self.upstream_url)
+
+
+def _parse_routes(raw: str) -> dict[str, str]:
+    """Parse ``family=url,family=url`` (e.g. ``search=http://search:8000``)."""
+    routes: dict[str, str] = {}
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        family, sep, url = item.partition("=")
+        if not sep or not family.strip() or not url.strip():
+            raise ValueError(f"UPSTREAM_ROUTES entry must look like family=url, got {item!r}")
+        routes[family.strip()] = url.strip()
+    return routes
+
+
+def _parse_list(raw: str) -> tuple[str, ...]:
+    return tuple(item.strip().lower() for item in raw.split(",") if item.strip())
+
+
+def load_config() -> GatewayConfig:
+    server_mode = os.getenv("GATEWAY_SERVER_MODE", "sync").strip().lower()
+    if server_mode not in SERVER_MODES:
+        raise ValueError(f"GATEWAY_SERVER_MODE must be one of {SERVER_MODES}, got {server_mode!r}")
+    compression_level = int(os.getenv("COMPRESSION_LEVEL", "5"))
+    if not 1 <= compression_level <= 9:
+        raise ValueError(f"COMPRESSION_LEVEL must be between 1 and 9, got {compression_level}")
+    workers = int(os.getenv("GATEWAY_WORKERS", "1"))
+    if workers < 1:
+        raise ValueError(f"GATEWAY_WORKERS must be at least 1, got {workers}")
+
+    return GatewayConfig(
+        upstream_url=os.getenv("UPSTREAM_URL", "http://reference-app:5000"),
+        issuer=os.getenv("KEYCLOAK_ISSUER", "http://keycloak:8080/realms/master"),
+        audience=os.getenv("KEYCLOAK_AUDIENCE") or None,
+        server_mode=server_mode,
+        bind_host=os.getenv("GATEWAY_BIND_HOST", "0.0.0.0"),
+        bind_port=int(os.getenv("GATEWAY_BIND_PORT", "8081")),
+        workers=workers,
+        shared_cache_dir=os.getenv("GATEWAY_SHARED_CACHE_DIR", ""),
+        upstream_pool_max_connections=int(os.getenv("UPSTREAM_POOL_MAX_CONNECTIONS", "100")),
+        upstream_pool_max_per_host=int(os.getenv("UPSTREAM_POOL_MAX_PER_HOST", "20")),
+        upstream_connect_timeout_seconds=float(os.getenv("UPSTREAM_CONNECT_TIMEOUT_SECONDS", "2")),
+        upstream_read_timeout_seconds=float(os.getenv("UPSTREAM_READ_TIMEOUT_SECONDS", "5")),
+        upstream_keepalive_seconds=float(os.getenv("UPSTREAM_KEEPALIVE_SECONDS", "30")),
+        jwks_cache_ttl_seconds=float(os.getenv("JWKS_CACHE_TTL_SECONDS", "900")),
+        jwks_refresh_ahead_seconds=float(os.getenv("JWKS_REFRESH_AHEAD_SECONDS", "60")),
+        jwks_min_refetch_interval_seconds=float(os.getenv("JWKS_MIN_REFETCH_INTERVAL_SECONDS", "10")),
+        jwks_max_stale_seconds=float(os.getenv("JWKS_MAX_STALE_SECONDS", "3600")),
+        claims_cache_max_entries=int(os.getenv("CLAIMS_CACHE_MAX_ENTRIES", "10000")),
+        claims_cache_ttl_seconds=float(os.getenv("CLAIMS_CACHE_TTL_SECONDS", "300")),
+        allowed_algs=tuple(alg.strip() for alg in os.getenv("JWT_ALLOWED_ALGS", "RS256").split(",") if alg.strip()),
+        clock_skew_seconds=float(os.getenv("JWT_CLOCK_SKEW_SECONDS", "60")),
+        negative_cache_max_entries=int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", "10000")),
+        negative_cache_ttl_seconds=float(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", "60")),
+        policy_dir=os.getenv("GATEWAY_POLICY_DIR", "/opt/gateway/config"),
+        policy_reload_interval_seconds=float(os.getenv("POLICY_RELOAD_INTERVAL_SECONDS", "5")),
+        upstream_routes=_parse_routes(os.getenv("UPSTREAM_ROUTES", "")),
+        proxy_max_body_bytes=int(os.getenv("PROXY_MAX_BODY_BYTES", str(100 * 1024 * 1024))),
+        proxy_chunk_bytes=int(os.getenv("PROXY_CHUNK_BYTES", str(64 * 1024))),
+        ingest_spool_dir=os.getenv("INGEST_SPOOL_DIR", ""),
+        ingest_max_body_bytes=int(os.getenv("INGEST_MAX_BODY_BYTES", str(2 * 1024 * 1024 * 1024))),
+        authz_batch_max_checks=int(os.getenv("AUTHZ_BATCH_MAX_CHECKS", "1000")),
+        trusted_proxies=tuple(ip.strip() for ip in os.getenv("TRUSTED_PROXY_IP", "").split(",") if ip.strip()),
+        forwarded_headers_enabled=os.getenv("FORWARDED_HEADERS_ENABLED", "false").strip().lower() == "true",
+        compression_encodings=_parse_list(os.getenv("COMPRESSION_ENCODINGS", "br,gzip")),
+        compression_min_bytes=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")),
+        compression_level=compression_level,
+        compression_content_types=_parse_list(os.getenv("COMPRESSION_CONTENT_TYPES", ",".join(COMPRESSIBLE_TYPES))),
+        response_cache_routes=tuple(
+            route.strip()
+            for route in os.getenv("RESPONSE_CACHE_ROUTES", ",".join(RESPONSE_CACHE_ROUTES)).split(",")
+            if route.strip()
+        ),
+        response_cache_ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "10")),
+        response_cache_max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024")),
+        response_cache_max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        response_cache_max_body_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BODY_BYTES", str(1024 * 1024))),
+        breaker_window_seconds=float(os.getenv("UPSTREAM_BREAKER_WINDOW_SECONDS", "30")),
+        breaker_min_calls=int(os.getenv("UPSTREAM_BREAKER_MIN_CALLS", "20")),
+        breaker_failure_rate=float(os.getenv("UPSTREAM_BREAKER_FAILURE_RATE", "0.5")),
+        breaker_slow_call_seconds=float(os.getenv("UPSTREAM_BREAKER_SLOW_CALL_SECONDS", "2")),
+        breaker_open_seconds=float(os.getenv("UPSTREAM_BREAKER_OPEN_SECONDS", "15")),
+        breaker_half_open_calls=int(os.getenv("UPSTREAM_BREAKER_HALF_OPEN_CALLS", "3")),
+        upstream_health_cache_seconds=float(os.getenv("UPSTREAM_HEALTH_CACHE_SECONDS", "2")),
+        readiness_probe_interval_seconds=float(os.getenv("READINESS_PROBE_INTERVAL_SECONDS", "5")),
+        internal_assertion_key=os.getenv("INTERNAL_ASSERTION_KEY") or None,
+        internal_assertion_ttl_seconds=float(os.getenv("INTERNAL_ASSERTION_TTL_SECONDS", "30")),
+        audit_sink=os.getenv("AUDIT_SINK", ""),
+        audit_queue_max_events=int(os.getenv("AUDIT_QUEUE_MAX_EVENTS", "10000")),
+        audit_batch_max_events=int(os.getenv("AUDIT_BATCH_MAX_EVENTS", "500")),
+        audit_flush_interval_seconds=float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1")),
+        audit_overflow=os.getenv("AUDIT_OVERFLOW", "drop").strip().lower(),
+        audit_spill_path=os.getenv("AUDIT_SPILL_PATH", ""),
+        audit_block_timeout_seconds=float(os.getenv("AUDIT_BLOCK_TIMEOUT_SECONDS", "0.05")),
+    )
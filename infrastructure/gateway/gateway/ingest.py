@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import tempfile
+import threading
+import time
+from typing import Any
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+import yaml
+
+from gateway.config import GatewayConfig
+from gateway.shared_cache import SharedCache
+
+INGEST_QUOTAS_FILE = "ingest-quotas.yaml"
+UPLOAD_FIELD = "file"
+# Bounds the parser's own buffer (part headers, boundary search); file bytes pass through.
+MULTIPART_BUFFER_BYTES = 1024 * 1024
+# Larger incoming chunks are handed to the parser in slices of this size so its buffer stays bounded.
+_FEED_BYTES = 64 * 1024
+_PROJECT_CODE = re.compile(r"[A-Z0-9][A-Z0-9-]*")
+_BLOB_NAME = re.compile(r"[0-9a-f]{64}")
+_TEMP_PREFIX = ".upload-"
+
+
+class IngestError(Exception):
+    """Upload refused; ``error`` and ``status`` become the JSON error response."""
+
+    def __init__(self, error: str, status: int) -> None:
+        super().__init__(error)
+        self.error = error
+        self.status = status
+
+
+@dataclass(frozen=True)
+class Quota:
+    max_project_bytes: int | None = None
+    max_file_bytes: int | None = None
+
+
+@dataclass(frozen=True)
+class IngestQuotas:
+    default: Quota
+    projects: Mapping[str, Quota]
+
+    def for_project(self, code: str) -> Quota:
+        return self.projects.get(code, self.default)
+
+
+def _quota(name: str, spec: Mapping[str, Any], base: Quota) -> Quota:
+    values = {}
+    for key in ("max_project_bytes", "max_file_bytes"):
+        value = spec.get(key, getattr(base, key))
+        if value is not None and int(value) <= 0:
+            raise ValueError(f"ingest-quotas: {name}: {key} must be > 0")
+        values[key] = int(value) if value is not None else None
+    return Quota(**values)
+
+
+def compile_ingest_quotas(config: Mapping[str, Any]) -> IngestQuotas:
+    default = _quota("defaults", config.get("defaults") or {}, Quota())
+    projects = {code: _quota(code, spec or {}, default) for code, spec in (config.get("projects") or {}).items()}
+    return IngestQuotas(default, projects)
+
+
+def load_ingest_quotas(policy_dir: str | Path) -> IngestQuotas | None:
+    """``ingest-quotas.yaml`` next to the policy files, or ``None`` (no quotas) when absent."""
+    path = Path(policy_dir) / INGEST_QUOTAS_FILE
+    if not path.is_file():
+        return None
+    return compile_ingest_quotas(yaml.safe_load(path.read_text(encoding="utf-8")) or {})
+
+
+def multipart_boundary(content_type: str) -> bytes:
+    mimetype, options = parse_options_header(content_type)
+    if mimetype != "multipart/form-data":
+        raise IngestError("unsupported_media_type", 415)
+    boundary = options.get("boundary", "")
+    if not boundary:
+        raise IngestError("invalid_multipart", 400)
+    return boundary.encode("latin-1")
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    project: str
+    sha256: str
+    size: int
+    filename: str | None
+    duplicate: bool
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "project": self.project,
+            "sha256": self.sha256,
+            "size": self.size,
+            "filename": self.filename,
+            "duplicate": self.duplicate,
+        }
+
+
+class IngestStore:
+    """Content-addressed upload spool: ``<root>/<PROJECT>/<sha256>`` plus ``<sha256>.receipts.jsonl``.
+
+    Project usage is the sum of stored blobs, scanned once per project and
+    then tracked in memory. In-flight uploads reserve bytes as they arrive, so
+    concurrent uploads cannot jointly overshoot a quota; ``commit`` decides
+    whether a finished upload is a duplicate and settles its charge in one
+    step, so identical concurrent uploads store and charge one copy.
+
+    With ``shared`` (several worker processes) usage and reservations live in
+    the shared store instead, so a quota holds across workers; the in-memory
+    tally is only used while that store is unusable.
+    """
+
+    def __init__(self, root: str | Path, shared: SharedCache | None = None) -> None:
+        self.root = Path(root)
+        self._shared = shared
+        self._lock = threading.Lock()
+        self._used: dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig, shared: SharedCache | None = None) -> IngestStore | None:
+        """``None`` (``/ingest/upload`` is relayed upstream) when ``INGEST_SPOOL_DIR`` is unset."""
+        if not cfg.ingest_spool_dir:
+            return None
+        return cls(cfg.ingest_spool_dir, shared)
+
+    def project_dir(self, project: str) -> Path:
+        if not _PROJECT_CODE.fullmatch(project):
+            raise IngestError("project_scope_required", 403)
+        path = self.root / project
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _scan(self, project: str) -> int:
+        total = 0
+        for entry in os.scandir(self.root / project):
+            if _BLOB_NAME.fullmatch(entry.name) and entry.is_file():
+                total += entry.stat().st_size
+        return total
+
+    def used(self, project: str) -> int:
+        if self._shared is not None:
+            used = self._shared.ingest_used(project, lambda: self._scan(project))
+            if used is not None:
+                return used
+        with self._lock:
+            if project not in self._used:
+                self._used[project] = self._scan(project)
+            return self._used[project]
+
+    def reserve(self, project: str, nbytes: int, limit: int | None) -> bool:
+        if self._shared is not None:
+            reserved = self._shared.reserve_ingest(project, nbytes, limit, lambda: self._scan(project))
+            if reserved is not None:
+                return reserved
+        with self._lock:
+            used = self._used.get(project)
+            if used is None:
+                used = self._used[project] = self._scan(project)
+            if limit is not None and used + nbytes > limit:
+                return False
+            self._used[project] = used + nbytes
+            return True
+
+    def _settle(self, project: str, nbytes: int, stored: bool) -> None:
+        if self._shared is not None and self._shared.settle_ingest(project, nbytes, stored):
+            return
+        if not stored:
+            self._used[project] = max(0, self._used.get(project, 0) - nbytes)
+
+    def release(self, project: str, nbytes: int) -> None:
+        with self._lock:
+            self._settle(project, nbytes, stored=False)
+
+    def commit(self, project: str, temp_path: Path, target: Path, nbytes: int) -> bool:
+        """Move a finished upload to ``target``; True (and its charge released) when it was already stored."""
+        with self._lock:
+            try:
+                # link() fails if the target exists, so the check and the store are one step.
+                os.link(temp_path, target)
+            except FileExistsError:
+                duplicate = True
+            else:
+                duplicate = False
+            temp_path.unlink()
+            self._settle(project, nbytes, stored=not duplicate)
+            return duplicate
+
+    def upload(self, project: str, boundary: bytes, quota: Quota, max_body_bytes: int) -> MultipartUpload:
+        return MultipartUpload(self, project, boundary, quota, max_body_bytes)
+
+
+class MultipartUpload:
+    """One ``multipart/form-data`` upload, parsed incrementally.
+
+    ``feed`` takes raw body chunks as they arrive (``None`` at the end). The
+    bytes of the ``file`` part go straight to a temp file in the project
+    directory and through SHA-256 in the same pass, so the stored bytes are
+    exactly the hashed bytes and memory stays at one chunk. ``finish``
+    renames the temp file to its digest and appends a receipt line; any
+    ``IngestError`` or ``abort`` removes the temp file and releases the
+    reserved quota.
+    """
+
+    def __init__(self, store: IngestStore, project: str, boundary: bytes, quota: Quota, max_body_bytes: int) -> None:
+        self._store = store
+        self.project = project
+        self._quota = quota
+        self._max_body_bytes = max_body_bytes
+        self._decoder = MultipartDecoder(boundary, max_form_memory_size=MULTIPART_BUFFER_BYTES)
+        self._dir = store.project_dir(project)
+        self._sha256 = hashlib.sha256()
+        self._handle: Any = None
+        self._temp_path: Path | None = None
+        self._in_file = False
+        self._files = 0
+        self._received = 0
+        self.size = 0
+        self.filename: str | None = None
+        self.done = False
+
+    def feed(self, chunk: bytes | None) -> None:
+        try:
+            if chunk is not None:
+                self._received += len(chunk)
+                if self._received > self._max_body_bytes:
+                    raise IngestError("request_body_too_large", 413)
+            if chunk is None:
+                self._decoder.receive_data(None)
+                self._drain()
+                return
+            view = memoryview(chunk)
+            for start in range(0, len(view), _FEED_BYTES):
+                self._decoder.receive_data(view[start : start + _FEED_BYTES])
+                self._drain()
+        except IngestError:
+            self.abort()
+            raise
+        except (ValueError, RequestEntityTooLarge):
+            self.abort()
+            raise IngestError("invalid_multipart", 400) from None
+
+    def _drain(self) -> None:
+        event = self._decoder.next_event()
+        while not isinstance(event, NeedData):
+            if isinstance(event, File) and event.name == UPLOAD_FIELD:
+                self._files += 1
+                if self._files > 1:
+                    raise IngestError("multiple_files", 400)
+                self.filename = event.filename
+                handle = tempfile.NamedTemporaryFile(dir=self._dir, prefix=_TEMP_PREFIX, delete=False)
+                self._handle, self._temp_path = handle, Path(handle.name)
+                self._in_file = True
+            elif isinstance(event, (Field, File)):
+                self._in_file = False  # other parts are read past, never stored
+            elif isinstance(event, Data):
+                if self._in_file:
+                    self._write(event.data)
+                    if not event.more_data:
+                        self._in_file = False
+            elif isinstance(event, Epilogue):
+                self.done = True
+                break
+            event = self._decoder.next_event()
+
+    def _write(self, data: bytes) -> None:
+        if not data:
+            return
+        if self._quota.max_file_bytes is not None and self.size + len(data) > self._quota.max_file_bytes:
+            raise IngestError("request_body_too_large", 413)
+        if not self._store.reserve(self.project, len(data), self._quota.max_project_bytes):
+            raise IngestError("ingest_quota_exceeded", 413)
+        self.size += len(data)
+        self._sha256.update(data)
+        self._handle.write(data)
+
+    def finish(self, metadata: Mapping[str, Any]) -> StoredUpload:
+        if not self.done:
+            self.abort()
+            raise IngestError("invalid_multipart", 400)
+        if self._temp_path is None:
+            self.abort()
+            raise IngestError("missing_file", 400)
+        self._handle.close()
+        digest = self._sha256.hexdigest()
+        # Same bytes already stored for this project: keep one copy and one quota charge.
+        duplicate = self._store.commit(self.project, self._temp_path, self._dir / digest, self.size)
+        self._temp_path = None
+        stored = StoredUpload(self.project, digest, self.size, self.filename, duplicate)
+        receipt = {**stored.as_dict(), "hash_algorithm": "SHA-256", "received_at": time.time(), **metadata}
+        with open(self._dir / f"{digest}.receipts.jsonl", "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(receipt, sort_keys=True) + "\n")
+        return stored
+
+    def abort(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+        if self._temp_path is not None:
+            self._temp_path.unlink(missing_ok=True)
+            self._temp_path = None
+            self._store.release(self.project, self.size)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+import math
+import threading
+import time
+from typing import Any
+
+import jwt
+import requests
+
+from gateway.config import GatewayConfig
+from gateway.metrics import cache_lookup, observe_stage
+from gateway.shared_cache import SharedCache
+from gateway.singleflight import SingleFlight
+
+
+def fetch_json(url: str, timeout: float) -> dict[str, Any]:
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+class JwksCache:
+    """TTL-bounded cache of the issuer's discovery document and signing keys.
+
+    - Keys are served from memory until ``ttl_seconds`` after the last good fetch.
+      A background thread (``start()``) refreshes ``refresh_ahead_seconds`` before
+      that so request threads normally never wait on the IdP.
+    - An unknown ``kid`` triggers at most one refetch per
+      ``min_refetch_interval_seconds``; concurrent callers (including the
+      background refresher) share that single fetch through ``SingleFlight``.
+    - If the IdP cannot be reached the last good keyset keeps being served for
+      up to ``max_stale_seconds`` past its TTL, then validation fails closed.
+    - With a ``shared`` store (several worker processes) fetches are
+      serialised across workers and published; a worker adopts a keyset
+      another worker fetched moments ago instead of asking the IdP again.
+    """
+
+    def __init__(
+        self,
+        issuer: str,
+        *,
+        ttl_seconds: float = 900.0,
+        refresh_ahead_seconds: float = 60.0,
+        min_refetch_interval_seconds: float = 10.0,
+        max_stale_seconds: float = 3600.0,
+        fetch_timeout_seconds: float = 5.0,
+        fetcher: Callable[[str, float], dict[str, Any]] = fetch_json,
+        clock: Callable[[], float] = time.monotonic,
+        shared: SharedCache | None = None,
+    ) -> None:
+        self.issuer = issuer
+        self._ttl = ttl_seconds
+        self._refresh_ahead = min(refresh_ahead_seconds, ttl_seconds / 2)
+        self._min_interval = min_refetch_interval_seconds
+        self._max_stale = max_stale_seconds
+        self._timeout = fetch_timeout_seconds
+        self._fetcher = fetcher
+        self._clock = clock
+        self._shared = shared
+
+        self._flight = SingleFlight("jwks")
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._jwks_uri: str | None = None
+        self._fetched_at: float | None = None
+        self._fetched_wall: float | None = None
+        self._last_attempt = -math.inf
+        self._generation = 0
+
+        self.fetch_count = 0
+        self.last_error: str | None = None
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig, shared: SharedCache | None = None) -> JwksCache:
+        return cls(
+            cfg.issuer,
+            ttl_seconds=cfg.jwks_cache_ttl_seconds,
+            refresh_ahead_seconds=cfg.jwks_refresh_ahead_seconds,
+            min_refetch_interval_seconds=cfg.jwks_min_refetch_interval_seconds,
+            max_stale_seconds=cfg.jwks_max_stale_seconds,
+            shared=shared,
+        )
+
+    @property
+    def max_age_seconds(self) -> float:
+        """Age past which the cached keyset is no longer served."""
+        return self._ttl + self._max_stale
+
+    def age_seconds(self) -> float | None:
+        if self._fetched_at is None:
+            return None
+        return self._clock() - self._fetched_at
+
+    def get_signing_key(self, kid: str | None) -> jwt.PyJWK:
+        generation = self._generation
+        age = self.age_seconds()
+        fresh = age is not None and age < self._ttl
+        if not fresh:
+            self._refresh(generation)
+
+        key = self._lookup(kid)
+        cache_lookup("jwks", hit=fresh and key is not None)
+        if key is None and kid is not None:
+            self._refresh(generation)
+            key = self._lookup(kid)
+
+        age = self.age_seconds()
+        if age is None:
+            raise jwt.PyJWKClientConnectionError(f"JWKS unavailable for issuer: {self.last_error}")
+        if age >= self.max_age_seconds:
+            raise jwt.PyJWKClientConnectionError("JWKS is stale beyond max_stale_seconds")
+        if key is None:
+            raise jwt.PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+        return key
+
+    def has_key(self, kid: str | None) -> bool:
+        """Cheap check used by the claims cache: is ``kid`` still published and usable?"""
+        age = self.age_seconds()
+        if age is None or age >= self.max_age_seconds:
+            return False
+        return self._lookup(kid) is not None
+
+    def _lookup(self, kid: str | None) -> jwt.PyJWK | None:
+        keys = self._keys
+        if kid is None:
+            return next(iter(keys.values())) if len(keys) == 1 else None
+        return keys.get(kid)
+
+    def _refresh(self, seen_generation: int) -> bool:
+        return self._flight.do("refresh", lambda: self._refresh_if_due(seen_generation))
+
+    def _refresh_if_due(self, seen_generation: int) -> bool:
+        if self._generation != seen_generation:
+            # Another caller refreshed after we looked; share its result.
+            return True
+        if self._clock() - self._last_attempt < self._min_interval:
+            return False
+        return self._fetch()
+
+    def _fetch(self) -> bool:
+        self._last_attempt = self._clock()
+        if self._shared is None:
+            return self._fetch_from_issuer()
+        with self._shared.lock("jwks"):
+            return self._adopt_published() or self._fetch_from_issuer()
+
+    def _adopt_published(self) -> bool:
+        """Take the keyset another worker published, if it is one we should not refetch."""
+        published = self._shared.get_jwks(self.issuer) if self._shared is not None else None
+        if published is None:
+            return False
+        document, fetched_wall = published
+        age = max(0.0, time.time() - fetched_wall)
+        if self._fetched_wall is None:
+            # A cold worker takes any keyset that is not yet due for refresh.
+            usable = age < self._ttl - self._refresh_ahead
+        else:
+            # Otherwise only one fetched after ours and within the refetch interval.
+            usable = fetched_wall > self._fetched_wall and age < max(self._min_interval, 1.0)
+        if not usable:
+            return False
+        try:
+            self._install(jwt.PyJWKSet.from_dict(document), age)
+        except jwt.PyJWTError:
+            return False
+        return True
+
+    def _fetch_from_issuer(self) -> bool:
+        self.fetch_count += 1
+        started = time.perf_counter()
+        try:
+            if self._jwks_uri is None:
+                metadata = self._fetcher(f"{self.issuer}/.well-known/openid-configuration", self._timeout)
+                self._jwks_uri = metadata["jwks_uri"]
+            document = self._fetcher(self._jwks_uri, self._timeout)
+            keyset = jwt.PyJWKSet.from_dict(document)
+        except Exception as exc:  # noqa: BLE001
+            # Re-run discovery next time in case the jwks_uri moved.
+            self._jwks_uri = None
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            return False
+        finally:
+            observe_stage("jwks_fetch", time.perf_counter() - started)
+
+        self._install(keyset, 0.0)
+        if self._shared is not None:
+            self._shared.put_jwks(self.issuer, document, self._fetched_wall)
+        return True
+
+    def _install(self, keyset: jwt.PyJWKSet, age: float) -> None:
+        self._keys = {key.key_id: key for key in keyset.keys if key.key_id and key.public_key_use in (None, "sig")}
+        self._fetched_at = self._clock() - age
+        self._fetched_wall = time.time() - age
+        self._generation += 1
+        self.last_error = None
+
+    def _next_refresh_delay(self) -> float:
+        age = self.age_seconds()
+        if age is None or self.last_error is not None:
+            return self._min_interval
+        return max(self._min_interval, self._ttl - self._refresh_ahead - age)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            age = self.age_seconds()
+            if age is None or age >= self._ttl - self._refresh_ahead:
+                self._refresh(self._generation)
+            self._stop.wait(self._next_refresh_delay())
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="jwks-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
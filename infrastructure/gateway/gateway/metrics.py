@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+import glob
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Every label value below comes from a fixed vocabulary so the series count is
+# bounded no matter what clients send; anything else is folded into "other".
+STAGES = (
+    "token_parse",
+    "signature_verify",
+    "jwks_fetch",
+    "policy_eval",
+    "upstream_connect",
+    "upstream_response",
+)
+CACHES = ("claims", "jwks", "rejected_tokens", "shared_claims", "responses")
+AUDIT_OUTCOMES = ("written", "dropped", "spilled", "failed")
+COMPRESSION_ENCODINGS = ("gzip", "br")
+COMPRESSION_SKIPS = ("not_accepted", "content_type", "below_threshold", "already_encoded", "no_body")
+TOKEN_REJECTIONS = frozenset(
+    {
+        "malformed",
+        "unsupported_alg",
+        "unknown_kid",
+        "expired",
+        "not_yet_valid",
+        "wrong_issuer",
+        "wrong_audience",
+        "missing_claim",
+        "bad_signature",
+        "recently_rejected",
+    }
+)
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+REJECTION_REASONS = frozenset(
+    {
+        "missing_bearer_token",
+        "invalid_token",
+        "policy_not_loaded",
+        "invalid_content_length",
+        "request_body_too_large",
+        "upstream_unavailable",
+        "upstream_timeout",
+        "upstream_circuit_open",
+        "rate_limited",
+        "unsupported_media_type",
+        "invalid_multipart",
+        "missing_file",
+        "multiple_files",
+        "ingest_quota_exceeded",
+        "invalid_batch",
+        "batch_too_large",
+        "no_matching_route_family",
+        "authentication_required",
+        "mfa_required",
+        "admin_allowlist_required",
+        "insufficient_platform_role",
+        "project_scope_required",
+        "unknown_project",
+        "insufficient_project_role",
+    }
+)
+UNMATCHED_ENDPOINT = "unmatched"
+
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Own registry: the gateway reuses the standard http_* names from
+# METRICS_INSTRUMENTATION.md without clashing with anything else in-process.
+REGISTRY = CollectorRegistry()
+
+# prometheus_client picks multiprocess mode from this variable when it is
+# imported: each worker then writes its values to <type>_<pid>.db files here
+# and render() merges them, so a scrape sees every worker, not the one that
+# answered. Files are created as metrics are defined, so the directory must exist first.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+if MULTIPROC_DIR is not None:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+http_requests_total = Counter(
+    "http_requests_total",
+    "Total HTTP requests",
+    ["endpoint", "method", "status"],
+    registry=REGISTRY,
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until response headers",
+    ["endpoint", "method"],
+    buckets=REQUEST_BUCKETS,
+    registry=REGISTRY,
+)
+stage_duration = Histogram(
+    "gateway_stage_duration_seconds",
+    "Latency of individual gateway hot-path stages",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+    registry=REGISTRY,
+)
+cache_requests_total = Counter(
+    "gateway_cache_requests_total",
+    "Claims, JWKS and response cache lookups",
+    ["cache", "result"],
+    registry=REGISTRY,
+)
+rejections_total = Counter(
+    "gateway_rejections_total",
+    "Requests refused by the gateway, by reason",
+    ["reason"],
+    registry=REGISTRY,
+)
+token_rejections_total = Counter(
+    "gateway_token_rejections_total",
+    "Bearer tokens refused during validation, by cause",
+    ["reason"],
+    registry=REGISTRY,
+)
+rate_limited_total = Counter(
+    "gateway_rate_limited_total",
+    "Requests refused by the per-principal rate limiter",
+    ["family"],
+    registry=REGISTRY,
+)
+rate_limit_buckets = Gauge(
+    "gateway_rate_limit_buckets",
+    "Token buckets currently held by the rate limiter",
+    multiprocess_mode="livemax",  # the shared store's count is the same in every worker
+    registry=REGISTRY,
+)
+circuit_state = Gauge(
+    "gateway_circuit_state",
+    "Upstream circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["upstream"],
+    multiprocess_mode="livemax",  # breakers are per worker; report the most open
+    registry=REGISTRY,
+)
+policy_reloads_total = Counter(
+    "gateway_policy_reloads_total",
+    "Policy directory reloads after a file change, by result (failure keeps the previous snapshot)",
+    ["result"],
+    registry=REGISTRY,
+)
+audit_events_total = Counter(
+    "gateway_audit_events_total",
+    "Audit events by outcome (written to the sink, dropped or failed, or spilled to disk)",
+    ["outcome"],
+    registry=REGISTRY,
+)
+audit_queue_depth = Gauge(
+    "gateway_audit_queue_depth",
+    "Audit events waiting in the in-memory queue at the last flush",
+    multiprocess_mode="livesum",
+    registry=REGISTRY,
+)
+audit_flush_duration = Histogram(
+    "gateway_audit_flush_duration_seconds",
+    "Time to render and write one audit batch",
+    buckets=STAGE_BUCKETS,
+    registry=REGISTRY,
+)
+compressed_responses_total = Counter(
+    "gateway_compressed_responses_total",
+    "Proxied responses compressed by the gateway, by content coding",
+    ["encoding"],
+    registry=REGISTRY,
+)
+compression_skipped_total = Counter(
+    "gateway_compression_skipped_total",
+    "Proxied responses relayed uncompressed, by reason",
+    ["reason"],
+    registry=REGISTRY,
+)
+compression_input_bytes_total = Counter(
+    "gateway_compression_input_bytes_total",
+    "Upstream bytes fed to the response compressor",
+    ["encoding"],
+    registry=REGISTRY,
+)
+compression_output_bytes_total = Counter(
+    "gateway_compression_output_bytes_total",
+    "Compressed bytes sent to clients",
+    ["encoding"],
+    registry=REGISTRY,
+)
+compression_bytes_saved_total = Counter(
+    "gateway_compression_bytes_saved_total",
+    "Input minus output bytes of compressed responses",
+    ["encoding"],
+    registry=REGISTRY,
+)
+compression_cpu_seconds_total = Counter(
+    "gateway_compression_cpu_seconds_total",
+    "Thread CPU time spent compressing responses",
+    ["encoding"],
+    registry=REGISTRY,
+)
+singleflight_calls = Counter(
+    "gateway_singleflight_calls_total",
+    "Calls through a single-flight group; role=coalesced shared another caller's fetch",
+    ["flight", "role"],
+    registry=REGISTRY,
+)
+
+_stages = {stage: stage_duration.labels(stage=stage) for stage in STAGES}
+_cache_results = {
+    (cache, result): cache_requests_total.labels(cache=cache, result=result)
+    for cache in CACHES
+    for result in ("hit", "miss")
+}
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    _stages[stage].observe(seconds)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stages[stage].observe(time.perf_counter() - started)
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    _cache_results[cache, "hit" if hit else "miss"].inc()
+
+
+def reject(reason: str) -> None:
+    rejections_total.labels(reason=reason if reason in REJECTION_REASONS else "other").inc()
+
+
+def reject_token(reason: str) -> None:
+    token_rejections_total.labels(reason=reason if reason in TOKEN_REJECTIONS else "other").inc()
+
+
+def observe_request(endpoint: str | None, method: str, status: int, seconds: float) -> None:
+    endpoint = endpoint or UNMATCHED_ENDPOINT
+    method = method if method in METHODS else "OTHER"
+    http_requests_total.labels(endpoint=endpoint, method=method, status=str(status)).inc()
+    http_request_duration.labels(endpoint=endpoint, method=method).observe(seconds)
+
+
+def render() -> tuple[bytes, str]:
+    if MULTIPROC_DIR is None:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, MULTIPROC_DIR)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def prepare_directory() -> None:
+    """Drop other processes' files left by a previous run, so totals restart with the gateway."""
+    if MULTIPROC_DIR is None:
+        return
+    own = f"_{os.getpid()}.db"
+    for name in glob.glob(os.path.join(MULTIPROC_DIR, "*.db")):
+        if not name.endswith(own):
+            os.remove(name)
+
+
+def worker_exited(pid: int) -> None:
+    """Retire a dead worker's live gauges; its counters and histograms keep counting towards the totals."""
+    if MULTIPROC_DIR is not None:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
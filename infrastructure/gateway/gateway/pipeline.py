@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from gateway.allowlist import client_address, trusted_proxies_from_config
+from gateway.assertion import AssertionSigner
+from gateway.audit import AuditEmitter, config_change_event, rbac_decision_event
+from gateway.auth import authenticate, extract_bearer_token
+from gateway.authz import BatchRequestError, batch_response, parse_checks
+from gateway.breaker import CircuitOpenError
+from gateway.claims_cache import ClaimsCache, RejectedTokenCache
+from gateway.compression import CompressionPolicy, compressed_headers
+from gateway.config import GatewayConfig
+from gateway.ingest import IngestError, IngestStore, MultipartUpload, Quota, multipart_boundary
+from gateway.jwks import JwksCache
+from gateway.policy import Decision, request_project_code
+from gateway.principal import Principal
+from gateway.proxy import CORRELATION_ID_HEADER, declared_length, forward_request_headers, upstream_target
+from gateway.readiness import Readiness
+from gateway.reload import PolicySnapshot, PolicyWatcher
+from gateway.response_cache import CacheKeys, CachedResponse, ResponseCache, if_none_match, not_modified_headers
+from gateway.shared_cache import SharedCache
+
+
+@dataclass(frozen=True)
+class Refusal:
+    """A request the gateway answers itself with ``{"error": error}``, plus ``Retry-After`` when set."""
+
+    error: str
+    status: int
+    retry_after: float | None = None
+
+
+@dataclass(frozen=True)
+class Incoming:
+    """The parts of a client request the pipeline reads, whichever framework received it."""
+
+    method: str
+    path: str
+    query_string: str
+    headers: Mapping[str, str]
+    query_params: Mapping[str, str]
+    remote_addr: str | None
+    request_id: str
+
+
+@dataclass(frozen=True)
+class Admission:
+    """A request that passed the gate, with everything it was decided under."""
+
+    snapshot: PolicySnapshot
+    principal: Principal | None
+    project_code: str | None
+    admin_allowlisted: bool
+    decision: Decision
+
+    @property
+    def subject(self) -> str | None:
+        return self.principal.subject if self.principal is not None else None
+
+
+@dataclass(frozen=True)
+class Reply:
+    """Status, headers and, unless it is a ``304``, the body and content coding of a response from the cache."""
+
+    status: int
+    headers: list[tuple[str, str]]
+    body: bytes
+    encoding: str | None
+
+
+def upstream_refusal(exc: Exception, body_exceeded: bool, timed_out: bool) -> Refusal:
+    """Map a failed upstream call (from either HTTP client) to the gateway's answer."""
+    if isinstance(exc, CircuitOpenError):
+        return Refusal("upstream_circuit_open", 503, exc.retry_after)
+    if body_exceeded:
+        return Refusal("request_body_too_large", 413)
+    if timed_out:
+        return Refusal("upstream_timeout", 504)
+    return Refusal("upstream_unavailable", 502)
+
+
+class Pipeline:
+    """The per-process gateway state and every decision made about a request.
+
+    ``app.py`` (Flask) and ``gateway/asgi.py`` (Starlette) each build one and
+    keep only framework glue: turning a request into an ``Incoming``, moving
+    body bytes, running blocking calls off the event loop, and rendering a
+    ``Refusal`` or ``Reply``. The upstream connection pool differs per mode
+    and stays with the entry point. Methods that may block (token
+    verification, rate-limit store, spool files) are marked as such.
+    """
+
+    def __init__(self, cfg: GatewayConfig) -> None:
+        self.config = cfg
+        self.shared_cache = SharedCache.from_config(cfg)
+        self.jwks_cache = JwksCache.from_config(cfg, self.shared_cache)
+        self.claims_cache = ClaimsCache.from_config(cfg, self.shared_cache)
+        self.rejected_tokens = RejectedTokenCache.from_config(cfg)
+        self.policy_watcher = PolicyWatcher.from_config(cfg, self.shared_cache)
+        self.assertion_signer = AssertionSigner.from_config(cfg)
+        self.trusted_proxies = trusted_proxies_from_config(cfg)
+        self.compression = CompressionPolicy.from_config(cfg)
+        self.response_cache = ResponseCache.from_config(cfg)
+        self.ingest_store = IngestStore.from_config(cfg, self.shared_cache)
+        self.audit = AuditEmitter.from_config(cfg)
+        if self.audit is not None:
+            audit = self.audit
+            self.policy_watcher.on_reload = lambda old, new: audit.emit(
+                config_change_event(old.version, new.version, cfg.policy_dir)
+            )
+        self.readiness = Readiness.from_config(cfg, self.jwks_cache, self.policy_watcher, self.audit)
+
+    def start(self) -> None:
+        """Start the background threads; call once per worker process, after any fork."""
+        self.jwks_cache.start()
+        self.policy_watcher.start()
+        if self.audit is not None:
+            self.audit.start()
+        self.readiness.start()
+
+    def stop(self) -> None:
+        self.readiness.stop()
+        self.policy_watcher.stop()
+        self.jwks_cache.stop()
+        if self.audit is not None:
+            self.audit.stop()
+
+    def admin_allowlisted(self, snapshot: PolicySnapshot, incoming: Incoming) -> bool:
+        address = client_address(incoming.remote_addr, incoming.headers.get("X-Forwarded-For"), self.trusted_proxies)
+        return snapshot.admin_allowlist.contains(address)
+
+    def gate(
+        self, incoming: Incoming, project_scoped: bool = True, allowlist: bool = True
+    ) -> tuple[Admission | Refusal, dict[str, Any] | None]:
+        """Authenticate, authorize and rate-limit; may block.
+
+        Returns the admission or refusal and the RBAC audit event to emit
+        (``None`` when auditing is off or no decision was reached). The
+        snapshot is read once, so the whole request is decided under one
+        policy version.
+        """
+        snapshot = self.policy_watcher.snapshot
+        policy = snapshot.policy
+        if policy is None:
+            return Refusal("policy_not_loaded", 403), None
+
+        principal = None
+        token = extract_bearer_token(incoming.headers.get("Authorization", ""))
+        if token is not None:
+            try:
+                _, principal = authenticate(
+                    token, self.config, self.jwks_cache, self.claims_cache, policy, self.rejected_tokens
+                )
+            except Exception:  # noqa: BLE001
+                return Refusal("invalid_token", 401), None
+
+        project_code = request_project_code(incoming.headers, incoming.query_params) if project_scoped else None
+        allowlisted = allowlist and self.admin_allowlisted(snapshot, incoming)
+        decision = policy.authorize(incoming.path, principal, project_code, allowlisted)
+        event = None
+        if self.audit is not None:
+            subject = principal.subject if principal is not None else None
+            event = rbac_decision_event(
+                decision,
+                subject,
+                incoming.remote_addr,
+                incoming.method,
+                incoming.path,
+                project_code,
+                policy.version,
+                incoming.request_id,
+            )
+        if not decision.allowed:
+            return Refusal(decision.reason, decision.status), event
+        limiter = snapshot.rate_limiter
+        if limiter is not None and principal is not None and decision.family is not None:
+            wait = limiter.acquire(principal.subject, decision.family)
+            if wait:
+                return Refusal("rate_limited", 429, wait), event
+        return Admission(snapshot, principal, project_code, allowlisted, decision), event
+
+    def whoami(self, admitted: Admission) -> dict[str, Any]:
+        return admitted.snapshot.policy.describe(admitted.principal)
+
+    def api_call(self, admitted: Admission, request_id: str) -> tuple[str | None, str | None, str] | None:
+        """What the entry point keeps for the ``data_access.api_call`` event; ``None`` when auditing is off."""
+        if self.audit is None:
+            return None
+        return admitted.subject, admitted.decision.family, request_id
+
+    @staticmethod
+    def body_length(incoming: Incoming, max_bytes: int) -> int | None | Refusal:
+        """The declared ``Content-Length`` (``None`` when absent), or the refusal for a bad or oversized one."""
+        try:
+            length = declared_length(incoming.headers)
+        except ValueError:
+            return Refusal("invalid_content_length", 400)
+        if length is not None and length > max_bytes:
+            return Refusal("request_body_too_large", 413)
+        return length
+
+    def authz_batch(self, admitted: Admission, body: bytes) -> dict[str, Any] | Refusal:
+        policy = admitted.snapshot.policy
+        try:
+            checks = parse_checks(body, self.config.authz_batch_max_checks)
+        except BatchRequestError as exc:
+            return Refusal(exc.error, exc.status)
+        bitmap = policy.authorize_batch(checks, admitted.principal, admitted.admin_allowlisted)
+        return batch_response(bitmap, len(checks), policy.version)
+
+    def cache_keys(self, incoming: Incoming, admitted: Admission) -> CacheKeys | None:
+        cache = self.response_cache
+        if cache is None or not cache.covers(incoming.method, incoming.path):
+            return None
+        version = admitted.snapshot.policy.version
+        return cache.key(admitted.principal, version, admitted.project_code, incoming.path, incoming.query_string)
+
+    def cached(self, keys: CacheKeys, admitted: Admission) -> CachedResponse | None:
+        return self.response_cache.get(keys, admitted.snapshot.generation)
+
+    def store(
+        self, keys: CacheKeys, admitted: Admission, headers: Iterable[tuple[str, str]], body: bytes
+    ) -> CachedResponse | None:
+        return self.response_cache.put(keys, admitted.snapshot.generation, headers, body)
+
+    def upstream_request(
+        self, incoming: Incoming, family: str, admitted: Admission, length: int | None, cached: bool
+    ) -> tuple[str, dict[str, str]]:
+        """URL and headers for the upstream hop, with the identity assertion bound to that URL and method."""
+        url = upstream_target(self.config.upstream_for(family), incoming.path, incoming.query_string)
+        assertion = None
+        if self.assertion_signer is not None and admitted.principal is not None:
+            identity = self.whoami(admitted)
+            assertion = self.assertion_signer.sign(identity, incoming.request_id, incoming.method, url)
+        # Cached bodies are stored identity-encoded; the gateway compresses them per client.
+        identity_upstream = self.compression is not None or cached
+        headers = forward_request_headers(
+            incoming.headers.items(), incoming.request_id, incoming.remote_addr, length, assertion, identity_upstream
+        )
+        return url, headers
+
+    def encoding_for(
+        self, incoming: Incoming, method: str, status: int, headers: list[tuple[str, str]]
+    ) -> tuple[str | None, list[tuple[str, str]]]:
+        """The content coding to apply (``None`` for none) and the response headers to send with it."""
+        if self.compression is None:
+            return None, headers
+        encoding = self.compression.choose(incoming.headers.get("Accept-Encoding"), method, status, headers)
+        if encoding is None:
+            return None, headers
+        return encoding, compressed_headers(headers, encoding)
+
+    def reply(self, incoming: Incoming, cached: CachedResponse) -> Reply:
+        """A stored (or just tagged) response, as a ``304`` when the client already holds it."""
+        headers = [*cached.response_headers(), (CORRELATION_ID_HEADER, incoming.request_id)]
+        encoding, headers = self.encoding_for(incoming, "GET", 200, headers)
+        if if_none_match(incoming.headers.get("If-None-Match"), cached.etag):
+            return Reply(304, not_modified_headers(headers, CORRELATION_ID_HEADER), b"", None)
+        return Reply(200, headers, cached.body, encoding)
+
+    def start_upload(self, incoming: Incoming, admitted: Admission) -> MultipartUpload | Refusal:
+        """Check scope, size and content type and open the spool file; may block."""
+        project_code = admitted.project_code
+        if project_code is None:
+            return Refusal("project_scope_required", 403)
+        quotas = admitted.snapshot.ingest_quotas
+        quota = quotas.for_project(project_code) if quotas is not None else Quota()
+        length = self.body_length(incoming, self.config.ingest_max_body_bytes)
+        if isinstance(length, Refusal):
+            return length
+        try:
+            boundary = multipart_boundary(incoming.headers.get("Content-Type", ""))
+            return self.ingest_store.upload(project_code, boundary, quota, self.config.ingest_max_body_bytes)
+        except IngestError as exc:
+            return Refusal(exc.error, exc.status)
+
+    @staticmethod
+    def finish_upload(upload: MultipartUpload, admitted: Admission, request_id: str) -> tuple[dict[str, Any], int]:
+        """Store a fully fed upload; the JSON body and status (``200`` for a duplicate). May block."""
+        stored = upload.finish({"sub": admitted.subject, "correlation_id": request_id})
+        return stored.as_dict(), 200 if stored.duplicate else 201
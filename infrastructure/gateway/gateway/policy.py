@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+import hashlib
+import json
+from pathlib import Path
+import time
+from typing import Any
+
+import yaml
+
+from gateway.metrics import observe_stage
+from gateway.principal import DEFAULT_MFA_AMR_VALUES, GroupIndex, Principal, role_bit, roles_at_or_above
+
+
+PROJECT_CODE_HEADER = "X-Project-Code"
+PROJECT_CODE_PARAM = "project"
+
+POLICY_FILES = {
+    "rbac": "rbac.yaml",
+    "policy_matrix": "policy-matrix.yaml",
+    "projects": "projects.yaml",
+}
+
+
+@dataclass(frozen=True)
+class RouteRule:
+    family: str
+    auth_required: bool
+    platform_role_mask: int
+    project_scoped: bool
+    min_project_rank: int
+    admin_allowlist_required: bool = False
+    mfa_required: bool = False
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    status: int
+    reason: str
+    family: str | None = None
+    elapsed_ns: int = 0
+
+
+class _Node:
+    __slots__ = ("children", "rule", "wildcard")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.rule: RouteRule | None = None
+        self.wildcard: RouteRule | None = None
+
+
+def _segments(path: str) -> list[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+class CompiledPolicy:
+    """Immutable, pre-compiled form of rbac.yaml + policy-matrix.yaml + projects.yaml.
+
+    Route lookup walks a segment trie (O(path segments)); platform role checks
+    are one AND against a precomputed bitmask and project role checks are one
+    dict lookup. Anything that does not match a route family, or cannot be
+    confidently authorized, is denied.
+    """
+
+    def __init__(
+        self,
+        root: _Node,
+        role_ranks: Mapping[str, int],
+        role_groups: tuple[tuple[int, frozenset[str]], ...],
+        project_role_ranks: Mapping[str, int],
+        project_codes: frozenset[str],
+        project_group_prefix: str,
+        groups_claim: str,
+        platform_admin_bypass: bool,
+        version: str,
+        mfa_amr_values: frozenset[str] = DEFAULT_MFA_AMR_VALUES,
+        mfa_acr_values: frozenset[str] = frozenset(),
+    ) -> None:
+        self._root = root
+        self.role_ranks = role_ranks
+        self.project_role_ranks = project_role_ranks
+        self.project_codes = project_codes
+        self.project_group_prefix = project_group_prefix
+        self.groups_claim = groups_claim
+        self.group_index = GroupIndex(
+            role_groups,
+            project_role_ranks,
+            project_codes,
+            project_group_prefix,
+            groups_claim,
+            version,
+            mfa_amr_values,
+            mfa_acr_values,
+        )
+        self._admin_bit = role_bit(max(role_ranks.values(), default=0))
+        self._role_names = {rank: name for name, rank in role_ranks.items()}
+        self._project_role_names = {rank: name for name, rank in project_role_ranks.items()}
+        self._platform_admin_bypass = platform_admin_bypass
+        self.version = version
+
+    def match(self, path: str) -> RouteRule | None:
+        node = self._root
+        wildcard = node.wildcard
+        for segment in _segments(path):
+            node = node.children.get(segment)
+            if node is None:
+                return wildcard
+            if node.wildcard is not None:
+                wildcard = node.wildcard
+        return node.rule or wildcard
+
+    def principal_from_claims(self, claims: Mapping[str, Any]) -> Principal:
+        return self.group_index.principal(claims)
+
+    def describe(self, principal: Principal) -> dict[str, Any]:
+        """Minimised view of the effective roles, as returned by ``/whoami``."""
+        return {
+            "sub": principal.subject,
+            "platform_role": self._role_names.get(principal.platform_rank),
+            "projects": {
+                code: self._project_role_names[rank] for code, rank in sorted(principal.project_roles.items())
+            },
+            "policy_version": self.version,
+        }
+
+    def authorize(
+        self,
+        path: str,
+        principal: Principal | None,
+        project_code: str | None = None,
+        admin_allowlisted: bool = False,
+    ) -> Decision:
+        started = time.perf_counter_ns()
+        allowed, status, reason, family = self._evaluate(path, principal, project_code, admin_allowlisted)
+        elapsed_ns = time.perf_counter_ns() - started
+        observe_stage("policy_eval", elapsed_ns / 1e9)
+        return Decision(allowed, status, reason, family, elapsed_ns)
+
+    def authorize_batch(
+        self,
+        checks: Iterable[tuple[str, str | None, str]],
+        principal: Principal | None,
+        admin_allowlisted: bool = False,
+    ) -> int:
+        """Evaluate ``(family, project_code, action)`` checks; bit ``i`` is set when check ``i`` is allowed.
+
+        A check stands for the path ``/<family>/<action>`` (``/<family>`` when
+        the action is empty) and is allowed when that path resolves to the
+        same family and ``authorize`` would allow it. Each distinct
+        ``(family, action)`` is looked up in the trie once per batch.
+        """
+        started = time.perf_counter_ns()
+        rules: dict[tuple[str, str], RouteRule | None] = {}
+        bitmap = 0
+        for index, (family, project_code, action) in enumerate(checks):
+            key = (family, action)
+            if key not in rules:
+                rule = self.match(f"/{family}/{action}" if action else f"/{family}")
+                rules[key] = rule if rule is not None and rule.family == family else None
+            rule = rules[key]
+            if rule is not None and self._check(rule, principal, project_code, admin_allowlisted)[0]:
+                bitmap |= 1 << index
+        observe_stage("policy_eval", (time.perf_counter_ns() - started) / 1e9)
+        return bitmap
+
+    def _evaluate(
+        self,
+        path: str,
+        principal: Principal | None,
+        project_code: str | None,
+        admin_allowlisted: bool,
+    ) -> tuple[bool, int, str, str | None]:
+        rule = self.match(path)
+        if rule is None:
+            return False, 403, "no_matching_route_family", None
+        return self._check(rule, principal, project_code, admin_allowlisted)
+
+    def _check(
+        self,
+        rule: RouteRule,
+        principal: Principal | None,
+        project_code: str | None,
+        admin_allowlisted: bool,
+    ) -> tuple[bool, int, str, str | None]:
+        if not rule.auth_required:
+            return True, 200, "public_route", rule.family
+        if principal is None:
+            return False, 401, "authentication_required", rule.family
+        if rule.mfa_required and not principal.mfa:
+            return False, 403, "mfa_required", rule.family
+        if rule.admin_allowlist_required and not admin_allowlisted:
+            return False, 403, "admin_allowlist_required", rule.family
+        if rule.platform_role_mask and not principal.platform_roles & rule.platform_role_mask:
+            return False, 403, "insufficient_platform_role", rule.family
+        if not rule.project_scoped:
+            return True, 200, "platform_role_ok", rule.family
+
+        if self._platform_admin_bypass and principal.platform_roles & self._admin_bit:
+            return True, 200, "platform_admin_bypass", rule.family
+        if not project_code:
+            return False, 403, "project_scope_required", rule.family
+        if project_code not in self.project_codes:
+            return False, 403, "unknown_project", rule.family
+        if principal.project_roles.get(project_code, 0) < rule.min_project_rank:
+            return False, 403, "insufficient_project_role", rule.family
+        return True, 200, "project_role_ok", rule.family
+
+
+def _rank_table(names: Iterable[str], highest_first: bool) -> dict[str, int]:
+    ordered = list(names)
+    if highest_first:
+        ordered.reverse()
+    return {name: index + 1 for index, name in enumerate(ordered)}
+
+
+def compile_policy(
+    rbac: Mapping[str, Any],
+    policy_matrix: Mapping[str, Any],
+    projects: Mapping[str, Any],
+) -> CompiledPolicy:
+    defaults = policy_matrix.get("defaults") or {}
+    if defaults.get("deny_by_default", True) is not True:
+        raise ValueError("policy-matrix: only deny_by_default: true is supported")
+
+    platform_roles = rbac.get("platform_roles") or {}
+    precedence = rbac.get("role_precedence") or list(platform_roles)
+    unknown = set(precedence) ^ set(platform_roles)
+    if unknown:
+        raise ValueError(f"rbac: role_precedence and platform_roles differ: {sorted(unknown)}")
+    # role_precedence lists the most privileged role first.
+    role_ranks = _rank_table(precedence, highest_first=True)
+    role_groups = tuple(
+        (role_ranks[name], frozenset((spec or {}).get("required_groups") or ()))
+        for name, spec in platform_roles.items()
+    )
+    for rank, required in role_groups:
+        if not required:
+            raise ValueError(f"rbac: platform role with rank {rank} has no required_groups")
+
+    # project_roles are listed least privileged first (VIEW < EDIT < OWNER).
+    project_role_ranks = _rank_table((projects.get("project_roles") or {}).values(), highest_first=False)
+    project_codes = frozenset(project["code"] for project in projects.get("projects") or ())
+
+    root = _Node()
+    for family, spec in (policy_matrix.get("route_families") or {}).items():
+        rule = _compile_rule(family, spec or {}, role_ranks, project_role_ranks)
+        for path in spec.get("paths") or ():
+            _insert(root, path, rule)
+
+    version_source = json.dumps([rbac, policy_matrix, projects], sort_keys=True, default=str)
+    return CompiledPolicy(
+        root=root,
+        role_ranks=role_ranks,
+        role_groups=role_groups,
+        project_role_ranks=project_role_ranks,
+        project_codes=project_codes,
+        project_group_prefix=projects.get("project_group_prefix", "AI-NC-PROJ-"),
+        groups_claim=rbac.get("groups_claim", "groups"),
+        platform_admin_bypass=bool(rbac.get("global_bypass_for_platform_admin", False)),
+        version=hashlib.sha256(version_source.encode("utf-8")).hexdigest()[:12],
+        mfa_amr_values=frozenset(rbac.get("mfa_amr_values") or DEFAULT_MFA_AMR_VALUES),
+        mfa_acr_values=frozenset(rbac.get("mfa_acr_values") or ()),
+    )
+
+
+def _compile_rule(
+    family: str,
+    spec: Mapping[str, Any],
+    role_ranks: Mapping[str, int],
+    project_role_ranks: Mapping[str, int],
+) -> RouteRule:
+    min_platform_role = spec.get("min_platform_role") or ""
+    if min_platform_role and min_platform_role not in role_ranks:
+        raise ValueError(f"policy-matrix: {family}: unknown min_platform_role {min_platform_role!r}")
+
+    project_scoped = bool(spec.get("project_scoped", False))
+    min_project_role = spec.get("min_project_role") or ""
+    if min_project_role and min_project_role not in project_role_ranks:
+        raise ValueError(f"policy-matrix: {family}: unknown min_project_role {min_project_role!r}")
+    if project_scoped and not min_project_role:
+        raise ValueError(f"policy-matrix: {family}: project_scoped requires min_project_role")
+
+    return RouteRule(
+        family=family,
+        auth_required=bool(spec.get("auth_required", True)),
+        platform_role_mask=roles_at_or_above(role_ranks.get(min_platform_role, 0), len(role_ranks)),
+        project_scoped=project_scoped,
+        min_project_rank=project_role_ranks.get(min_project_role, 0),
+        admin_allowlist_required=bool(spec.get("admin_allowlist_required", False)),
+        mfa_required=bool(spec.get("mfa_required", False)),
+    )
+
+
+def _insert(root: _Node, path: str, rule: RouteRule) -> None:
+    if not path.startswith("/"):
+        raise ValueError(f"policy-matrix: {rule.family}: path must start with '/': {path!r}")
+    segments = _segments(path)
+    wildcard = bool(segments) and segments[-1] == "*"
+    if wildcard:
+        segments = segments[:-1]
+    if "*" in segments:
+        raise ValueError(f"policy-matrix: {rule.family}: '*' is only allowed as the last segment: {path!r}")
+
+    node = root
+    for segment in segments:
+        node = node.children.setdefault(segment, _Node())
+    existing = node.wildcard if wildcard else node.rule
+    if existing is not None:
+        raise ValueError(f"policy-matrix: path {path!r} claimed by both {existing.family} and {rule.family}")
+    if wildcard:
+        node.wildcard = rule
+    else:
+        node.rule = rule
+
+
+def _read_yaml(path: Path) -> Mapping[str, Any]:
+    with path.open(encoding="utf-8") as handle:
+        return yaml.safe_load(handle) or {}
+
+
+def load_policy_files(rbac_path: Path, policy_matrix_path: Path, projects_path: Path) -> CompiledPolicy:
+    return compile_policy(_read_yaml(rbac_path), _read_yaml(policy_matrix_path), _read_yaml(projects_path))
+
+
+def load_policy(config_dir: str | Path) -> CompiledPolicy:
+    """Compile the policy files from /opt/gateway/config (or another directory)."""
+    base = Path(config_dir)
+    return load_policy_files(
+        base / POLICY_FILES["rbac"],
+        base / POLICY_FILES["policy_matrix"],
+        base / POLICY_FILES["projects"],
+    )
+
+
+def load_policy_if_present(config_dir: str | Path) -> CompiledPolicy | None:
+    """Like ``load_policy`` but returns None when the directory is absent.
+
+    Invalid files still raise so a broken policy fails the process at startup
+    rather than silently denying every request.
+    """
+    if not Path(config_dir).is_dir():
+        return None
+    return load_policy(config_dir)
+
+
+def request_project_code(headers: Mapping[str, str], query: Mapping[str, str]) -> str | None:
+    return headers.get(PROJECT_CODE_HEADER) or query.get(PROJECT_CODE_PARAM) or None
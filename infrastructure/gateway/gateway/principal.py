@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+
+# RFC 8176 authentication method references that only a second factor produces.
+DEFAULT_MFA_AMR_VALUES = frozenset({"mfa", "otp", "hwk", "swk", "sms", "fpt", "face", "iris", "retina", "vbm"})
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Authorization view of one verified token, built once per token.
+
+    ``platform_roles`` is a bitset (bit ``rank - 1`` per platform role, see
+    ``GroupIndex``); ``project_roles`` maps project code to the highest project
+    role rank granted by any ``<prefix><CODE>-<ROLE>`` group. ``mfa`` is set
+    when the token's ``amr``/``acr`` claims show a multi-factor login.
+    """
+
+    subject: str
+    platform_roles: int
+    project_roles: Mapping[str, int] = field(default_factory=dict)
+    policy_version: str = ""
+    mfa: bool = False
+
+    @property
+    def platform_rank(self) -> int:
+        return self.platform_roles.bit_length()
+
+
+def role_bit(rank: int) -> int:
+    return 1 << (rank - 1) if rank > 0 else 0
+
+
+def roles_at_or_above(rank: int, role_count: int) -> int:
+    """Bitmask of every platform role whose rank is ``>= rank`` (0 means no requirement)."""
+    if rank <= 0:
+        return 0
+    return ((1 << role_count) - 1) & ~((1 << (rank - 1)) - 1)
+
+
+class GroupIndex:
+    """Turns a raw ``groups`` claim into a ``Principal`` in one pass.
+
+    Single-group platform roles are resolved with a dict lookup per group;
+    roles that require several groups fall back to a subset check. Project
+    groups are parsed by prefix + ``rpartition`` against the project registry.
+    """
+
+    def __init__(
+        self,
+        role_groups: Iterable[tuple[int, frozenset[str]]],
+        project_role_ranks: Mapping[str, int],
+        project_codes: frozenset[str],
+        project_group_prefix: str,
+        groups_claim: str,
+        policy_version: str,
+        mfa_amr_values: frozenset[str] = DEFAULT_MFA_AMR_VALUES,
+        mfa_acr_values: frozenset[str] = frozenset(),
+    ) -> None:
+        self._single: dict[str, int] = {}
+        multi: list[tuple[int, frozenset[str]]] = []
+        for rank, required in role_groups:
+            if len(required) == 1:
+                (group,) = required
+                self._single[group] = self._single.get(group, 0) | role_bit(rank)
+            else:
+                multi.append((role_bit(rank), required))
+        self._multi = tuple(multi)
+        self._project_role_ranks = dict(project_role_ranks)
+        self._project_codes = project_codes
+        self._prefix = project_group_prefix
+        self._groups_claim = groups_claim
+        self._version = policy_version
+        self._mfa_amr = mfa_amr_values
+        self._mfa_acr = mfa_acr_values
+
+    def mfa(self, claims: Mapping[str, Any]) -> bool:
+        amr = claims.get("amr")
+        if isinstance(amr, (list, tuple)) and any(isinstance(value, str) and value in self._mfa_amr for value in amr):
+            return True
+        acr = claims.get("acr")
+        return isinstance(acr, str) and acr in self._mfa_acr
+
+    def principal(self, claims: Mapping[str, Any]) -> Principal:
+        groups = claims.get(self._groups_claim) or ()
+        if not isinstance(groups, (list, tuple, set, frozenset)):
+            groups = ()
+
+        platform_roles = 0
+        project_roles: dict[str, int] = {}
+        single = self._single
+        prefix = self._prefix
+        prefix_len = len(prefix)
+        for group in groups:
+            if not isinstance(group, str):
+                continue
+            bits = single.get(group)
+            if bits is not None:
+                platform_roles |= bits
+                continue
+            if not group.startswith(prefix):
+                continue
+            code, _, role = group[prefix_len:].rpartition("-")
+            rank = self._project_role_ranks.get(role, 0)
+            if rank and code in self._project_codes and rank > project_roles.get(code, 0):
+                project_roles[code] = rank
+
+        if self._multi:
+            # Claims are untrusted JSON: a nested object in the list is unhashable.
+            group_set = {group for group in groups if isinstance(group, str)}
+            for bit, required in self._multi:
+                if required <= group_set:
+                    platform_roles |= bit
+
+        return Principal(
+            subject=str(claims.get("sub", "")),
+            platform_roles=platform_roles,
+            project_roles=project_roles,
+            policy_version=self._version,
+            mfa=self.mfa(claims),
+        )
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Mapping
+import math
+import uuid
+
+from gateway.assertion import ASSERTION_HEADER
+
+PROXY_FAMILIES = ("search", "graph", "ingest")
+PROXY_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+CORRELATION_ID_HEADER = "X-Correlation-ID"
+
+# RFC 9110 section 7.6.1 connection-specific headers, plus Host/Content-Length which
+# the upstream client recomputes for the outbound hop.
+HOP_BY_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "proxy-connection",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+        "host",
+        "content-length",
+    }
+)
+# Headers the gateway sets itself on the upstream hop.
+_GATEWAY_REQUEST_HEADERS = HOP_BY_HOP_HEADERS | {CORRELATION_ID_HEADER.lower(), ASSERTION_HEADER.lower()}
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+def correlation_id(headers: Mapping[str, str]) -> str:
+    return headers.get(CORRELATION_ID_HEADER) or f"req-{uuid.uuid4().hex}"
+
+
+def retry_after_value(seconds: float) -> str:
+    """``Retry-After`` in whole seconds, rounded up and never 0."""
+    return str(max(1, math.ceil(seconds)))
+
+
+def declared_length(headers: Mapping[str, str]) -> int | None:
+    """Parsed Content-Length, ``None`` when absent; raises ValueError when malformed."""
+    value = headers.get("Content-Length")
+    if value is None:
+        return None
+    length = int(value)
+    if length < 0:
+        raise ValueError("negative Content-Length")
+    return length
+
+
+def is_chunked(headers: Mapping[str, str]) -> bool:
+    return "chunked" in headers.get("Transfer-Encoding", "").lower()
+
+
+def forward_request_headers(
+    headers: Iterable[tuple[str, str]],
+    request_id: str,
+    client_ip: str | None,
+    content_length: int | None,
+    assertion: str | None = None,
+    identity_upstream: bool = False,
+) -> dict[str, str]:
+    """Headers for the upstream hop; ``identity_upstream`` when the gateway does the response compression."""
+    skip = _GATEWAY_REQUEST_HEADERS | {"accept-encoding"} if identity_upstream else _GATEWAY_REQUEST_HEADERS
+    forwarded: dict[str, str] = {}
+    for name, value in headers:
+        if name.lower() in skip:
+            continue
+        forwarded[name] = value
+    forwarded[CORRELATION_ID_HEADER] = request_id
+    # Only the gateway may set the identity assertion; a client-supplied one is always dropped.
+    if assertion is not None:
+        forwarded[ASSERTION_HEADER] = assertion
+    if client_ip:
+        prior = forwarded.pop("X-Forwarded-For", None)
+        forwarded["X-Forwarded-For"] = f"{prior}, {client_ip}" if prior else client_ip
+    if content_length is not None:
+        forwarded["Content-Length"] = str(content_length)
+    # Upstream bytes are relayed untouched, so never let the HTTP client add an
+    # Accept-Encoding the browser did not send.
+    if not any(name.lower() == "accept-encoding" for name in forwarded):
+        forwarded["Accept-Encoding"] = "identity"
+    return forwarded
+
+
+def forward_response_headers(headers: Iterable[tuple[str, str]], request_id: str) -> list[tuple[str, str]]:
+    # Response bytes are relayed unchanged, so the upstream Content-Length still holds.
+    skip = (HOP_BY_HOP_HEADERS - {"content-length"}) | {CORRELATION_ID_HEADER.lower()}
+    forwarded = [(name, value) for name, value in headers if name.lower() not in skip]
+    forwarded.append((CORRELATION_ID_HEADER, request_id))
+    return forwarded
+
+
+class LimitedBody:
+    """Request body relayed chunk by chunk; raises BodyTooLarge past ``max_bytes``.
+
+    ``exceeded`` stays set after the error so callers can tell a size violation
+    apart from the HTTP client's wrapped exception.
+    """
+
+    def __init__(self, read: Callable[[int], bytes], max_bytes: int, chunk_bytes: int) -> None:
+        self._read = read
+        self._max_bytes = max_bytes
+        self._chunk_bytes = chunk_bytes
+        self.received = 0
+        self.exceeded = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self._read(self._chunk_bytes)
+            if not chunk:
+                return
+            self.received += len(chunk)
+            if self.received > self._max_bytes:
+                self.exceeded = True
+                raise BodyTooLarge(f"request body exceeds {self._max_bytes} bytes")
+            yield chunk
+
+
+class SizedLimitedBody(LimitedBody):
+    """``LimitedBody`` with a declared length so the upstream hop keeps Content-Length."""
+
+    def __init__(self, read: Callable[[int], bytes], max_bytes: int, chunk_bytes: int, length: int) -> None:
+        super().__init__(read, max_bytes, chunk_bytes)
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+
+class AsyncLimitedBody:
+    def __init__(self, chunks: AsyncIterator[bytes], max_bytes: int) -> None:
+        self._chunks = chunks
+        self._max_bytes = max_bytes
+        self.received = 0
+        self.exceeded = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._chunks:
+            if not chunk:
+                continue
+            self.received += len(chunk)
+            if self.received > self._max_bytes:
+                self.exceeded = True
+                raise BodyTooLarge(f"request body exceeds {self._max_bytes} bytes")
+            yield chunk
+
+
+def upstream_target(base_url: str, path: str, query_string: str) -> str:
+    return f"{base_url.rstrip('/')}{path}" + (f"?{query_string}" if query_string else "")
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+import threading
+import time
+from typing import Any
+
+import yaml
+
+from gateway.metrics import rate_limit_buckets, rate_limited_total
+from gateway.shared_cache import SharedCache
+
+RATE_LIMITS_FILE = "rate-limits.yaml"
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float  # tokens added per second
+    burst: float  # bucket capacity
+
+    @property
+    def refill_seconds(self) -> float:
+        return self.burst / self.rate
+
+
+class RateLimiter:
+    """Token buckets keyed by (route family, sub) in a bounded LRU.
+
+    Each bucket is two floats (tokens, last update). A bucket left alone for
+    ``burst / rate`` seconds is full again, which is the same as having no
+    entry, so idle buckets are evicted from the LRU end without changing any
+    decision. ``max_entries`` caps memory; past it the least recently used
+    bucket is dropped even if not yet full.
+
+    With ``shared`` (several worker processes) the buckets live in the shared
+    store instead, so a limit holds for the gateway as a whole rather than
+    per worker; the local LRU is only used while that store is unusable.
+    """
+
+    def __init__(
+        self,
+        limits: Mapping[str, Limit],
+        default: Limit | None = None,
+        max_entries: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+        shared: SharedCache | None = None,
+    ) -> None:
+        self._limits = dict(limits)
+        self._default = default
+        self._max_entries = max_entries
+        self._clock = clock
+        self._shared = shared
+        self._buckets: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def limit_for(self, family: str) -> Limit | None:
+        return self._limits.get(family, self._default)
+
+    def acquire(self, subject: str, family: str, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; return 0.0 when admitted, else seconds until enough tokens exist."""
+        limit = self.limit_for(family)
+        if limit is None:
+            return 0.0
+        if self._shared is not None:
+            tokens = self._shared.take_tokens(family, subject, limit.rate, limit.burst, cost, self._max_entries)
+            if tokens is not None:
+                return self._wait(family, limit, tokens, cost)
+        key = (family, subject)
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = limit.burst
+                bucket = self._buckets[key] = [tokens, now]
+                self._evict(now)
+            else:
+                tokens = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+                self._buckets.move_to_end(key)
+            if tokens >= cost:
+                bucket[0], bucket[1] = tokens - cost, now
+                return 0.0
+            bucket[0], bucket[1] = tokens, now
+        return self._wait(family, limit, tokens, cost)
+
+    @staticmethod
+    def _wait(family: str, limit: Limit, tokens: float, cost: float) -> float:
+        if tokens >= cost:
+            return 0.0
+        rate_limited_total.labels(family=family).inc()
+        return (cost - tokens) / limit.rate
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        while len(buckets) > self._max_entries:
+            buckets.popitem(last=False)
+            self.evictions += 1
+        # The front of the LRU is the longest idle; drop buckets that have refilled.
+        while buckets:
+            (family, _), (_, updated) = next(iter(buckets.items()))
+            limit = self.limit_for(family)
+            if limit is not None and now - updated < limit.refill_seconds:
+                break
+            buckets.popitem(last=False)
+        rate_limit_buckets.set(len(buckets))
+
+
+def _limit(name: str, spec: Mapping[str, Any]) -> Limit:
+    rate = float(spec.get("requests_per_second", 0))
+    burst = float(spec.get("burst", rate))
+    if rate <= 0 or burst < 1:
+        raise ValueError(f"rate-limits: {name}: requests_per_second must be > 0 and burst >= 1")
+    return Limit(rate=rate, burst=burst)
+
+
+def compile_rate_limits(config: Mapping[str, Any], shared: SharedCache | None = None) -> RateLimiter:
+    families = {
+        family: _limit(family, spec or {}) for family, spec in (config.get("route_families") or {}).items()
+    }
+    default_spec = config.get("defaults")
+    default = _limit("defaults", default_spec) if default_spec else None
+    store = config.get("store") or {}
+    return RateLimiter(families, default, max_entries=int(store.get("max_entries", 100000)), shared=shared)
+
+
+def load_rate_limits(policy_dir: str | Path, shared: SharedCache | None = None) -> RateLimiter | None:
+    """``rate-limits.yaml`` next to the policy matrix, or ``None`` (no limits) when absent."""
+    path = Path(policy_dir) / RATE_LIMITS_FILE
+    if not path.is_file():
+        return None
+    return compile_rate_limits(yaml.safe_load(path.read_text(encoding="utf-8")) or {}, shared)
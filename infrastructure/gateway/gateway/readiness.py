@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any
+
+from gateway.audit import AuditEmitter
+from gateway.breaker import OPEN, CircuitOpenError
+from gateway.config import GatewayConfig
+from gateway.jwks import JwksCache
+from gateway.reload import PolicyWatcher
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "ai-gateway"
+# A probe answer older than this many rounds means the prober itself stalled.
+_STALE_ROUNDS = 3
+
+
+def probe_targets(cfg: GatewayConfig) -> dict[str, str]:
+    """Upstream base URLs to probe, keyed by the name ``/ready`` reports them under.
+
+    The default upstream is ``upstream``; each ``UPSTREAM_ROUTES`` family with
+    a URL of its own is probed under the family name. URLs never appear in the
+    report.
+    """
+    targets = {"upstream": cfg.upstream_url}
+    for family, url in sorted(cfg.upstream_routes.items()):
+        if url not in targets.values():
+            targets[family] = url
+    return targets
+
+
+def sd_notify(message: str, address: str | None = None) -> bool:
+    """Send ``message`` to ``address``, by default systemd's ``NOTIFY_SOCKET``; False when there is none."""
+    address = address or os.environ.get("NOTIFY_SOCKET")
+    if not address:
+        return False
+    if address.startswith("@"):
+        address = "\0" + address[1:]  # abstract namespace socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(message.encode("utf-8"), address)
+    except OSError:
+        return False
+    return True
+
+
+@dataclass(frozen=True)
+class ProbeResult:
+    ok: bool
+    checked_at: float
+    # Upstream status code or exception class name; never a URL or message text.
+    detail: str | None = None
+
+
+@dataclass(frozen=True)
+class _Probe:
+    check: Callable[[], int]
+    circuit: Callable[[], str]
+
+
+class Readiness:
+    """State behind ``/ready``: scheduled upstream probes plus in-memory gateway state.
+
+    A background thread (``start()``) runs every registered probe each
+    ``interval_seconds`` and keeps the last answer. ``report()`` only reads
+    memory, so polling ``/ready`` does no I/O: JWKS freshness comes from the
+    JWKS cache's own refresh thread and Keycloak is never contacted on a
+    health check.
+
+    Under systemd ``Type=notify`` the probe thread also sends ``READY=1`` once
+    the gateway is first ready and ``WATCHDOG=1`` after every round, so a
+    wedged process is restarted without an external ``curl`` loop. With
+    several workers these go to the main process's ``NotifyRelay``
+    (``gateway/workers.py``), which speaks to systemd for all of them.
+    """
+
+    def __init__(
+        self,
+        jwks: JwksCache,
+        policy_watcher: PolicyWatcher,
+        audit: AuditEmitter | None = None,
+        interval_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.jwks = jwks
+        self.policy_watcher = policy_watcher
+        self.audit = audit
+        self.interval_seconds = interval_seconds
+        self._clock = clock
+        self._probes: dict[str, _Probe] = {}
+        self._results: dict[str, ProbeResult] = {}
+        self._notified_ready = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_config(
+        cls, cfg: GatewayConfig, jwks: JwksCache, policy_watcher: PolicyWatcher, audit: AuditEmitter | None
+    ) -> Readiness:
+        return cls(jwks, policy_watcher, audit, cfg.readiness_probe_interval_seconds)
+
+    def add_probe(self, name: str, check: Callable[[], int], circuit: Callable[[], str]) -> None:
+        """Register ``check`` (returns the dependency's HTTP status) and its breaker state under ``name``."""
+        self._probes[name] = _Probe(check, circuit)
+
+    def probe(self) -> None:
+        """Run every probe once on the calling thread and store the answers."""
+        for name, probe in list(self._probes.items()):
+            try:
+                status = probe.check()
+            except CircuitOpenError:
+                result = ProbeResult(False, self._clock(), "circuit_open")
+            except Exception as exc:  # noqa: BLE001
+                result = ProbeResult(False, self._clock(), type(exc).__name__)
+            else:
+                result = ProbeResult(200 <= status < 300, self._clock(), str(status))
+            self._results[name] = result
+
+    def _fresh(self, result: ProbeResult | None) -> bool:
+        horizon = max(self.interval_seconds, 1.0) * _STALE_ROUNDS
+        return result is not None and self._clock() - result.checked_at <= horizon
+
+    def report(self) -> tuple[dict[str, Any], bool]:
+        """The ``/ready`` body and whether every readiness-critical dependency is up."""
+        now = self._clock()
+        jwks_age = self.jwks.age_seconds()
+        snapshot = self.policy_watcher.snapshot
+        deps = {
+            "idp_jwks": jwks_age is not None and jwks_age < self.jwks.max_age_seconds,
+            "policy": snapshot.policy is not None,
+        }
+        probes: dict[str, Any] = {}
+        circuits: dict[str, str] = {}
+        for name, probe in list(self._probes.items()):
+            result = self._results.get(name)
+            circuits[name] = probe.circuit()
+            deps[name] = self._fresh(result) and result.ok and circuits[name] != OPEN
+            probes[name] = {
+                "ok": result.ok if result is not None else None,
+                "detail": result.detail if result is not None else None,
+                "age_seconds": round(now - result.checked_at, 3) if result is not None else None,
+            }
+        queues: dict[str, Any] = {}
+        if self.audit is not None:
+            depth = len(self.audit)
+            queues["audit"] = {"depth": depth, "max": self.audit.max_queue}
+            deps["audit"] = depth < self.audit.max_queue
+
+        ready = all(deps.values())
+        body = {
+            "status": "ok" if ready else "unavailable",
+            "service": SERVICE_NAME,
+            "ready": ready,
+            "deps": deps,
+            "jwks": {
+                "age_seconds": round(jwks_age, 3) if jwks_age is not None else None,
+                "max_age_seconds": self.jwks.max_age_seconds,
+                "refresh_failing": self.jwks.last_error is not None,
+            },
+            "policy": {
+                "version": snapshot.version,
+                "age_seconds": round(time.time() - snapshot.loaded_at, 3),
+                "reload_failing": self.policy_watcher.last_error is not None,
+            },
+            "circuits": circuits,
+            "probes": probes,
+            "queues": queues,
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        return body, ready
+
+    def _heartbeat(self) -> None:
+        _, ready = self.report()
+        if ready and not self._notified_ready:
+            self._notified_ready = sd_notify("READY=1")
+        sd_notify("WATCHDOG=1")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.probe()
+                self._heartbeat()
+            except Exception:  # noqa: BLE001
+                logger.exception("readiness probe round failed")
+            self._stop.wait(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._thread is not None or self.interval_seconds <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="readiness-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+from pathlib import Path
+import threading
+import time
+
+from gateway.allowlist import ADMIN_ALLOWLIST_FILE, ADMIN_INVENTORY_FILE, PrefixTrie, load_admin_allowlist
+from gateway.config import GatewayConfig
+from gateway.ingest import INGEST_QUOTAS_FILE, IngestQuotas, load_ingest_quotas
+from gateway.metrics import policy_reloads_total
+from gateway.policy import POLICY_FILES, CompiledPolicy, load_policy_if_present
+from gateway.ratelimit import RATE_LIMITS_FILE, RateLimiter, load_rate_limits
+from gateway.shared_cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+WATCHED_FILES = (
+    *POLICY_FILES.values(),
+    RATE_LIMITS_FILE,
+    INGEST_QUOTAS_FILE,
+    ADMIN_ALLOWLIST_FILE,
+    ADMIN_INVENTORY_FILE,
+)
+_POLICY = slice(0, len(POLICY_FILES))
+_RATE_LIMITS = slice(WATCHED_FILES.index(RATE_LIMITS_FILE), WATCHED_FILES.index(RATE_LIMITS_FILE) + 1)
+_ALLOWLIST = slice(WATCHED_FILES.index(ADMIN_ALLOWLIST_FILE), len(WATCHED_FILES))
+
+# (mtime_ns, size, inode) per watched file, None when absent. stat() follows
+# symlinks, so a Kubernetes ConfigMap ``..data`` swap shows up as a new inode.
+Fingerprint = tuple[tuple[int, int, int] | None, ...]
+
+
+def fingerprint(policy_dir: str | Path) -> Fingerprint:
+    base = Path(policy_dir)
+    stamps = []
+    for name in WATCHED_FILES:
+        try:
+            stat = (base / name).stat()
+        except OSError:
+            stamps.append(None)
+            continue
+        stamps.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+    return tuple(stamps)
+
+
+@dataclass(frozen=True)
+class PolicySnapshot:
+    """Everything compiled from the policy directory, swapped as one reference."""
+
+    policy: CompiledPolicy | None
+    rate_limiter: RateLimiter | None
+    ingest_quotas: IngestQuotas | None
+    admin_allowlist: PrefixTrie
+    fingerprint: Fingerprint
+    loaded_at: float
+    # Increases with every swap, so caches can tell a newer snapshot from an older one.
+    generation: int = 0
+
+    @property
+    def version(self) -> str | None:
+        return self.policy.version if self.policy is not None else None
+
+
+def load_snapshot(
+    policy_dir: str | Path, previous: PolicySnapshot | None = None, shared: SharedCache | None = None
+) -> PolicySnapshot:
+    """Compile the policy directory; raises on invalid files.
+
+    The fingerprint is taken before reading, so a file rewritten mid-load
+    differs from it and is picked up again on the next check. Parts whose
+    files did not change are carried over from ``previous``: the compiled
+    policy, the rate limiter (and its buckets) and the admin allowlist trie,
+    so an allowlist edit only rebuilds the trie. ``shared`` backs the rate
+    limiter's buckets when several workers serve.
+    """
+    stamps = fingerprint(policy_dir)
+
+    def unchanged(files: slice) -> bool:
+        return previous is not None and previous.fingerprint[files] == stamps[files]
+
+    policy = previous.policy if unchanged(_POLICY) else load_policy_if_present(policy_dir)
+    rate_limiter = previous.rate_limiter if unchanged(_RATE_LIMITS) else load_rate_limits(policy_dir, shared)
+    allowlist = previous.admin_allowlist if unchanged(_ALLOWLIST) else load_admin_allowlist(policy_dir)
+    generation = previous.generation + 1 if previous is not None else 0
+    return PolicySnapshot(
+        policy, rate_limiter, load_ingest_quotas(policy_dir), allowlist, stamps, time.time(), generation
+    )
+
+
+class PolicyWatcher:
+    """Polls the policy directory and atomically swaps in a new snapshot on change.
+
+    Requests read ``watcher.snapshot`` once and use that object throughout, so
+    a request never mixes two policy versions. Parsing and compiling happen on
+    the watcher thread; a set that fails to load is logged and counted, the
+    previous snapshot stays active, and the same broken files are not retried
+    until they change again.
+    """
+
+    def __init__(
+        self, policy_dir: str | Path, interval_seconds: float = 5.0, shared: SharedCache | None = None
+    ) -> None:
+        self.policy_dir = policy_dir
+        self.interval_seconds = interval_seconds
+        self.shared = shared
+        self.snapshot = load_snapshot(policy_dir, shared=shared)
+        self.last_error: str | None = None
+        self._rejected: Fingerprint | None = None
+        self.on_reload: Callable[[PolicySnapshot, PolicySnapshot], None] | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig, shared: SharedCache | None = None) -> PolicyWatcher:
+        return cls(cfg.policy_dir, cfg.policy_reload_interval_seconds, shared)
+
+    def check(self) -> bool:
+        """Reload if any watched file changed; True when a new snapshot was swapped in."""
+        with self._lock:
+            stamps = fingerprint(self.policy_dir)
+            if stamps == self.snapshot.fingerprint or stamps == self._rejected:
+                return False
+            try:
+                snapshot = load_snapshot(self.policy_dir, self.snapshot, self.shared)
+                if snapshot.policy is None and self.snapshot.policy is not None:
+                    raise FileNotFoundError(f"policy directory {self.policy_dir} disappeared")
+            except Exception as exc:  # noqa: BLE001
+                self._rejected = stamps
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                policy_reloads_total.labels(result="failure").inc()
+                logger.error("policy reload failed, keeping version %s: %s", self.snapshot.version, self.last_error)
+                return False
+            previous, self.snapshot = self.snapshot, snapshot
+            self._rejected = None
+            self.last_error = None
+            policy_reloads_total.labels(result="success").inc()
+            logger.info("policy reloaded, version %s", snapshot.version)
+        if self.on_reload is not None:
+            self.on_reload(previous, snapshot)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.check()
+
+    def start(self) -> None:
+        if self._thread is not None or self.interval_seconds <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="policy-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from dataclasses import dataclass
+import hashlib
+import threading
+import time
+
+from gateway.config import GatewayConfig
+from gateway.metrics import cache_lookup
+from gateway.principal import Principal
+
+# RFC 9110 section 15.4.5: what a 304 carries from the 200 it stands in for.
+_NOT_MODIFIED_HEADERS = frozenset({"cache-control", "content-location", "date", "etag", "expires", "vary"})
+# Set per response by the gateway, never replayed from the cache.
+_UNSTORED_HEADERS = frozenset({"content-length", "etag", "x-correlation-id"})
+# Request headers a stored response may vary on; the gateway re-encodes per client anyway.
+_VARY_ALLOWED = frozenset({"accept-encoding"})
+
+CacheKey = tuple[str, str, str]
+
+
+def acl_fingerprint(
+    principal: Principal | None, policy_version: str, project_code: str | None, shared: bool = False
+) -> str:
+    """Everything the gateway knows that can change what an upstream shows a caller.
+
+    Upstreams filter by the forwarded identity (``enforce_source_acl``), so by
+    default the subject is part of the fingerprint. With ``shared`` it is left
+    out: principals with the same platform and project roles, in the same
+    project scope under the same policy, get the same fingerprint. That is only
+    used for responses the upstream marked ``Cache-Control: public``.
+    """
+    platform_roles = principal.platform_roles if principal is not None else 0
+    project_roles = sorted(principal.project_roles.items()) if principal is not None else []
+    subject = "" if shared or principal is None else principal.subject
+    source = f"{policy_version}|{platform_roles}|{project_roles}|{project_code or ''}|{'*' if shared else subject}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass(frozen=True)
+class CacheKeys:
+    """Where a response for one request may be stored: for this subject only, or shared by its roles."""
+
+    own: CacheKey
+    shared: CacheKey
+
+
+def entity_tag(key: CacheKey, body: bytes) -> str:
+    """Strong ETag over (ACL fingerprint, route, query) and the identity-encoded body."""
+    digest = hashlib.sha256("\0".join(key).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(body)
+    return f'"{digest.hexdigest()[:40]}"'
+
+
+def if_none_match(header: str | None, etag: str | None) -> bool:
+    """``If-None-Match`` evaluation (weak comparison, so a compressed ``W/`` tag still matches)."""
+    if not header or etag is None:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified_headers(headers: Iterable[tuple[str, str]], request_id_header: str) -> list[tuple[str, str]]:
+    keep = _NOT_MODIFIED_HEADERS | {request_id_header.lower()}
+    return [(name, value) for name, value in headers if name.lower() in keep]
+
+
+def _cache_directives(headers: Iterable[tuple[str, str]]) -> set[str]:
+    return {
+        directive.split("=", 1)[0].strip().lower()
+        for name, value in headers
+        if name.lower() == "cache-control"
+        for directive in value.split(",")
+    }
+
+
+def storable(headers: Iterable[tuple[str, str]]) -> bool:
+    """Whether an upstream 200 may be stored at all.
+
+    A ``Vary`` on anything but ``Accept-Encoding`` (``Authorization``,
+    ``Cookie``, ``*``...) says the body depends on request headers the cache
+    key does not hold, so such responses are only tagged.
+    """
+    headers = tuple(headers)
+    if _cache_directives(headers) & {"no-store", "no-cache", "private"}:
+        return False
+    for name, value in headers:
+        lowered = name.lower()
+        if lowered == "set-cookie":
+            return False
+        if lowered == "vary" and {field.strip().lower() for field in value.split(",")} - _VARY_ALLOWED - {""}:
+            return False
+        if lowered == "content-encoding" and value.strip().lower() not in ("", "identity"):
+            return False
+    return True
+
+
+def shareable(headers: Iterable[tuple[str, str]]) -> bool:
+    """Whether a storable response may be served to other subjects with the same roles."""
+    return "public" in _cache_directives(headers)
+
+
+def buffer_body(chunks: Iterator[bytes], limit: int) -> tuple[bytes | None, Iterator[bytes]]:
+    """Read up to ``limit`` bytes of ``chunks``.
+
+    Returns the whole body when it fits, otherwise ``None``; the iterator
+    replays what was read and then relays the rest, so an oversized response
+    still streams.
+    """
+    buffered: list[bytes] = []
+    size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            return None, _replay(buffered, chunks)
+    return b"".join(buffered), iter(buffered)
+
+
+def _replay(buffered: list[bytes], rest: Iterator[bytes]) -> Iterator[bytes]:
+    try:
+        yield from buffered
+        yield from rest
+    finally:
+        close = getattr(rest, "close", None)
+        if close is not None:
+            close()
+
+
+async def buffer_async_body(chunks: AsyncIterator[bytes], limit: int) -> tuple[bytes | None, AsyncIterator[bytes]]:
+    buffered: list[bytes] = []
+    size = 0
+    async for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            return None, _replay_async(buffered, chunks)
+    return b"".join(buffered), _replay_async(buffered, None)
+
+
+async def _replay_async(buffered: list[bytes], rest: AsyncIterator[bytes] | None) -> AsyncIterator[bytes]:
+    try:
+        for chunk in buffered:
+            yield chunk
+        if rest is not None:
+            async for chunk in rest:
+                yield chunk
+    finally:
+        aclose = getattr(rest, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def body_chunks(body: bytes, chunk_bytes: int) -> Iterator[bytes]:
+    for start in range(0, len(body), chunk_bytes):
+        yield body[start : start + chunk_bytes]
+
+
+async def async_body_chunks(body: bytes, chunk_bytes: int) -> AsyncIterator[bytes]:
+    for chunk in body_chunks(body, chunk_bytes):
+        yield chunk
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    etag: str
+    headers: tuple[tuple[str, str], ...]
+    body: bytes
+    stored_at: float
+
+    def response_headers(self) -> list[tuple[str, str]]:
+        return [*self.headers, ("Content-Length", str(len(self.body))), ("ETag", self.etag)]
+
+
+class ResponseCache:
+    """Bounded LRU of upstream GET responses for read-only routes, keyed per ACL fingerprint.
+
+    Only identity-encoded 200s of at most ``max_body_bytes`` are kept, for
+    ``ttl_seconds``; within that window a repeat request is answered without
+    calling the upstream. A response is kept for its subject only unless the
+    upstream marked it ``Cache-Control: public``, in which case principals with
+    the same roles share it. Every such response gets a strong ``ETag`` over
+    (fingerprint, route, query, body), so a client polling with
+    ``If-None-Match`` gets a 304 both from the cache and after a refetch that
+    returned the same bytes.
+
+    The policy version is part of every key. The cache is dropped once, when
+    the first request decided under a newer policy snapshot (``generation``)
+    arrives; requests still finishing under an older snapshot miss and do not
+    store, instead of clearing the cache back and forth.
+    """
+
+    def __init__(
+        self,
+        routes: Iterable[str],
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_body_bytes: int = 1024 * 1024,
+        ttl_seconds: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.routes = tuple(route.rstrip("/") for route in routes if route.strip())
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_body_bytes = max_body_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[CacheKey, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self._generation = -1
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig) -> ResponseCache | None:
+        """``None`` (no ETags, nothing cached) when ``RESPONSE_CACHE_ROUTES`` is empty."""
+        if not cfg.response_cache_routes:
+            return None
+        return cls(
+            cfg.response_cache_routes,
+            cfg.response_cache_max_entries,
+            cfg.response_cache_max_bytes,
+            cfg.response_cache_max_body_bytes,
+            cfg.response_cache_ttl_seconds,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def covers(self, method: str, path: str) -> bool:
+        if method != "GET":
+            return False
+        path = path.rstrip("/")
+        return any(path == route or path.startswith(f"{route}/") for route in self.routes)
+
+    def key(
+        self, principal: Principal | None, policy_version: str, project_code: str | None, path: str, query: str
+    ) -> CacheKeys:
+        return CacheKeys(
+            (acl_fingerprint(principal, policy_version, project_code), path, query),
+            (acl_fingerprint(principal, policy_version, project_code, shared=True), path, query),
+        )
+
+    def _current(self, generation: int) -> bool:
+        """Adopt a newer policy generation (dropping every entry); False for a request on an older one."""
+        if generation > self._generation:
+            self._entries.clear()
+            self._bytes = 0
+            self._generation = generation
+        return generation == self._generation
+
+    def get(self, keys: CacheKeys, generation: int) -> CachedResponse | None:
+        now = self._clock()
+        entry = None
+        with self._lock:
+            if self._current(generation):
+                for key in (keys.own, keys.shared):
+                    entry = self._entries.get(key)
+                    if entry is not None and now - entry.stored_at >= self.ttl_seconds:
+                        self._drop(key)
+                        entry = None
+                    if entry is not None:
+                        self._entries.move_to_end(key)
+                        break
+        cache_lookup("responses", hit=entry is not None)
+        return entry
+
+    def put(
+        self, keys: CacheKeys, generation: int, headers: Iterable[tuple[str, str]], body: bytes
+    ) -> CachedResponse | None:
+        """Tag ``body`` and keep it; ``None`` when the upstream marked it as not storable."""
+        headers = tuple(headers)
+        if not storable(headers):
+            return None
+        key = keys.shared if shareable(headers) else keys.own
+        kept = tuple((name, value) for name, value in headers if name.lower() not in _UNSTORED_HEADERS)
+        entry = CachedResponse(entity_tag(key, body), kept, body, self._clock())
+        if self.ttl_seconds <= 0 or self.max_entries <= 0 or len(body) > self.max_body_bytes:
+            return entry  # still tagged, so If-None-Match works; just not kept
+        with self._lock:
+            if not self._current(generation):
+                return entry
+            self._drop(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+                self.evictions += 1
+        return entry
+
+    def _drop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self._bytes, "evictions": self.evictions}
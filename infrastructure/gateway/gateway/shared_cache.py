@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+import fcntl
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any
+
+from gateway.config import GatewayConfig
+from gateway.metrics import cache_lookup, rate_limit_buckets
+
+logger = logging.getLogger(__name__)
+
+_DB_FILE = "cache.sqlite3"
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS claims (digest BLOB PRIMARY KEY, claims TEXT NOT NULL, kid TEXT, expires_at REAL)",
+    "CREATE INDEX IF NOT EXISTS claims_expiry ON claims (expires_at)",
+    "CREATE TABLE IF NOT EXISTS jwks (issuer TEXT PRIMARY KEY, document TEXT NOT NULL, fetched_at REAL)",
+    "CREATE TABLE IF NOT EXISTS rate_buckets (family TEXT NOT NULL, subject TEXT NOT NULL, tokens REAL NOT NULL, "
+    "updated REAL NOT NULL, full_at REAL NOT NULL, PRIMARY KEY (family, subject))",
+    "CREATE INDEX IF NOT EXISTS rate_buckets_full ON rate_buckets (full_at)",
+    "CREATE TABLE IF NOT EXISTS ingest_stored (project TEXT PRIMARY KEY, bytes INTEGER NOT NULL, scanned_at REAL)",
+    "CREATE TABLE IF NOT EXISTS ingest_reserved (project TEXT NOT NULL, pid INTEGER NOT NULL, bytes INTEGER NOT NULL, "
+    "PRIMARY KEY (project, pid))",
+)
+# Expired and over-limit claims rows (and refilled rate buckets) are swept once per this many writes.
+_SWEEP_EVERY = 256
+# A project's stored bytes are rescanned at most this often, and only while none of its uploads is in flight.
+_INGEST_RESCAN_SECONDS = 60.0
+
+
+def default_path(cfg: GatewayConfig) -> Path:
+    # tmpfs keeps the store off disk; verified claims are personal data.
+    root = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return Path(root) / f"ai-gateway-{cfg.bind_port}"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedCache:
+    """Verified claims, the JWKS document, rate-limit buckets and ingest quota usage shared by the gateway's workers.
+
+    An SQLite database (WAL mode) in a private ``0700`` directory, preferably on
+    tmpfs. Each worker keeps its in-memory caches and falls back to this store
+    on a miss, so a token verified by one worker is a cache hit in the others
+    and one IdP fetch serves every worker. Connections are opened per thread
+    and never cross a ``fork``. Like the in-process claims cache, rows are
+    keyed by SHA-256(token) and never hold the token itself.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = 10000, clock: Callable[[], float] = time.time) -> None:
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._clock = clock
+        self._local = threading.local()
+        self._writes = 0
+        self._bucket_writes = 0
+        self.path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        status = self.path.stat()
+        if status.st_uid != os.getuid() or status.st_mode & 0o077:
+            # Anyone else able to write here could plant "verified" claims.
+            raise PermissionError(f"shared cache directory {self.path} must be owned by this user with mode 0700")
+        db = sqlite3.connect(self.path / _DB_FILE, isolation_level=None)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                db.execute(statement)
+        finally:
+            db.close()
+
+    @classmethod
+    def from_config(cls, cfg: GatewayConfig) -> SharedCache | None:
+        """``None`` for a single worker unless ``GATEWAY_SHARED_CACHE_DIR`` is set.
+
+        Workers find the store by path, so every process started with the
+        same settings (forked by the gateway or by ``uvicorn --workers``)
+        shares it; the default is per bind port under ``/dev/shm``.
+        """
+        if cfg.shared_cache_dir:
+            return cls(cfg.shared_cache_dir, cfg.claims_cache_max_entries)
+        if cfg.workers <= 1:
+            return None
+        return cls(default_path(cfg), cfg.claims_cache_max_entries)
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None or getattr(self._local, "pid", None) != os.getpid():
+            db = sqlite3.connect(self.path / _DB_FILE, timeout=5.0, isolation_level=None)
+            db.execute("PRAGMA synchronous=OFF")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    @contextmanager
+    def _immediate(self) -> Iterator[sqlite3.Connection]:
+        """One ``BEGIN IMMEDIATE`` transaction: other workers' writes wait until it ends."""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _execute(self, sql: str, params: tuple[Any, ...] = ()) -> list[tuple[Any, ...]] | None:
+        """Run one statement; ``None`` when the store is unusable, which callers treat as a miss."""
+        try:
+            return self._db().execute(sql, params).fetchall()
+        except sqlite3.Error as exc:
+            logger.warning("shared cache unavailable: %s", exc)
+            return None
+
+    def get_claims(self, digest: bytes) -> tuple[dict[str, Any], str | None, float] | None:
+        rows = self._execute(
+            "SELECT claims, kid, expires_at FROM claims WHERE digest = ? AND expires_at > ?", (digest, self._clock())
+        )
+        cache_lookup("shared_claims", hit=bool(rows))
+        if not rows:
+            return None
+        claims, kid, expires_at = rows[0]
+        return json.loads(claims), kid, expires_at
+
+    def put_claims(self, digest: bytes, claims: dict[str, Any], kid: str | None, expires_at: float) -> None:
+        row = (digest, json.dumps(claims), kid, expires_at)
+        self._execute("INSERT OR REPLACE INTO claims VALUES (?, ?, ?, ?)", row)
+        self._writes += 1
+        if self._writes % _SWEEP_EVERY == 0:
+            self._execute("DELETE FROM claims WHERE expires_at <= ?", (self._clock(),))
+            self._execute(
+                "DELETE FROM claims WHERE digest IN "
+                "(SELECT digest FROM claims ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def get_jwks(self, issuer: str) -> tuple[dict[str, Any], float] | None:
+        """The last published JWKS document for ``issuer`` and its fetch time (wall clock)."""
+        rows = self._execute("SELECT document, fetched_at FROM jwks WHERE issuer = ?", (issuer,))
+        if not rows:
+            return None
+        document, fetched_at = rows[0]
+        return json.loads(document), fetched_at
+
+    def put_jwks(self, issuer: str, document: dict[str, Any], fetched_at: float) -> None:
+        self._execute("INSERT OR REPLACE INTO jwks VALUES (?, ?, ?)", (issuer, json.dumps(document), fetched_at))
+
+    def take_tokens(
+        self, family: str, subject: str, rate: float, burst: float, cost: float, max_entries: int
+    ) -> float | None:
+        """Refill the (family, subject) bucket and take ``cost`` tokens if it holds that many.
+
+        Returns the tokens the bucket held before taking, so the caller can
+        tell admission (``>= cost``) from the wait; ``None`` when the store is
+        unusable. Read and write happen in one ``BEGIN IMMEDIATE``
+        transaction, so two workers never spend the same tokens. Buckets are
+        stamped with the wall clock, which every worker shares.
+        """
+        now = self._clock()
+        try:
+            with self._immediate() as db:
+                row = db.execute(
+                    "SELECT tokens, updated FROM rate_buckets WHERE family = ? AND subject = ?", (family, subject)
+                ).fetchone()
+                tokens = burst if row is None else min(burst, row[0] + max(0.0, now - row[1]) * rate)
+                left = tokens - cost if tokens >= cost else tokens
+                db.execute(
+                    "INSERT OR REPLACE INTO rate_buckets VALUES (?, ?, ?, ?, ?)",
+                    (family, subject, left, now, now + (burst - left) / rate),
+                )
+        except sqlite3.Error as exc:
+            logger.warning("shared cache unavailable: %s", exc)
+            return None
+        self._bucket_writes += 1
+        if self._bucket_writes % _SWEEP_EVERY == 0:
+            self._sweep_buckets(now, max_entries)
+        return tokens
+
+    def _sweep_buckets(self, now: float, max_entries: int) -> None:
+        # A refilled bucket decides the same as a missing one.
+        self._execute("DELETE FROM rate_buckets WHERE full_at <= ?", (now,))
+        self._execute(
+            "DELETE FROM rate_buckets WHERE rowid IN "
+            "(SELECT rowid FROM rate_buckets ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+        rows = self._execute("SELECT COUNT(*) FROM rate_buckets")
+        if rows:
+            rate_limit_buckets.set(rows[0][0])
+
+    def _ingest_usage(self, db: sqlite3.Connection, project: str, scan: Callable[[], int]) -> int:
+        # Reservations of workers that died mid-upload are dropped rather than held forever.
+        reserved = 0
+        for pid, nbytes in db.execute("SELECT pid, bytes FROM ingest_reserved WHERE project = ?", (project,)):
+            if _alive(pid):
+                reserved += nbytes
+            else:
+                db.execute("DELETE FROM ingest_reserved WHERE project = ? AND pid = ?", (project, pid))
+        now = self._clock()
+        row = db.execute("SELECT bytes, scanned_at FROM ingest_stored WHERE project = ?", (project,)).fetchone()
+        if row is not None and (reserved or now - row[1] < _INGEST_RESCAN_SECONDS):
+            return row[0] + reserved
+        # Nothing in flight means every finished upload has been settled, so a scan agrees with the rows.
+        stored = scan()
+        db.execute("INSERT OR REPLACE INTO ingest_stored VALUES (?, ?, ?)", (project, stored, now))
+        return stored + reserved
+
+    def ingest_used(self, project: str, scan: Callable[[], int]) -> int | None:
+        """Stored plus reserved bytes of ``project`` across all workers; ``None`` when the store is unusable."""
+        try:
+            with self._immediate() as db:
+                return self._ingest_usage(db, project, scan)
+        except (sqlite3.Error, OSError) as exc:
+            logger.warning("shared cache unavailable: %s", exc)
+            return None
+
+    def reserve_ingest(self, project: str, nbytes: int, limit: int | None, scan: Callable[[], int]) -> bool | None:
+        """Reserve ``nbytes`` of an upload in flight unless the project would exceed ``limit``.
+
+        Usage is the project's stored bytes (``scan()``, redone while idle at
+        most every ``_INGEST_RESCAN_SECONDS``) plus every worker's
+        reservations; both are read and the charge written in one
+        ``BEGIN IMMEDIATE`` transaction, so workers cannot jointly overshoot.
+        ``None`` when the store is unusable.
+        """
+        try:
+            with self._immediate() as db:
+                if limit is not None and self._ingest_usage(db, project, scan) + nbytes > limit:
+                    return False
+                db.execute(
+                    "INSERT INTO ingest_reserved VALUES (?, ?, ?) "
+                    "ON CONFLICT (project, pid) DO UPDATE SET bytes = bytes + excluded.bytes",
+                    (project, os.getpid(), nbytes),
+                )
+        except (sqlite3.Error, OSError) as exc:
+            logger.warning("shared cache unavailable: %s", exc)
+            return None
+        return True
+
+    def settle_ingest(self, project: str, nbytes: int, stored: bool) -> bool:
+        """Drop ``nbytes`` of this worker's reservation, adding them to the stored bytes when ``stored``.
+
+        False when the store is unusable.
+        """
+        try:
+            with self._immediate() as db:
+                params = (nbytes, project, os.getpid())
+                db.execute("UPDATE ingest_reserved SET bytes = bytes - ? WHERE project = ? AND pid = ?", params)
+                db.execute("DELETE FROM ingest_reserved WHERE project = ? AND bytes <= 0", (project,))
+                if stored:
+                    db.execute("UPDATE ingest_stored SET bytes = bytes + ? WHERE project = ?", (nbytes, project))
+        except sqlite3.Error as exc:
+            logger.warning("shared cache unavailable: %s", exc)
+            return False
+        return True
+
+    @contextmanager
+    def lock(self, name: str) -> Iterator[None]:
+        """Exclusive across processes (``flock``), e.g. so only one worker fetches the JWKS at a time."""
+        with open(self.path / f"{name}.lock", "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
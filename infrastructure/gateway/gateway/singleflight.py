@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+import threading
+from typing import Any, TypeVar
+
+from gateway.metrics import singleflight_calls
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key onto one execution (threaded mode).
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight block until it finishes and receive the same result or exception.
+    Nothing is cached: the next call after completion runs ``fn`` again.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self._leader_metric = singleflight_calls.labels(flight=name, role="leader")
+        self._coalesced_metric = singleflight_calls.labels(flight=name, role="coalesced")
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            self._coalesced_metric.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self._leader_metric.inc()
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """``SingleFlight`` for the event loop: callers await one shared task per key.
+
+    The shared task is shielded, so a caller that is cancelled (e.g. the
+    client went away) does not cancel the fetch the other callers wait on.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._tasks: dict[Hashable, asyncio.Task[Any]] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self._leader_metric = singleflight_calls.labels(flight=name, role="leader")
+        self._coalesced_metric = singleflight_calls.labels(flight=name, role="coalesced")
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self.leaders += 1
+            self._leader_metric.inc()
+        else:
+            self.coalesced += 1
+            self._coalesced_metric.inc()
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task[Any]) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter was cancelled.
+            task.exception()
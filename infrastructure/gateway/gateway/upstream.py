@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterable, Awaitable, Callable, Iterable
+from dataclasses import dataclass
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from gateway.breaker import BreakerRegistry, CircuitBreaker
+from gateway.config import GatewayConfig
+from gateway.metrics import observe_stage, timed
+from gateway.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self) -> None:
+        with timed("upstream_connect"):
+            super().connect()
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self) -> None:
+        with timed("upstream_connect"):
+            super().connect()
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools record ``upstream_connect`` for every new connection."""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+@dataclass(frozen=True)
+class UpstreamHealth:
+    status: int
+    body: Any
+
+
+def _health_body(response: requests.Response | httpx.Response) -> Any:
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+class _HealthCache:
+    """Last ``/health`` answer per URL, reused for ``ttl_seconds`` to keep probe fan-out off the upstream."""
+
+    def __init__(self, ttl_seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._entries: dict[str, tuple[float, UpstreamHealth]] = {}
+
+    def get(self, url: str) -> UpstreamHealth | None:
+        entry = self._entries.get(url)
+        if entry is None or entry[0] <= self._clock():
+            return None
+        return entry[1]
+
+    def put(self, url: str, health: UpstreamHealth) -> UpstreamHealth:
+        if self._ttl > 0:
+            self._entries[url] = (self._clock() + self._ttl, health)
+        return health
+
+
+def _settle(
+    breaker: CircuitBreaker, generation: int, started: float, body: object, outcome: int | BaseException
+) -> None:
+    """Report one finished upstream call to its breaker and the ``upstream_response`` histogram.
+
+    ``generation`` is what ``breaker.acquire()`` admitted the call under.
+    ``outcome`` is the response status or the exception the call raised. An
+    over-limit client body or a cancelled request says nothing about the
+    upstream, so those give the breaker slot back instead of counting.
+    """
+    elapsed = time.perf_counter() - started
+    observe_stage("upstream_response", elapsed)
+    if isinstance(outcome, int):
+        breaker.record(generation, outcome < 500, elapsed)
+    elif isinstance(outcome, asyncio.CancelledError) or getattr(body, "exceeded", False):
+        breaker.cancel(generation)
+    else:
+        breaker.record(generation, False, elapsed)
+
+
+class UpstreamPool:
+    """Shared keep-alive connection pool for the threaded (sync) serving mode.
+
+    One ``requests.Session`` is shared by every worker thread. urllib3 opens at
+    most ``upstream_pool_max_per_host`` connections per upstream host (a request
+    past that waits for one to come back, like the async pool's per-host
+    semaphore) and keeps at most
+    ``upstream_pool_max_connections // upstream_pool_max_per_host`` host pools.
+
+    Every call goes through the upstream's ``CircuitBreaker`` and raises
+    ``CircuitOpenError`` without touching the network while it is open.
+    ``upstream_connect`` is observed only when a new connection is opened;
+    ``upstream_response`` covers request send until the response headers arrive.
+    """
+
+    def __init__(self, cfg: GatewayConfig) -> None:
+        self._timeout = (cfg.upstream_connect_timeout_seconds, cfg.upstream_read_timeout_seconds)
+        self.breakers = BreakerRegistry.from_config(cfg)
+        self._health = _HealthCache(cfg.upstream_health_cache_seconds)
+        self._health_flight = SingleFlight("upstream_health")
+        adapter = _TimedAdapter(
+            pool_connections=max(1, cfg.upstream_pool_max_connections // cfg.upstream_pool_max_per_host),
+            pool_maxsize=cfg.upstream_pool_max_per_host,
+            pool_block=True,
+        )
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _send(self, method: str, url: str, body: Iterable[bytes] | None = None, **kwargs: Any) -> requests.Response:
+        breaker = self.breakers.get(_host_key(url))
+        generation = breaker.acquire()
+        started = time.perf_counter()
+        try:
+            response = self._session.request(method, url, data=body, timeout=self._timeout, **kwargs)
+        except BaseException as exc:
+            _settle(breaker, generation, started, body, exc)
+            raise
+        _settle(breaker, generation, started, body, response.status_code)
+        return response
+
+    def get(self, url: str, headers: dict[str, str] | None = None) -> requests.Response:
+        return self._send("GET", url, headers=headers)
+
+    def circuit_state(self, url: str) -> str:
+        return self.breakers.get(_host_key(url)).state
+
+    def health(self, url: str) -> UpstreamHealth:
+        """Upstream ``/health`` via the short-lived cache; concurrent misses share one request."""
+        cached = self._health.get(url)
+        if cached is not None:
+            return cached
+        return self._health_flight.do(url, lambda: self._fetch_health(url))
+
+    def _fetch_health(self, url: str) -> UpstreamHealth:
+        response = self.get(url)
+        return self._health.put(url, UpstreamHealth(response.status_code, _health_body(response)))
+
+    def stream(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        body: Iterable[bytes] | None = None,
+    ) -> requests.Response:
+        """Send ``body`` as it is produced and return without reading the response body.
+
+        The caller must ``close()`` the response to hand the connection back to the pool.
+        """
+        return self._send(method, url, body, headers=headers, stream=True, allow_redirects=False)
+
+    def close(self) -> None:
+        self._session.close()
+
+
+def _connect_trace(url: str) -> Callable[[str, dict[str, Any]], Awaitable[None]]:
+    """httpcore ``trace`` hook recording ``upstream_connect`` (TCP plus TLS for https).
+
+    httpcore only emits these events when the pool opens a new connection.
+    """
+    done_event = "connection.start_tls.complete" if url.startswith("https:") else "connection.connect_tcp.complete"
+    started = 0.0
+
+    async def trace(event_name: str, info: dict[str, Any]) -> None:
+        nonlocal started
+        if event_name == "connection.connect_tcp.started":
+            started = time.perf_counter()
+        elif event_name == done_event:
+            observe_stage("upstream_connect", time.perf_counter() - started)
+
+    return trace
+
+
+class AsyncUpstreamStream:
+    """An open upstream response plus the per-host slot it occupies until closed."""
+
+    def __init__(self, response: httpx.Response, slots: asyncio.Semaphore) -> None:
+        self.response = response
+        self._slots = slots
+        self._released = False
+
+    async def aclose(self) -> None:
+        try:
+            await self.response.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._slots.release()
+
+
+class AsyncUpstreamPool:
+    """Shared keep-alive connection pool for the async (ASGI) serving mode.
+
+    ``httpx`` bounds the total number of connections; the per-host limit is
+    enforced with one semaphore per upstream origin so a single slow backend
+    cannot take every connection in the pool.
+    """
+
+    def __init__(self, cfg: GatewayConfig) -> None:
+        self._per_host = cfg.upstream_pool_max_per_host
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+        self.breakers = BreakerRegistry.from_config(cfg)
+        self._health = _HealthCache(cfg.upstream_health_cache_seconds)
+        self._health_flight = AsyncSingleFlight("upstream_health")
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=cfg.upstream_pool_max_connections,
+                max_keepalive_connections=cfg.upstream_pool_max_connections,
+                keepalive_expiry=cfg.upstream_keepalive_seconds,
+            ),
+            timeout=httpx.Timeout(
+                cfg.upstream_read_timeout_seconds,
+                connect=cfg.upstream_connect_timeout_seconds,
+            ),
+        )
+
+    def _slots(self, url: str) -> asyncio.Semaphore:
+        key = _host_key(url)
+        slots = self._host_slots.get(key)
+        if slots is None:
+            slots = self._host_slots[key] = asyncio.Semaphore(self._per_host)
+        return slots
+
+    async def _acquire(self, url: str) -> tuple[CircuitBreaker, int, asyncio.Semaphore]:
+        breaker = self.breakers.get(_host_key(url))
+        generation = breaker.acquire()
+        slots = self._slots(url)
+        try:
+            await slots.acquire()
+        except BaseException:
+            breaker.cancel(generation)
+            raise
+        return breaker, generation, slots
+
+    def circuit_state(self, url: str) -> str:
+        return self.breakers.get(_host_key(url)).state
+
+    async def get(self, url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+        breaker, generation, slots = await self._acquire(url)
+        started = time.perf_counter()
+        try:
+            response = await self._client.get(url, headers=headers, extensions={"trace": _connect_trace(url)})
+        except BaseException as exc:
+            _settle(breaker, generation, started, None, exc)
+            raise
+        finally:
+            slots.release()
+        _settle(breaker, generation, started, None, response.status_code)
+        return response
+
+    async def health(self, url: str) -> UpstreamHealth:
+        cached = self._health.get(url)
+        if cached is not None:
+            return cached
+        return await self._health_flight.do(url, lambda: self._fetch_health(url))
+
+    async def _fetch_health(self, url: str) -> UpstreamHealth:
+        response = await self.get(url)
+        return self._health.put(url, UpstreamHealth(response.status_code, _health_body(response)))
+
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        body: AsyncIterable[bytes] | None = None,
+    ) -> AsyncUpstreamStream:
+        """Send ``body`` as it arrives; the per-host slot is held until the stream is closed."""
+        breaker, generation, slots = await self._acquire(url)
+        started = time.perf_counter()
+        try:
+            request = self._client.build_request(
+                method, url, headers=headers, content=body, extensions={"trace": _connect_trace(url)}
+            )
+            response = await self._client.send(request, stream=True)
+        except BaseException as exc:
+            slots.release()
+            _settle(breaker, generation, started, body, exc)
+            raise
+        _settle(breaker, generation, started, body, response.status_code)
+        return AsyncUpstreamStream(response, slots)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
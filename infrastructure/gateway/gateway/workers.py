@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import select
+import signal
+import socket
+import struct
+import tempfile
+import threading
+import time
+
+from gateway.readiness import sd_notify
+
+logger = logging.getLogger(__name__)
+
+# A worker that dies sooner than this after starting is restarted after a pause,
+# so a broken configuration does not turn into a fork loop.
+_MIN_WORKER_LIFETIME_SECONDS = 1.0
+# How often a supervisor that relays notifications looks for exited workers.
+_REAP_INTERVAL_SECONDS = 0.5
+_CREDENTIALS = struct.Struct("3i")  # struct ucred: pid, uid, gid
+
+
+def listen(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.create_server((host, port), backlog=backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class NotifyRelay:
+    """Speaks to systemd for worker processes that each run a readiness thread.
+
+    systemd's default ``NotifyAccess=main`` drops messages that do not come
+    from the service's main PID, and with several workers ``READY=1`` and
+    ``WATCHDOG=1`` are sent from the workers. The relay binds a socket of its
+    own and points ``NOTIFY_SOCKET`` at it for the workers started afterwards;
+    from the main process it passes on ``READY=1`` once ``workers`` processes
+    have sent it, and ``WATCHDOG=1`` once that many distinct processes have
+    pinged since the last one passed on, so one wedged worker still trips the
+    watchdog. The sender of each message is taken from its ``SCM_CREDENTIALS``.
+    """
+
+    def __init__(self, workers: int, target: str) -> None:
+        self.workers = workers
+        self.target = target
+        self._ready: set[int] = set()
+        self._pinged: set[int] = set()
+        self._notified_ready = False
+        self._dir = Path(tempfile.mkdtemp(prefix="ai-gateway-notify-"))
+        self.address = str(self._dir / "notify")
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_PASSCRED, 1)
+        self._sock.bind(self.address)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_environment(cls, workers: int) -> NotifyRelay | None:
+        """A bound relay that workers will notify, or None without ``NOTIFY_SOCKET`` or several workers."""
+        target = os.environ.get("NOTIFY_SOCKET")
+        if not target or workers <= 1:
+            return None
+        relay = cls(workers, target)
+        os.environ["NOTIFY_SOCKET"] = relay.address
+        return relay
+
+    def handle(self, pid: int, message: str) -> list[str]:
+        """Record ``message`` from worker ``pid``; the messages to pass on to systemd."""
+        forward = []
+        for line in message.splitlines():
+            if line == "READY=1":
+                self._ready.add(pid)
+                if not self._notified_ready and len(self._ready) >= self.workers:
+                    self._notified_ready = True
+                    forward.append(line)
+            elif line == "WATCHDOG=1":
+                self._pinged.add(pid)
+                if len(self._pinged) >= self.workers:
+                    self._pinged.clear()
+                    forward.append(line)
+        return forward
+
+    def receive(self, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds and pass on whatever the workers sent meanwhile."""
+        readable, _, _ = select.select([self._sock], [], [], timeout)
+        space = socket.CMSG_SPACE(_CREDENTIALS.size)
+        while readable:
+            try:
+                data, ancillary, _, _ = self._sock.recvmsg(4096, space, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return
+            for level, kind, payload in ancillary:
+                if level == socket.SOL_SOCKET and kind == socket.SCM_CREDENTIALS:
+                    pid, _, _ = _CREDENTIALS.unpack(payload[: _CREDENTIALS.size])
+                    for line in self.handle(pid, data.decode("utf-8", "replace")):
+                        sd_notify(line, self.target)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.receive(_REAP_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        """Relay from a background thread, for a main process that does not fork afterwards."""
+        self._thread = threading.Thread(target=self._run, name="notify-relay", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._sock.close()
+        Path(self.address).unlink(missing_ok=True)
+        self._dir.rmdir()
+
+
+def watch_spawned_workers(on_exit: Callable[[int], None], interval_seconds: float = 5.0) -> threading.Event:
+    """Call ``on_exit(pid)`` from a background thread for each ``multiprocessing`` child that exits.
+
+    For worker processes started by someone else's supervisor in this process
+    (uvicorn's ``workers``), whose exits the gateway is never told about.
+    Setting the returned event stops the watch.
+    """
+    stop = threading.Event()
+
+    def watch() -> None:
+        known: set[int] = set()
+        while not stop.is_set():
+            alive = {child.pid for child in multiprocessing.active_children() if child.pid is not None}
+            for pid in known - alive:
+                on_exit(pid)
+            known = alive
+            stop.wait(interval_seconds)
+
+    threading.Thread(target=watch, name="worker-exits", daemon=True).start()
+    return stop
+
+
+def serve_workers(
+    count: int,
+    sock: socket.socket,
+    run_worker: Callable[[socket.socket], None],
+    on_exit: Callable[[int], None] | None = None,
+    relay: NotifyRelay | None = None,
+) -> None:
+    """Pre-fork supervisor: ``count`` child processes accept on one listening socket.
+
+    Each child runs ``run_worker(sock)`` and owns its own threads, so this must
+    be called before the parent starts any. A child that exits is replaced
+    until the parent gets ``SIGTERM``/``SIGINT``, which it forwards to every
+    child before waiting for them. ``on_exit(pid)`` runs in the parent for
+    every child that exits. With a ``relay`` the parent passes on the
+    children's systemd notifications while it waits, without a thread of its
+    own to fork under.
+    """
+    children: dict[int, float] = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(sock)
+            except BaseException:  # noqa: BLE001
+                logger.exception("gateway worker %d failed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum: int, frame: object) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        for _ in range(count):
+            spawn()
+        logger.info("gateway serving with %d workers", count)
+        while children:
+            try:
+                pid, status = _wait(relay)
+            except ChildProcessError:
+                break
+            started = children.pop(pid, None)
+            if on_exit is not None:
+                on_exit(pid)
+            if stopping or started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            logger.warning("gateway worker %d exited with status %d, restarting", pid, code)
+            if time.monotonic() - started < _MIN_WORKER_LIFETIME_SECONDS:
+                time.sleep(_MIN_WORKER_LIFETIME_SECONDS)
+            if not stopping:
+                spawn()
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+        sock.close()
+
+
+def _wait(relay: NotifyRelay | None) -> tuple[int, int]:
+    if relay is None:
+        return os.wait()
+    while True:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid:
+            return pid, status
+        relay.receive(_REAP_INTERVAL_SECONDS)
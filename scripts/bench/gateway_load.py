@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Offline gateway load test: auth, policy and proxy paths against local stand-ins.
+
+Starts a stand-in OIDC issuer (discovery + JWKS from a generated key) and a
+stand-in upstream on 127.0.0.1, runs the gateway with the 10.50 example
+policy, and drives each scenario with a fixed number of concurrent clients.
+No Keycloak is needed.
+
+Scenarios:
+  auth    GET /whoami with a fresh token per request (full RS256 verification)
+  policy  GET /whoami with one token (claims cache hit, group index, policy decision)
+  proxy   GET /search/query relayed to the upstream (auth + policy + proxy)
+
+For every scenario and serving mode the report holds requests/s, p50/p95/p99
+latency, errors and gateway CPU milliseconds per request. Results are written
+as JSON; ``--baseline`` prints the change against an earlier run.
+
+Usage:
+  python3 scripts/bench/gateway_load.py --concurrency 16 --requests 2000
+  python3 scripts/bench/gateway_load.py --baseline artifacts/bench/gateway-load-abc1234.json
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import tempfile
+import time
+
+import requests
+
+from gateway_standins import GATEWAY_DIR, REPO_ROOT, StandInIssuer, StandInUpstream, start_gateway, stop_gateway
+
+SCENARIOS = ("auth", "policy", "proxy")
+PROJECT = "BANANA-PEEL"
+POLICY_FILES = (
+    ("10.50-rbac.yaml.example", "rbac.yaml"),
+    ("10.50-policy-matrix.yaml.example", "policy-matrix.yaml"),
+    ("10.50-projects.yaml.example", "projects.yaml"),
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def realistic_groups(noise_groups: int) -> list[str]:
+    """A directory-sized groups claim: AD noise plus platform and project groups."""
+    groups = [f"AD-DEPT-{index:04d}" for index in range(noise_groups)]
+    groups += [
+        "AI-OPS-READONLY",
+        f"AI-NC-PROJ-{PROJECT}-VIEW",
+        f"AI-NC-PROJ-{PROJECT}-EDIT",
+        "AI-NC-PROJ-NIGHT-PENGUIN-VIEW",
+        "AI-NC-PROJ-MASTER-OWNER",
+    ]
+    return groups
+
+
+def process_cpu_seconds(pid: int) -> float | None:
+    """utime + stime of ``pid`` from /proc (Linux only)."""
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def drive(
+    url: str,
+    headers_for: Callable[[int], dict[str, str]],
+    concurrency: int,
+    total: int,
+    expected_status: int = 200,
+) -> dict[str, float]:
+    """Send ``total`` GETs from ``concurrency`` keep-alive clients; request ``i`` uses ``headers_for(i)``."""
+    per_worker = max(1, total // concurrency)
+
+    def worker(index: int) -> tuple[list[float], int]:
+        latencies: list[float] = []
+        errors = 0
+        with requests.Session() as session:
+            for offset in range(per_worker):
+                headers = headers_for(index * per_worker + offset)
+                start = time.perf_counter()
+                response = session.get(url, headers=headers, timeout=30)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != expected_status:
+                    errors += 1
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [value for worker_latencies, _ in results for value in worker_latencies]
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def run_scenario(
+    name: str,
+    base_url: str,
+    pid: int,
+    issuer: StandInIssuer,
+    groups: list[str],
+    concurrency: int,
+    total: int,
+) -> dict[str, float]:
+    if name == "auth":
+        # One token per request so every request pays for signature verification.
+        tokens = [issuer.mint(sub=f"bench-user-{index}", groups=groups) for index in range(total)]
+        url, headers_for = f"{base_url}/whoami", lambda index: {"Authorization": f"Bearer {tokens[index]}"}
+    else:
+        token = issuer.mint(groups=groups)
+        headers = {"Authorization": f"Bearer {token}", "X-Project-Code": PROJECT}
+        path = "/whoami" if name == "policy" else "/search/query"
+        url, headers_for = f"{base_url}{path}", lambda index: headers
+        drive(url, headers_for, concurrency=min(4, concurrency), total=40)  # warm caches and pools
+
+    cpu_before = process_cpu_seconds(pid)
+    result = drive(url, headers_for, concurrency, total)
+    cpu_after = process_cpu_seconds(pid)
+    if cpu_before is not None and cpu_after is not None:
+        result["cpu_ms_per_request"] = round((cpu_after - cpu_before) * 1000 / result["requests"], 3)
+    return result
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    lines = []
+    for mode, scenarios in current["results"].items():
+        for scenario, result in scenarios.items():
+            before = baseline.get("results", {}).get(mode, {}).get(scenario)
+            if not before:
+                continue
+            deltas = []
+            for key in ("rps", "p99_ms", "cpu_ms_per_request"):
+                if before.get(key) and key in result:
+                    deltas.append(f"{key} {before[key]} -> {result[key]} ({(result[key] / before[key] - 1) * 100:+.1f}%)")
+            lines.append(f"{mode}/{scenario}: " + ", ".join(deltas))
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario and mode")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--noise-groups", type=int, default=200, help="unrelated directory groups in each token")
+    parser.add_argument("--upstream-delay-ms", type=float, default=0.0)
+    parser.add_argument("--output", type=Path, help="JSON report path (default artifacts/bench/gateway-load-<rev>.json)")
+    parser.add_argument("--baseline", type=Path, help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    revision = git_revision()
+    groups = realistic_groups(args.noise_groups)
+    issuer = StandInIssuer()
+    upstream = StandInUpstream(delay_seconds=args.upstream_delay_ms / 1000)
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    try:
+        with tempfile.TemporaryDirectory() as policy_dir:
+            for source, name in POLICY_FILES:
+                shutil.copyfile(GATEWAY_DIR / source, Path(policy_dir) / name)
+            for mode in args.modes.split(","):
+                port = free_port()
+                env = {
+                    "GATEWAY_SERVER_MODE": mode,
+                    "KEYCLOAK_ISSUER": issuer.url,
+                    "UPSTREAM_URL": upstream.url,
+                    "GATEWAY_POLICY_DIR": policy_dir,
+                }
+                proc = start_gateway(port, env)
+                try:
+                    results[mode] = {
+                        name: run_scenario(
+                            name, f"http://127.0.0.1:{port}", proc.pid, issuer, groups, args.concurrency, args.requests
+                        )
+                        for name in scenarios
+                    }
+                finally:
+                    stop_gateway(proc)
+    finally:
+        issuer.close()
+        upstream.close()
+
+    report = {
+        "revision": revision,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "parameters": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "noise_groups": args.noise_groups,
+            "groups_per_token": len(groups),
+            "upstream_delay_ms": args.upstream_delay_ms,
+        },
+        "results": results,
+    }
+    output = args.output or REPO_ROOT / "artifacts" / "bench" / f"gateway-load-{revision or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    print(json.dumps(report["results"], indent=2))
+    print(f"report: {output}")
+    if args.baseline:
+        for line in compare(report, json.loads(args.baseline.read_text(encoding="utf-8"))):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
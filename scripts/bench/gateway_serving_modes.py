@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Compare the gateway's sync (Flask, threaded) and async (ASGI) serving modes.
+
+Starts a stand-in issuer and upstream on 127.0.0.1, runs the gateway once per
+mode, drives ``/api/protected/health`` with a fixed number of concurrent
+clients and prints requests per second plus p50/p99 latency.
+
+Usage:
+  python3 scripts/bench/gateway_serving_modes.py --concurrency 32 --requests 4000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+
+from gateway_load import drive, free_port
+from gateway_standins import StandInIssuer, StandInUpstream, start_gateway, stop_gateway
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--upstream-delay-ms", type=float, default=5.0)
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args()
+
+    issuer = StandInIssuer()
+    upstream = StandInUpstream(delay_seconds=args.upstream_delay_ms / 1000)
+    headers = {"Authorization": f"Bearer {issuer.mint()}"}
+    results = {}
+    try:
+        for mode in args.modes.split(","):
+            port = free_port()
+            proc = start_gateway(
+                port,
+                {"GATEWAY_SERVER_MODE": mode, "KEYCLOAK_ISSUER": issuer.url, "UPSTREAM_URL": upstream.url},
+            )
+            try:
+                url = f"http://127.0.0.1:{port}/api/protected/health"
+                drive(url, lambda _: headers, concurrency=4, total=40)  # warm JWKS and connection pools
+                results[mode] = drive(url, lambda _: headers, args.concurrency, args.requests)
+            finally:
+                stop_gateway(proc)
+    finally:
+        issuer.close()
+        upstream.close()
+
+    print(json.dumps({"concurrency": args.concurrency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
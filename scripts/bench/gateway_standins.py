@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Local stand-ins for Keycloak and the reference-app used by the gateway benchmarks.
+
+Nothing here talks to the network beyond 127.0.0.1; keys are generated per run.
+"""
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+import jwt
+from jwt.algorithms import RSAAlgorithm
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+GATEWAY_DIR = REPO_ROOT / "infrastructure" / "gateway"
+
+
+class _KeepAliveServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class JsonStandIn:
+    """Threaded HTTP/1.1 server answering GET requests with JSON bodies; ``hits`` counts requests per path."""
+
+    def __init__(self) -> None:
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:  # noqa: N802
+                owner.hits[self.path] = owner.hits.get(self.path, 0) + 1
+                status, body = owner.handle(self.path)
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                return
+
+        self.hits: dict[str, int] = {}
+        self._server = _KeepAliveServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, path: str) -> tuple[int, Any]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StandInIssuer(JsonStandIn):
+    """OIDC discovery + JWKS from a freshly generated RS256 key."""
+
+    def __init__(self, kid: str = "bench-key-1") -> None:
+        self.kid = kid
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+        self._jwks = {"keys": [jwk]}
+        super().__init__()
+
+    def handle(self, path: str) -> tuple[int, Any]:
+        if path == "/.well-known/openid-configuration":
+            return 200, {"issuer": self.url, "jwks_uri": f"{self.url}/jwks"}
+        if path == "/jwks":
+            return 200, self._jwks
+        return 404, {"error": "not_found"}
+
+    def mint(self, ttl_seconds: int = 3600, **claims: Any) -> str:
+        now = int(time.time())
+        payload = {"sub": "bench-user", "iss": self.url, "iat": now, "exp": now + ttl_seconds}
+        payload.update(claims)
+        return jwt.encode(payload, self.private_key, algorithm="RS256", headers={"kid": self.kid})
+
+
+class StandInUpstream(JsonStandIn):
+    """Reference-app look-alike with an optional fixed service delay.
+
+    ``/health`` answers like the reference app; any other path echoes itself
+    so proxied routes (``/search/...``, ``/graph/...``) have a backend.
+    """
+
+    def __init__(self, delay_seconds: float = 0.0) -> None:
+        self.delay_seconds = delay_seconds
+        super().__init__()
+
+    def handle(self, path: str) -> tuple[int, Any]:
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        if path == "/health":
+            return 200, {"status": "healthy"}
+        return 200, {"path": path}
+
+
+def start_gateway(port: int, env: dict[str, str]) -> subprocess.Popen:
+    """Run infrastructure/gateway/app.py in a child process and wait for /health."""
+    child_env = dict(os.environ, GATEWAY_BIND_HOST="127.0.0.1", GATEWAY_BIND_PORT=str(port), **env)
+    proc = subprocess.Popen(
+        [sys.executable, "app.py"],
+        cwd=GATEWAY_DIR,
+        env=child_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gateway exited early with code {proc.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=0.5).status_code == 200:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("gateway did not become healthy within 20s")
+
+
+def stop_gateway(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Measure gateway throughput as GATEWAY_WORKERS grows from 1 to N processes.
+
+Starts a stand-in issuer and upstream on 127.0.0.1, runs the gateway once per
+worker count and drives ``/whoami`` with a fresh RS256 token per request, so
+every request pays for a signature verification. Load comes from several
+client processes, so the client side does not stop scaling at one core.
+
+For each worker count the report holds requests/s, p50/p99 latency, speed-up
+over one worker and the number of JWKS fetches the issuer saw, which should
+stay at one however many workers share the keyset.
+
+Usage:
+  python3 scripts/bench/gateway_workers.py --workers 1,2,4 --requests 6000
+  python3 scripts/bench/gateway_workers.py --mode async --client-processes 8
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from gateway_load import POLICY_FILES, drive, free_port
+from gateway_standins import GATEWAY_DIR, StandInIssuer, StandInUpstream, start_gateway, stop_gateway
+
+
+def _drive_tokens(url: str, tokens: list[str], concurrency: int) -> dict[str, float]:
+    return drive(url, lambda index: {"Authorization": f"Bearer {tokens[index]}"}, concurrency, len(tokens))
+
+
+def _split(items: list[str], parts: int) -> list[list[str]]:
+    return [items[index::parts] for index in range(parts)]
+
+
+def run(url: str, tokens: list[str], client_processes: int, concurrency: int) -> dict[str, float]:
+    """Drive ``url`` from ``client_processes`` processes, ``concurrency`` connections in total."""
+    per_process = max(1, concurrency // client_processes)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=client_processes) as pool:
+        futures = [pool.submit(_drive_tokens, url, part, per_process) for part in _split(tokens, client_processes)]
+        parts = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    completed = sum(part["requests"] for part in parts)
+    # Median of the per-process medians and the worst per-process p99: rough, but enough to compare runs.
+    return {
+        "requests": completed,
+        "errors": sum(part["errors"] for part in parts),
+        "rps": round(completed / elapsed, 1),
+        "p50_ms": round(statistics.median(part["p50_ms"] for part in parts), 2),
+        "p99_ms": max(part["p99_ms"] for part in parts),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4, 8) if n <= (os.cpu_count() or 1)))
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--requests", type=int, default=6000, help="requests per worker count")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--client-processes", type=int, default=max(2, (os.cpu_count() or 2) // 2))
+    args = parser.parse_args()
+
+    issuer = StandInIssuer()
+    upstream = StandInUpstream()
+    # Minting is the expensive half of RS256; do it once, outside the measurement.
+    tokens = [issuer.mint(sub=f"bench-user-{index}") for index in range(args.requests)]
+    warmup = [issuer.mint(sub="bench-warmup")] * (args.client_processes * 8)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as policy_dir:
+            for source, name in POLICY_FILES:
+                shutil.copyfile(GATEWAY_DIR / source, Path(policy_dir) / name)
+            for workers in (int(value) for value in args.workers.split(",")):
+                port = free_port()
+                fetches_before = issuer.hits.get("/jwks", 0)
+                env = {
+                    "GATEWAY_SERVER_MODE": args.mode,
+                    "GATEWAY_WORKERS": str(workers),
+                    "GATEWAY_SHARED_CACHE_DIR": str(Path(policy_dir) / f"shared-{workers}"),
+                    "KEYCLOAK_ISSUER": issuer.url,
+                    "UPSTREAM_URL": upstream.url,
+                    "GATEWAY_POLICY_DIR": policy_dir,
+                }
+                proc = start_gateway(port, env)
+                try:
+                    url = f"http://127.0.0.1:{port}/whoami"
+                    run(url, warmup, args.client_processes, args.client_processes * 2)  # JWKS and pools
+                    results[workers] = run(url, tokens, args.client_processes, args.concurrency)
+                finally:
+                    stop_gateway(proc)
+                results[workers]["jwks_fetches"] = issuer.hits.get("/jwks", 0) - fetches_before
+    finally:
+        issuer.close()
+        upstream.close()
+
+    baseline = results[min(results)]["rps"]
+    for result in results.values():
+        result["speedup"] = round(result["rps"] / baseline, 2)
+    print(json.dumps({"mode": args.mode, "cpus": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Compare /api/login latency with inline and queued log writes in the reference app.
+
+Runs ``services/reference-app`` under a threaded werkzeug server twice: once
+with ``LOG_QUEUE_MAX_ENTRIES=0`` (every log line and audit event written and
+flushed on the request thread, the old behaviour) and once with the bounded
+background writer. The app's stdout is a pipe drained by a collector thread
+that can be slowed down (``--collector-delay-ms`` per 4 KiB read) to stand in
+for a busy container log driver.
+
+Each run drives POST /api/login from ``--concurrency`` keep-alive clients and
+reports requests/s, p50/p95/p99 latency, errors and the log lines that
+reached the collector.
+
+Usage:
+  python3 scripts/bench/reference_app_login.py --concurrency 32 --requests 4000
+  python3 scripts/bench/reference_app_login.py --collector-delay-ms 1
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from gateway_load import free_port, percentile
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+APP_DIR = REPO_ROOT / "services" / "reference-app"
+MODES = {"inline": "0", "queued": "10000"}
+_SERVE = (
+    "import sys; from werkzeug.serving import run_simple; from app import app; "
+    "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)"
+)
+
+
+class Collector:
+    """Drains the app's stdout like a log driver; counts lines."""
+
+    def __init__(self, stream, delay_seconds: float) -> None:
+        self.lines = 0
+        self._stream = stream
+        self._delay = delay_seconds
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while chunk := self._stream.read1(4096):
+            self.lines += chunk.count(b"\n")
+            if self._delay:
+                time.sleep(self._delay)
+
+    def join(self) -> None:
+        self._thread.join(10)
+
+
+def start_app(port: int, queue_entries: str) -> subprocess.Popen:
+    env = dict(os.environ, LOG_QUEUE_MAX_ENTRIES=queue_entries)
+    proc = subprocess.Popen(
+        [sys.executable, "-c", _SERVE, str(port)],
+        cwd=APP_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/health", timeout=0.5)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("reference app did not start")
+
+
+def drive_logins(url: str, concurrency: int, total: int) -> dict[str, float]:
+    per_worker = max(1, total // concurrency)
+
+    def worker(index: int) -> tuple[list[float], int]:
+        latencies: list[float] = []
+        errors = 0
+        with requests.Session() as session:
+            for offset in range(per_worker):
+                # Alternate success and failure so both audit paths are exercised.
+                password = "demo-password" if offset % 2 else "wrong"
+                start = time.perf_counter()
+                response = session.post(url, json={"username": f"user-{index}", "password": password}, timeout=30)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code not in (200, 401):
+                    errors += 1
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies = [value for worker_latencies, _ in results for value in worker_latencies]
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=4000, help="logins per mode")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--collector-delay-ms", type=float, default=0.5, help="pause after each 4 KiB read of stdout")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        port = free_port()
+        proc = start_app(port, MODES[mode])
+        collector = Collector(proc.stdout, args.collector_delay_ms / 1000)
+        try:
+            url = f"http://127.0.0.1:{port}/api/login"
+            drive_logins(url, min(4, args.concurrency), 100)  # warm up
+            results[mode] = drive_logins(url, args.concurrency, args.requests)
+        finally:
+            proc.send_signal(signal.SIGINT)  # a clean exit, so the writer drains its queue
+            proc.wait(15)
+            collector.join()
+        results[mode]["log_lines"] = collector.lines
+    print(json.dumps({"collector_delay_ms": args.collector_delay_ms, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Measure reference-app /metrics scrape cost in Prometheus multiprocess mode.
+
+For each worker count the script starts N reference-app processes with
+``PROMETHEUS_MULTIPROC_DIR`` pointing at a fresh directory. gunicorn is not
+needed: each process imports the app the way a gunicorn worker does. Every
+process serves ``--requests`` logins, health checks and 404s through the Flask
+test client. While the workers are still alive, a separate scraper process
+renders ``/metrics`` ``--scrapes`` times. It reports the median and p95 scrape
+time, the payload size, the scraper's peak RSS, and the number and size of the
+``.db`` files.
+
+The workers then exit and are folded with ``worker_exited``, the same call as
+gunicorn's ``child_exit`` hook. The scrape is measured again, and the
+``in_memory`` row gives the single-process baseline.
+
+Usage:
+  python3 scripts/bench/reference_app_metrics.py
+  python3 scripts/bench/reference_app_metrics.py --workers 1,4,16 --scrapes 50
+"""
+from __future__ import annotations
+
+from pathlib import Path
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+APP_DIR = REPO_ROOT / "services" / "reference-app"
+
+# Serves traffic, reports readiness on stdout, then waits for stdin to close before exiting.
+_WORKER = """
+import sys
+from app import app
+client = app.test_client()
+for index in range(int(sys.argv[1])):
+    client.post("/api/login", json={"password": "demo-password" if index % 2 else "wrong"})
+    client.get("/health")
+    client.get(f"/scan/{index % 50}")
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+_SCRAPER = """
+import json, resource, statistics, sys, time
+from multiprocess_metrics import scrape
+timings = []
+for _ in range(int(sys.argv[1])):
+    start = time.perf_counter()
+    payload, _ = scrape()
+    timings.append(time.perf_counter() - start)
+timings.sort()
+print(json.dumps({
+    "scrape_p50_ms": round(statistics.median(timings) * 1000, 2),
+    "scrape_p95_ms": round(timings[int(0.95 * (len(timings) - 1))] * 1000, 2),
+    "payload_bytes": len(payload),
+    "scraper_max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+
+def run_scraper(scrapes: int, path: str | None) -> dict:
+    env = dict(os.environ, LOG_QUEUE_MAX_ENTRIES="0")  # log lines land before the result line
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    if path:
+        env["PROMETHEUS_MULTIPROC_DIR"] = path
+    if not path:
+        # Baseline: the scraper process is also the one that served the traffic.
+        script = _WORKER.replace('print("ready", flush=True)\nsys.stdin.read()\n', "") + _SCRAPER
+        args = [sys.executable, "-c", script, str(scrapes)]
+    else:
+        args = [sys.executable, "-c", _SCRAPER, str(scrapes)]
+    result = subprocess.run(args, cwd=APP_DIR, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def directory_stats(path: str) -> dict:
+    files = glob.glob(os.path.join(path, "*.db"))
+    return {"db_files": len(files), "db_kib": round(sum(os.path.getsize(name) for name in files) / 1024, 1)}
+
+
+def measure(workers: int, requests: int, scrapes: int) -> dict:
+    sys.path.insert(0, str(APP_DIR))
+    from multiprocess_metrics import prepare_directory, worker_exited
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metrics")
+        prepare_directory(path)
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=path, LOG_QUEUE_MAX_ENTRIES="0")
+        procs = [
+            subprocess.Popen(
+                [sys.executable, "-c", _WORKER, str(requests)],
+                cwd=APP_DIR,
+                env=env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+            for _ in range(workers)
+        ]
+        try:
+            for proc in procs:
+                # Workers log to stdout too; drain until the marker.
+                if not any(line.strip() == "ready" for line in iter(proc.stdout.readline, "")):
+                    raise RuntimeError("worker did not start")
+            live = {**run_scraper(scrapes, path), **directory_stats(path)}
+        finally:
+            for proc in procs:
+                proc.stdin.close()
+                proc.wait(30)
+        for proc in procs:
+            worker_exited(proc.pid, path)
+        folded = {**run_scraper(scrapes, path), **directory_stats(path)}
+    return {"live_workers": live, "after_exit": folded}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,4,16", help="comma-separated worker counts")
+    parser.add_argument("--requests", type=int, default=200, help="request rounds per worker")
+    parser.add_argument("--scrapes", type=int, default=50)
+    args = parser.parse_args()
+
+    results = {"in_memory": run_scraper(args.scrapes, None)}
+    for workers in (int(value) for value in args.workers.split(",")):
+        results[f"workers_{workers}"] = measure(workers, args.requests, args.scrapes)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
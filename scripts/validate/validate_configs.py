@@ -48,8 +48,10 @@ def validate_prometheus() -> None:
 
 def validate_gateway_app() -> None:
     gateway_app = read("infrastructure/gateway/app.py")
+    for module in sorted(Path("infrastructure/gateway/gateway").glob("*.py")):
+        gateway_app += read(str(module))
     required_tokens = [
-        "PyJWKClient",
+        "PyJWKSet",
         "validate_bearer_token",
         "KEYCLOAK_ISSUER",
         "/api/protected/health",
@@ -1,4 +1,3 @@
-import json
 from pathlib import Path
 import importlib.util
 import sys
@@ -14,7 +13,11 @@ _platform_spec.loader.exec_module(_platform_module)
 sys.modules["platform"] = _platform_module
 
 from flask import Flask, Response, g, jsonify, request
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client import Counter, Histogram
+
+from log_writer import LogWriter
+from multiprocess_metrics import scrape
+from request_metrics import BoundedMetric, method_label, route_template
 
 app = Flask(__name__)
 
@@ -33,7 +36,7 @@ def emit_structured_log(level, message, **fields):
         "message": message,
     }
     entry.update(fields)
-    print(json.dumps(entry), flush=True)
+    log_writer.emit(entry, kind="log")
 
 
 def build_audit_event(event_type, action, outcome, actor_id, target_id, outcome_reason):
@@ -66,14 +69,21 @@ def build_audit_event(event_type, action, outcome, actor_id, target_id, outcome_
         },
     }
 
-# Metrics
-http_requests_total = Counter(
+
+def emit_audit_event(event_type, action, outcome, actor_id, target_id, outcome_reason):
+    event = build_audit_event(event_type, action, outcome, actor_id, target_id, outcome_reason)
+    log_writer.emit(event, kind="audit")
+
+# Metrics (HTTP label sets are capped per metric, see request_metrics)
+http_requests_total = BoundedMetric(
+    Counter,
     'http_requests_total',
     'Total HTTP requests',
     ['endpoint', 'method', 'status']
 )
 
-http_request_duration = Histogram(
+http_request_duration = BoundedMetric(
+    Histogram,
     'http_request_duration_seconds',
     'HTTP request latency',
     ['endpoint', 'method'],
@@ -86,6 +96,14 @@ auth_logins_total = Counter(
     ['result', 'mfa_required']
 )
 
+log_entries_dropped_total = Counter(
+    'log_entries_dropped_total',
+    'Log and audit lines dropped because the writer queue was full or stdout failed',
+    ['kind']
+)
+
+log_writer = LogWriter.from_env(on_drop=lambda kind, count: log_entries_dropped_total.labels(kind=kind).inc(count))
+
 @app.before_request
 def before_request():
     g.start_time = time.time()
@@ -94,9 +112,10 @@ def before_request():
 @app.after_request
 def after_request(response):
     duration = time.time() - g.start_time
-    endpoint = request.endpoint or request.path
-    http_requests_total.labels(endpoint=endpoint, method=request.method, status=response.status_code).inc()
-    http_request_duration.labels(endpoint=endpoint, method=request.method).observe(duration)
+    endpoint = route_template(request)
+    method = method_label(request.method)
+    http_requests_total.labels(endpoint=endpoint, method=method, status=response.status_code).inc()
+    http_request_duration.labels(endpoint=endpoint, method=method).observe(duration)
     response.headers['X-Correlation-ID'] = g.correlation_id
     return response
 
@@ -110,26 +129,26 @@ def login():
     if password == 'demo-password':
         auth_logins_total.labels(result='success', mfa_required='true').inc()
         emit_structured_log("info", "Login success", user_id=username, action="login", result="success")
-        print(json.dumps(build_audit_event(
+        emit_audit_event(
             "authentication.login_success",
             "login",
             "success",
             username,
             "reference-app",
             "Credentials accepted",
-        )), flush=True)
+        )
         return jsonify({'status': 'success'}), 200
 
     auth_logins_total.labels(result='failure', mfa_required='true').inc()
     emit_structured_log("warning", "Login failure", user_id=username, action="login", result="failure")
-    print(json.dumps(build_audit_event(
+    emit_audit_event(
         "authentication.login_failure",
         "login",
         "failure",
         username,
         "reference-app",
         "Invalid credentials",
-    )), flush=True)
+    )
     return jsonify({'status': 'error'}), 401
 
 @app.route('/health')
@@ -138,7 +157,8 @@ def health():
 
 @app.route('/metrics')
 def metrics():
-    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+    payload, content_type = scrape()
+    return Response(payload, mimetype=content_type)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,22 @@
+"""gunicorn settings for the reference app: ``gunicorn -c gunicorn.conf.py app:app``.
+
+``GUNICORN_WORKERS`` sets the worker count. With ``PROMETHEUS_MULTIPROC_DIR``
+set (the Dockerfile does), ``/metrics`` aggregates every worker; the hooks
+below reset that directory at start and fold in workers as they exit.
+"""
+import os
+
+from multiprocess_metrics import multiprocess_dir, prepare_directory, worker_exited
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "1"))
+
+
+def on_starting(server):
+    path = multiprocess_dir()
+    if path is not None:
+        prepare_directory(path)
+
+
+def child_exit(server, worker):
+    worker_exited(worker.pid)
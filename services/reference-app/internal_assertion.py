@@ -0,0 +1,124 @@
+"""Verify the gateway's internal identity assertion in upstream Flask services.
+
+The gateway authenticates the bearer token and evaluates policy once, then
+forwards ``X-Internal-Assertion: v1.<payload>.<mac>`` (HMAC-SHA256 over
+``v1.<payload>`` with the shared ``INTERNAL_ASSERTION_KEY``). Verifying it is
+one HMAC and a small JSON decode, with no JWKS or RSA work. Standard library
+plus Flask only, so the file can be copied into any upstream service.
+
+An assertion is only good for the request it was minted for: ``aud`` must be
+this service's ``INTERNAL_ASSERTION_AUDIENCE`` (the ``host:port`` the gateway
+reaches it on, e.g. ``reference-app:5000``), and ``method``/``path`` must be
+the request's. Without a configured audience every assertion is rejected.
+
+    from internal_assertion import current_identity, require_assertion
+
+    @app.route("/api/things")
+    @require_assertion
+    def things():
+        return {"sub": current_identity()["sub"]}
+
+``INTERNAL_ASSERTION_KEY`` may hold several comma-separated keys while the
+gateway key is being rotated; ``INTERNAL_ASSERTION_AUDIENCE`` (or
+``app.config["INTERNAL_ASSERTION_AUDIENCE"]``) names this service.
+"""
+import base64
+import functools
+import hashlib
+import hmac
+import json
+import os
+import time
+
+from flask import current_app, g, jsonify, request
+
+ASSERTION_HEADER = "X-Internal-Assertion"
+ASSERTION_VERSION = "v1"
+
+
+class InvalidAssertion(ValueError):
+    pass
+
+
+def _unb64(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def verify_assertion(value, keys, audience, method, path, now=None, leeway_seconds=5):
+    """Return the identity payload of ``value`` for a ``method path`` request to ``audience``.
+
+    Raises ``InvalidAssertion``.
+    """
+    version, _, rest = (value or "").partition(".")
+    body, _, mac = rest.partition(".")
+    if version != ASSERTION_VERSION or not body or not mac:
+        raise InvalidAssertion("malformed")
+    signing_input = f"{version}.{body}".encode("ascii", "replace")
+    try:
+        presented = _unb64(mac)
+    except ValueError:
+        raise InvalidAssertion("malformed") from None
+    if not any(
+        hmac.compare_digest(hmac.new(key, signing_input, hashlib.sha256).digest(), presented) for key in keys
+    ):
+        raise InvalidAssertion("bad_signature")
+    try:
+        payload = json.loads(_unb64(body))
+    except ValueError:
+        raise InvalidAssertion("malformed") from None
+    now = time.time() if now is None else now
+    if not isinstance(payload, dict) or not isinstance(payload.get("exp"), int):
+        raise InvalidAssertion("malformed")
+    if payload["exp"] + leeway_seconds < now:
+        raise InvalidAssertion("expired")
+    if not audience:
+        raise InvalidAssertion("no_audience_configured")
+    if payload.get("aud") != audience:
+        raise InvalidAssertion("wrong_audience")
+    if payload.get("method") != method.upper() or payload.get("path") != path:
+        raise InvalidAssertion("wrong_request")
+    return payload
+
+
+def assertion_keys():
+    """Keys from ``app.config["INTERNAL_ASSERTION_KEYS"]`` or the environment, parsed once per app."""
+    keys = current_app.extensions.get("internal_assertion_keys")
+    if keys is None:
+        configured = current_app.config.get("INTERNAL_ASSERTION_KEYS")
+        if configured is None:
+            configured = [key for key in os.getenv("INTERNAL_ASSERTION_KEY", "").split(",") if key.strip()]
+        keys = tuple(key.strip().encode("utf-8") if isinstance(key, str) else key for key in configured)
+        current_app.extensions["internal_assertion_keys"] = keys
+    return keys
+
+
+def assertion_audience():
+    audience = current_app.config.get("INTERNAL_ASSERTION_AUDIENCE")
+    if audience is None:
+        audience = os.getenv("INTERNAL_ASSERTION_AUDIENCE", "").strip()
+    return audience
+
+
+def current_identity():
+    """Identity verified by ``require_assertion`` for this request (``None`` outside it)."""
+    return g.get("identity")
+
+
+def require_assertion(view):
+    """Reject the request with 401 unless it carries a valid gateway assertion."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            g.identity = verify_assertion(
+                request.headers.get(ASSERTION_HEADER, ""),
+                assertion_keys(),
+                assertion_audience(),
+                request.method,
+                request.path,
+            )
+        except InvalidAssertion as exc:
+            return jsonify({"error": "invalid_internal_assertion", "reason": str(exc)}), 401
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,148 @@
+"""Bounded, batching writer for the reference app's JSON log and audit lines.
+
+Request threads only enqueue: ``emit`` is a non-blocking ``put`` on a bounded
+queue (the ``logging.handlers.QueueHandler`` pattern). One background thread
+serialises the entries, joins up to ``batch_max_lines`` lines into a single
+``write`` and flushes once the batch is full or ``flush_interval_seconds``
+after its first line, so a login costs two queue puts instead of two blocking
+stdout flushes. When the queue is full the entry is dropped and counted rather
+than making the request wait for a slow log consumer.
+
+    writer = LogWriter.from_env(on_drop=lambda kind, count: ...)
+    writer.emit({"message": "Login success"}, kind="log")
+
+``LOG_QUEUE_MAX_ENTRIES=0`` writes every line inline on the caller's thread,
+as the app did before. The thread is started lazily, so it also starts in
+each pre-forked gunicorn worker, and whatever is queued is written at exit.
+"""
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+_STOP = object()
+
+
+class LogWriter:
+    def __init__(self, stream=None, max_entries=10000, batch_max_lines=256, flush_interval_seconds=0.2, on_drop=None):
+        self._stream = stream
+        self.max_entries = max_entries
+        self.batch_max_lines = max(1, batch_max_lines)
+        self.flush_interval_seconds = flush_interval_seconds
+        self._on_drop = on_drop
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._exit_hook = False
+        self._lock = threading.Lock()
+        self.dropped = {}
+        self.written = 0
+        self.batches = 0
+
+    @classmethod
+    def from_env(cls, stream=None, on_drop=None):
+        return cls(
+            stream,
+            max_entries=int(os.environ.get("LOG_QUEUE_MAX_ENTRIES", "10000")),
+            batch_max_lines=int(os.environ.get("LOG_BATCH_MAX_LINES", "256")),
+            flush_interval_seconds=float(os.environ.get("LOG_FLUSH_INTERVAL_SECONDS", "0.2")),
+            on_drop=on_drop,
+        )
+
+    @property
+    def stream(self):
+        # Resolved per write so a redirected sys.stdout is honoured.
+        return self._stream or sys.stdout
+
+    def emit(self, entry, kind="log"):
+        """Queue one JSON-serialisable entry; ``False`` when it was dropped."""
+        if self.max_entries <= 0:
+            self._write([json.dumps(entry, default=str)], [kind])
+            return True
+        entries = self._started()
+        try:
+            entries.put_nowait((kind, entry))
+        except queue.Full:
+            self._drop(kind, 1)
+            return False
+        return True
+
+    def _started(self):
+        if self._pid == os.getpid():
+            return self._queue
+        with self._lock:
+            if self._pid != os.getpid():
+                # First use, or first use in a forked worker: the parent's thread did not survive the fork.
+                self._queue = queue.Queue(maxsize=self.max_entries)
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,), name="log-writer", daemon=True
+                )
+                self._thread.start()
+                if not self._exit_hook:
+                    atexit.register(self.stop)
+                    self._exit_hook = True
+                self._pid = os.getpid()
+        return self._queue
+
+    def _run(self, entries):
+        batch, kinds = [], []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = entries.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                    break
+                kind, entry = item
+                batch.append(json.dumps(entry, default=str))
+                kinds.append(kind)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval_seconds
+                if len(batch) >= self.batch_max_lines:
+                    break
+                try:
+                    item = entries.get_nowait()
+                except queue.Empty:
+                    item = None
+            if batch and (stopping or len(batch) >= self.batch_max_lines or time.monotonic() >= deadline):
+                self._write(batch, kinds)
+                batch, kinds = [], []
+                deadline = None
+
+    def _write(self, lines, kinds):
+        try:
+            stream = self.stream
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+        except (OSError, ValueError):
+            for kind in kinds:
+                self._drop(kind, 1)
+            return
+        self.written += len(lines)
+        self.batches += 1
+
+    def _drop(self, kind, count):
+        with self._lock:
+            self.dropped[kind] = self.dropped.get(kind, 0) + count
+        if self._on_drop is not None:
+            self._on_drop(kind, count)
+
+    def stop(self, timeout=5.0):
+        """Write what is queued and stop the thread (also run at interpreter exit)."""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+        self._pid = None
@@ -0,0 +1,105 @@
+"""Prometheus multiprocess mode for the reference app under several gunicorn workers.
+
+Counters and histograms normally live in process memory, so with several
+workers ``/metrics`` would show whichever worker answered. With
+``PROMETHEUS_MULTIPROC_DIR`` set (before ``prometheus_client`` is imported)
+every worker writes its values to memory-mapped ``<type>_<pid>.db`` files in
+that directory, and ``scrape`` merges all of them. ``gunicorn.conf.py`` wires
+the master-side hooks:
+
+- ``prepare_directory`` (``on_starting``) empties the directory, so totals
+  restart with the service rather than with stale files
+- ``worker_exited`` (``child_exit``) folds a dead worker's counter and
+  histogram files into ``<type>_archive.db`` and deletes them. Totals stay
+  monotonic while the file count, and so the cost of a scrape, follows the
+  live workers instead of every worker ever started.
+
+Scrapes take a shared ``flock`` and folding an exclusive one, so a scrape
+never counts a dead worker twice or not at all. Folding reads and writes the
+``.db`` files through ``prometheus_client``'s internal ``MmapedDict``, so it
+only runs on the version pinned in ``requirements.txt`` (``FOLD_VERSION``); on
+any other version dead workers' files are left in place, which keeps totals
+right at the cost of scrapes reading more files. Without the variable nothing
+changes: ``scrape`` renders the default in-process registry. In multiprocess
+mode the ``process_*``/``python_*`` collectors are not exported, and the
+series cap in ``request_metrics`` applies per worker.
+"""
+from contextlib import contextmanager
+from importlib import metadata
+import fcntl
+import glob
+import logging
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+from prometheus_client.mmap_dict import MmapedDict
+
+# Gauge files are per-pid by design and handled by mark_process_dead.
+_FOLDED_TYPES = ("counter", "histogram", "summary")
+_LOCK_FILE = ".metrics.lock"
+FOLD_VERSION = "0.26.0"
+
+logger = logging.getLogger(__name__)
+
+
+def fold_supported():
+    return metadata.version("prometheus_client") == FOLD_VERSION
+
+
+def multiprocess_dir():
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+
+
+@contextmanager
+def _locked(path, operation):
+    with open(os.path.join(path, _LOCK_FILE), "a") as handle:
+        fcntl.flock(handle, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def prepare_directory(path):
+    os.makedirs(path, exist_ok=True)
+    for name in glob.glob(os.path.join(path, "*.db")):
+        os.remove(name)
+
+
+def scrape(path=None):
+    """``(payload, content_type)`` for ``/metrics``: every worker's values, or this process's."""
+    path = path or multiprocess_dir()
+    if path is None:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path)
+    with _locked(path, fcntl.LOCK_SH):
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def worker_exited(pid, path=None):
+    """Fold a dead worker's files into the archive; call from the gunicorn master."""
+    path = path or multiprocess_dir()
+    if path is None:
+        return
+    multiprocess.mark_process_dead(pid, path)
+    if not fold_supported():
+        logger.warning(
+            "prometheus_client %s is not %s; keeping metrics files of worker %s unfolded",
+            metadata.version("prometheus_client"), FOLD_VERSION, pid
+        )
+        return
+    with _locked(path, fcntl.LOCK_EX):
+        for typ in _FOLDED_TYPES:
+            dead = os.path.join(path, f"{typ}_{pid}.db")
+            if not os.path.exists(dead):
+                continue
+            archive = MmapedDict(os.path.join(path, f"{typ}_archive.db"))
+            try:
+                # Histogram buckets are stored per bucket, not cumulative, so plain addition is right for all three.
+                for key, value, timestamp, _ in MmapedDict.read_all_values_from_file(dead):
+                    archived, _ = archive.read_value(key)
+                    archive.write_value(key, archived + value, timestamp)
+            finally:
+                archive.close()
+            os.remove(dead)
@@ -0,0 +1,69 @@
+"""Bounded label sets for the reference app's HTTP metrics.
+
+Labelling requests by raw path gives every 404 scan and every path-parameter
+URL its own time series. Here a request is labelled with the URL rule it
+matched (``/api/items/<int:item_id>``, not ``/api/items/42``), anything that
+matched no rule is folded into ``endpoint="unmatched"`` and unknown methods
+into ``OTHER``. As a last guard each metric holds at most ``max_series``
+label sets; later new ones are folded into a single ``other`` set. Every fold
+is counted in ``metrics_label_sets_folded_total{metric, reason}``.
+
+    http_requests_total = BoundedMetric(Counter, 'http_requests_total', 'Total HTTP requests', [...])
+    http_requests_total.labels(endpoint=route_template(request), ...).inc()
+"""
+import os
+import threading
+
+from prometheus_client import Counter
+
+UNMATCHED = "unmatched"
+OVERFLOW = "other"
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+DEFAULT_MAX_SERIES = int(os.environ.get("METRICS_MAX_SERIES", "500"))
+
+label_sets_folded_total = Counter(
+    'metrics_label_sets_folded_total',
+    'Observations recorded under a folded label set instead of their own',
+    ['metric', 'reason']
+)
+
+
+def route_template(request):
+    """The matched URL rule, or ``unmatched`` (404s, 405s, scans)."""
+    rule = request.url_rule
+    return rule.rule if rule is not None else UNMATCHED
+
+
+def method_label(method):
+    return method if method in METHODS else "OTHER"
+
+
+class BoundedMetric:
+    """A labelled Counter or Histogram that stops growing at ``max_series`` label sets."""
+
+    def __init__(self, metric_type, name, documentation, labelnames, max_series=DEFAULT_MAX_SERIES, **kwargs):
+        self._metric = metric_type(name, documentation, labelnames, **kwargs)
+        self.name = name
+        self.max_series = max_series
+        self._labelnames = tuple(labelnames)
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._folded = {
+            reason: label_sets_folded_total.labels(metric=name, reason=reason) for reason in (UNMATCHED, "series_limit")
+        }
+
+    def labels(self, **labels):
+        values = tuple(str(labels[name]) for name in self._labelnames)
+        if labels.get("endpoint") == UNMATCHED:
+            self._folded[UNMATCHED].inc()
+        if values not in self._seen:
+            with self._lock:
+                if values not in self._seen:
+                    if len(self._seen) >= self.max_series:
+                        self._folded["series_limit"].inc()
+                        return self._metric.labels(*(OVERFLOW for _ in self._labelnames))
+                    self._seen.add(values)
+        return self._metric.labels(*values)
+
+    def series_count(self):
+        return len(self._seen)
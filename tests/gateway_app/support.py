@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from unittest import mock
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+GATEWAY_DIR = Path(__file__).resolve().parents[2] / "infrastructure" / "gateway"
+if str(GATEWAY_DIR) not in sys.path:
+    sys.path.insert(0, str(GATEWAY_DIR))
+
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+import jwt  # noqa: E402
+from jwt.algorithms import RSAAlgorithm  # noqa: E402
+
+
+def load_flask_app(**env: str) -> Any:
+    """Import infrastructure/gateway/app.py under a private module name with ``env`` applied."""
+    spec = importlib.util.spec_from_file_location("gateway_flask_app", GATEWAY_DIR / "app.py")
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict(os.environ, env):
+        spec.loader.exec_module(module)
+    return module
+
+
+class _JsonServer:
+    def __init__(self) -> None:
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                status, body = owner.handle(self.path)
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                return
+
+        self.hits: dict[str, int] = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, path: str) -> tuple[int, Any]:
+        raise NotImplementedError
+
+    def count(self, path: str) -> None:
+        self.hits[path] = self.hits.get(path, 0) + 1
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StandInIdP(_JsonServer):
+    """Local OIDC issuer serving discovery and JWKS from a generated RSA key."""
+
+    def __init__(self, kid: str = "test-key-1") -> None:
+        self.keys: dict[str, rsa.RSAPrivateKey] = {}
+        self.add_key(kid)
+        self.default_kid = kid
+        super().__init__()
+
+    def add_key(self, kid: str) -> None:
+        self.keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def handle(self, path: str) -> tuple[int, Any]:
+        self.count(path)
+        if path == "/.well-known/openid-configuration":
+            return 200, {"issuer": self.url, "jwks_uri": f"{self.url}/jwks"}
+        if path == "/jwks":
+            keys = []
+            for kid, key in self.keys.items():
+                jwk = json.loads(RSAAlgorithm.to_jwk(key.public_key()))
+                jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+                keys.append(jwk)
+            return 200, {"keys": keys}
+        return 404, {"error": "not_found"}
+
+    def mint(self, kid: str | None = None, **claims: Any) -> str:
+        kid = kid or self.default_kid
+        now = int(time.time())
+        payload = {"sub": "user-1", "iss": self.url, "iat": now, "exp": now + 300}
+        payload.update(claims)
+        return jwt.encode(payload, self.keys[kid], algorithm="RS256", headers={"kid": kid})
+
+
+class StubUpstream(_JsonServer):
+    """Minimal backend answering ``/health`` like services/reference-app."""
+
+    def handle(self, path: str) -> tuple[int, Any]:
+        self.count(path)
+        if path == "/health":
+            return 200, {"status": "healthy"}
+        return 404, {"error": "not_found"}
+
+
+def example_policy_dir(target: Path) -> Path:
+    """Populate ``target`` with the 10.50 example policy files under their deployed names."""
+    for source, name in (
+        ("10.50-rbac.yaml.example", "rbac.yaml"),
+        ("10.50-policy-matrix.yaml.example", "policy-matrix.yaml"),
+        ("10.50-projects.yaml.example", "projects.yaml"),
+    ):
+        shutil.copyfile(GATEWAY_DIR / source, target / name)
+    return target
+
+
+class EchoUpstream:
+    """Backend for proxy tests: echoes what it received and can stream large bodies.
+
+    ``GET <path>?size=N`` returns N bytes of ``b"x"`` (typed as JSON with
+    ``&as=json``, for compression tests; ``&cache=`` and ``&vary=`` set
+    ``Cache-Control`` and ``Vary``, for response cache tests); any request with a body
+    returns JSON describing the body it read (size, SHA-256, framing headers).
+    """
+
+    def __init__(self) -> None:
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _body(self) -> bytes:
+                if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+                    data = bytearray()
+                    while True:
+                        line = self.rfile.readline().strip()
+                        size = int(line, 16) if line else 0
+                        if size == 0:
+                            self.rfile.readline()
+                            return bytes(data)
+                        data += self.rfile.read(size)
+                        self.rfile.readline()
+                return self.rfile.read(int(self.headers.get("Content-Length", "0")))
+
+            def _handle(self) -> None:
+                body = self._body()
+                owner.requests.append((self.command, self.path, dict(self.headers)))
+                path, _, query = self.path.partition("?")
+                params = dict(item.split("=", 1) for item in query.split("&") if "=" in item)
+                if "size" in params:
+                    payload = b"x" * int(params["size"])
+                    content_type = "application/json" if params.get("as") == "json" else "application/octet-stream"
+                else:
+                    payload = json.dumps(
+                        {
+                            "method": self.command,
+                            "path": path,
+                            "bytes": len(body),
+                            "sha256": hashlib.sha256(body).hexdigest(),
+                            "content_length": self.headers.get("Content-Length"),
+                            "transfer_encoding": self.headers.get("Transfer-Encoding"),
+                            "correlation_id": self.headers.get("X-Correlation-ID"),
+                            "authorization": self.headers.get("Authorization"),
+                        }
+                    ).encode("utf-8")
+                    content_type = "application/json"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("X-Upstream", "echo")
+                for param, header in (("cache", "Cache-Control"), ("vary", "Vary")):
+                    if param in params:
+                        self.send_header(header, params[param])
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    return  # the gateway aborted an over-limit upload
+
+            do_GET = do_POST = do_PUT = _handle  # noqa: N815
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                return
+
+        self.requests: list[tuple[str, str, dict[str, str]]] = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
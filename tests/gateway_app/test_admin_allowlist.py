@@ -0,0 +1,109 @@
+from pathlib import Path
+import base64
+import tempfile
+import unittest
+
+from gateway_app.support import StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.allowlist import (  # noqa: E402
+    ADMIN_ALLOWLIST_FILE,
+    ADMIN_INVENTORY_FILE,
+    PrefixTrie,
+    client_address,
+    load_admin_allowlist,
+)
+from gateway.reload import PolicyWatcher  # noqa: E402
+
+INVENTORY = "admin_name,device_os,lan_ip,ssh_key_fingerprint\nsenior_dev,windows11,10.10.5.50,SHA256:x\n"
+ADMIN_CHECK = {"checks": [["admin", None, "users"]]}
+
+
+class PrefixTrieTests(unittest.TestCase):
+    def test_longest_and_shortest_prefixes_match(self):
+        trie = PrefixTrie(["10.10.5.0/28", "10.10.5.200", "2001:db8::/32", "10.10.0.0/16"])
+
+        self.assertTrue(trie.contains("10.10.5.3"))
+        self.assertTrue(trie.contains("10.10.77.1"))  # the /16 added later covers the /28
+        self.assertFalse(trie.contains("10.11.0.1"))
+        self.assertTrue(trie.contains("2001:db8:ffff::1"))
+        self.assertFalse(trie.contains("2001:db9::1"))
+        self.assertTrue(trie.contains("::ffff:10.10.5.3"))  # IPv4-mapped peer from a dual-stack socket
+        self.assertFalse(trie.contains("not-an-ip"))
+        self.assertFalse(PrefixTrie().contains("10.10.5.3"))
+        self.assertTrue(PrefixTrie(["::/0"]).contains("::1"))
+
+    def test_thousands_of_entries(self):
+        trie = PrefixTrie(f"10.{n // 256}.{n % 256}.7" for n in range(5000))
+        self.assertEqual(len(trie), 5000)
+        self.assertTrue(trie.contains("10.19.135.7"))
+        self.assertFalse(trie.contains("10.19.135.8"))
+
+    def test_forwarded_for_is_only_believed_from_trusted_proxies(self):
+        proxies = PrefixTrie(["10.10.5.186", "172.16.0.0/12"])
+        self.assertEqual(client_address("10.10.5.186", "198.51.100.7, 172.16.3.4", proxies), "198.51.100.7")
+        self.assertEqual(client_address("10.10.5.186", "10.10.5.50, 203.0.113.9", proxies), "203.0.113.9")
+        self.assertEqual(client_address("203.0.113.9", "10.10.5.50", proxies), "203.0.113.9")
+        self.assertEqual(client_address("10.10.5.186", "10.10.5.50", None), "10.10.5.186")
+
+
+class AllowlistReloadTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.policy_dir = example_policy_dir(Path(self._tmp.name))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_inventory_rows_and_placeholders(self):
+        (self.policy_dir / ADMIN_INVENTORY_FILE).write_text(INVENTORY + "junior_dev,windows11,<fill>,<fill>\n")
+        self.assertTrue(load_admin_allowlist(self.policy_dir).contains("10.10.5.50"))
+
+        (self.policy_dir / ADMIN_INVENTORY_FILE).write_text(INVENTORY + "junior_dev,windows11,10.10.5.999,x\n")
+        with self.assertRaises(ValueError):
+            load_admin_allowlist(self.policy_dir)
+
+    def test_allowlist_edit_only_rebuilds_the_trie(self):
+        watcher = PolicyWatcher(self.policy_dir, interval_seconds=0)
+        before = watcher.snapshot
+        self.assertFalse(before.admin_allowlist.contains("10.10.5.50"))
+
+        (self.policy_dir / ADMIN_ALLOWLIST_FILE).write_text('cidrs: ["10.10.5.48/29"]\n', encoding="utf-8")
+        self.assertTrue(watcher.check())
+        after = watcher.snapshot
+        self.assertTrue(after.admin_allowlist.contains("10.10.5.50"))
+        self.assertIs(after.policy, before.policy)
+
+        (self.policy_dir / ADMIN_ALLOWLIST_FILE).write_text('cidrs: ["10.10.5.0/33"]\n', encoding="utf-8")
+        self.assertFalse(watcher.check())
+        self.assertIs(watcher.snapshot, after)
+
+
+class GatewayAllowlistTests(unittest.TestCase):
+    def test_admin_checks_follow_the_forwarded_client(self):
+        idp = StandInIdP()
+        self.addCleanup(idp.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        policy_dir = example_policy_dir(Path(tmp.name))
+        (policy_dir / ADMIN_INVENTORY_FILE).write_text(INVENTORY, encoding="utf-8")
+        client = load_flask_app(
+            KEYCLOAK_ISSUER=idp.url,
+            GATEWAY_POLICY_DIR=str(policy_dir),
+            TRUSTED_PROXY_IP="127.0.0.1",
+            FORWARDED_HEADERS_ENABLED="true",
+        ).app.test_client()
+        token = idp.mint(groups=["AI-PLATFORM-ADMINS"], amr=["pwd", "otp"])
+
+        def allowed(forwarded_for):
+            headers = {"Authorization": f"Bearer {token}", "X-Forwarded-For": forwarded_for}
+            response = client.post("/authz/batch", json=ADMIN_CHECK, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            return base64.b64decode(response.get_json()["bitmap"]) == b"\x01"
+
+        self.assertTrue(allowed("10.10.5.50"))
+        self.assertFalse(allowed("10.10.5.51"))
+        self.assertFalse(allowed("10.10.5.50, 203.0.113.9"))  # spoofed left-most hop is ignored
+
+
+if __name__ == "__main__":
+    unittest.main()
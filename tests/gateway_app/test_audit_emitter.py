@@ -0,0 +1,176 @@
+from pathlib import Path
+from unittest import mock
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from gateway_app.support import EchoUpstream, StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.asgi import create_app  # noqa: E402
+from gateway.audit import AuditEmitter, FileSink  # noqa: E402
+from gateway.config import load_config  # noqa: E402
+from gateway.metrics import REGISTRY  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+EDITOR_GROUPS = ["AI-NC-PROJ-BANANA-PEEL-EDIT"]
+
+
+def outcomes(outcome):
+    return REGISTRY.get_sample_value("gateway_audit_events_total", {"outcome": outcome}) or 0.0
+
+
+def read_events(path):
+    return [json.loads(line) for line in Path(path).read_text(encoding="utf-8").splitlines()]
+
+
+class FailingSink:
+    def write(self, data):
+        raise ConnectionRefusedError("collector down")
+
+    def close(self):
+        pass
+
+
+class AuditEmitterTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.spool = Path(self._tmp.name) / "audit.jsonl"
+        self.spill = Path(self._tmp.name) / "spill" / "audit-spill.jsonl"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def emitter(self, sink=None, **options):
+        emitter = AuditEmitter(sink or FileSink(self.spool), **options)
+        self.addCleanup(emitter.stop)
+        return emitter
+
+    def test_flusher_writes_batches_in_schema_shape(self):
+        flushes = REGISTRY.get_sample_value("gateway_audit_flush_duration_seconds_count") or 0.0
+        emitter = self.emitter(batch_size=2, flush_interval_seconds=0.01)
+        emitter.start()
+        for index in range(5):
+            emitter.emit({"event_type": "authorization.rbac_decision", "correlation_id": f"req-{index}"})
+        emitter.stop()
+
+        events = read_events(self.spool)
+        self.assertEqual([event["correlation_id"] for event in events], [f"req-{index}" for index in range(5)])
+        self.assertEqual(events[0]["source_system"], "gateway")
+        self.assertTrue(events[0]["timestamp"].endswith("Z"))
+        self.assertEqual(len({event["event_id"] for event in events}), 5)
+        self.assertGreaterEqual(REGISTRY.get_sample_value("gateway_audit_flush_duration_seconds_count"), flushes + 3)
+
+    def test_drop_overflow_counts_discarded_events(self):
+        emitter = self.emitter(max_queue=2, overflow="drop")
+        dropped = outcomes("dropped")
+        for index in range(3):
+            emitter.emit({"n": index})
+        self.assertEqual(len(emitter), 2)
+        self.assertEqual(outcomes("dropped"), dropped + 1)
+
+    def test_spill_overflow_appends_to_disk(self):
+        emitter = self.emitter(max_queue=1, overflow="spill", spill_path=self.spill)
+        for index in range(3):
+            emitter.emit({"n": index})
+        self.assertEqual([event["n"] for event in read_events(self.spill)], [1, 2])
+        emitter.flush()
+        self.assertEqual([event["n"] for event in read_events(self.spool)], [0])
+
+    def test_block_overflow_waits_for_room_then_gives_up(self):
+        emitter = self.emitter(max_queue=1, overflow="block", block_timeout_seconds=5)
+        emitter.emit({"n": 0})
+        threading.Timer(0.05, emitter.flush).start()
+        emitter.emit({"n": 1})  # returns once the flush frees a slot
+        self.assertEqual(len(emitter), 1)
+
+        impatient = self.emitter(max_queue=1, overflow="block", block_timeout_seconds=0.01)
+        dropped = outcomes("dropped")
+        impatient.emit({"n": 0})
+        impatient.emit({"n": 1})
+        self.assertEqual(outcomes("dropped"), dropped + 1)
+
+    def test_sink_failures_spill_or_count(self):
+        failed = outcomes("failed")
+        emitter = self.emitter(FailingSink(), spill_path=self.spill)
+        emitter.emit({"n": 0})
+        emitter.flush()
+        self.assertEqual(len(read_events(self.spill)), 1)
+
+        unspilled = self.emitter(FailingSink())
+        unspilled.emit({"n": 0})
+        unspilled.flush()
+        self.assertEqual(outcomes("failed"), failed + 1)
+
+    def test_spill_overflow_requires_a_path(self):
+        with self.assertRaises(ValueError):
+            self.emitter(overflow="spill")
+        with self.assertRaises(ValueError):
+            self.emitter(overflow="retry")
+
+
+class GatewayAuditTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.upstream = EchoUpstream()
+        cls.policy_dir = example_policy_dir(Path(cls._tmp.name))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls.upstream.close()
+        cls._tmp.cleanup()
+
+    def env(self, spool):
+        return {
+            "KEYCLOAK_ISSUER": self.idp.url,
+            "UPSTREAM_URL": self.upstream.url,
+            "GATEWAY_POLICY_DIR": str(self.policy_dir),
+            "AUDIT_SINK": f"file:{spool}",
+        }
+
+    def headers(self, project="BANANA-PEEL"):
+        token = self.idp.mint(groups=EDITOR_GROUPS)
+        return {"Authorization": f"Bearer {token}", "X-Project-Code": project, "X-Correlation-ID": "req-audit"}
+
+    def assert_events(self, events):
+        kinds = [(event["event_type"], event["outcome"]) for event in events]
+        self.assertEqual(
+            kinds,
+            [
+                ("authorization.rbac_decision", "success"),
+                ("data_access.api_call", "success"),
+                ("authorization.rbac_decision", "failure"),
+            ],
+        )
+        decision, call, denied = events
+        self.assertEqual(decision["correlation_id"], "req-audit")
+        self.assertEqual(decision["metadata"]["project_code"], "BANANA-PEEL")
+        self.assertEqual(call["metadata"]["response_code"], 200)
+        self.assertEqual(call["target"]["id"], "search")
+        self.assertEqual(denied["outcome_reason"], "insufficient_project_role")
+
+    def test_sync_mode_emits_decisions_and_api_calls(self):
+        spool = Path(self._tmp.name) / "sync-audit.jsonl"
+        module = load_flask_app(**self.env(spool))
+        client = module.app.test_client()
+        self.assertEqual(client.get("/search/query", headers=self.headers()).status_code, 200)
+        self.assertEqual(client.get("/search/query", headers=self.headers("LASAGNA")).status_code, 403)
+        module.audit.stop()
+        self.assert_events(read_events(spool))
+
+    def test_async_mode_emits_decisions_and_api_calls(self):
+        spool = Path(self._tmp.name) / "async-audit.jsonl"
+        with mock.patch.dict(os.environ, self.env(spool)):
+            app = create_app(load_config())
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/search/query", headers=self.headers()).status_code, 200)
+            self.assertEqual(client.get("/search/query", headers=self.headers("LASAGNA")).status_code, 403)
+        self.assert_events(read_events(spool))  # shutdown flushes the queue
+
+
+if __name__ == "__main__":
+    unittest.main()
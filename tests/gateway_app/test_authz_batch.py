@@ -0,0 +1,143 @@
+from pathlib import Path
+from unittest import mock
+import base64
+import os
+import tempfile
+import unittest
+
+from gateway_app.support import StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.allowlist import ADMIN_ALLOWLIST_FILE  # noqa: E402
+from gateway.asgi import create_app  # noqa: E402
+from gateway.authz import BatchRequestError, encode_bitmap, parse_checks  # noqa: E402
+from gateway.config import load_config  # noqa: E402
+from gateway.metrics import REGISTRY  # noqa: E402
+from gateway.policy import load_policy  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+CHECKS = [
+    ["search", "BANANA-PEEL", "query"],
+    ["search", "LASAGNA", "query"],
+    ["ingest", "BANANA-PEEL", "upload"],
+    ["whoami", None, ""],
+    ["audit", None, "events"],
+    ["search", "BANANA-PEEL", "../admin"],
+    ["admin", None, "users"],
+]
+# Viewer on BANANA-PEEL: search there and whoami only.
+EXPECTED = [True, False, False, True, False, False, False]
+
+
+def claims_lookups():
+    return sum(
+        REGISTRY.get_sample_value("gateway_cache_requests_total", {"cache": "claims", "result": result}) or 0.0
+        for result in ("hit", "miss")
+    )
+
+
+def decode(body):
+    data = base64.b64decode(body["bitmap"])
+    return [bool(data[index // 8] >> (index % 8) & 1) for index in range(body["count"])]
+
+
+class BatchEngineTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.policy = load_policy(example_policy_dir(Path(cls._tmp.name)))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_batch_matches_single_decisions(self):
+        principal = self.policy.principal_from_claims({"sub": "u1", "groups": ["AI-NC-PROJ-BANANA-PEEL-VIEW"]})
+        checks = [tuple(check) for check in CHECKS]
+        bitmap = self.policy.authorize_batch(checks, principal)
+        self.assertEqual([bool(bitmap >> index & 1) for index in range(len(checks))], EXPECTED)
+
+        admin = self.policy.principal_from_claims({"sub": "u2", "groups": ["AI-PLATFORM-ADMINS"], "amr": ["otp"]})
+        self.assertEqual(self.policy.authorize_batch([("admin", None, "users")], admin), 0)
+        self.assertEqual(self.policy.authorize_batch([("admin", None, "users")], admin, admin_allowlisted=True), 1)
+        password_only = self.policy.principal_from_claims({"sub": "u3", "groups": ["AI-PLATFORM-ADMINS"]})
+        self.assertEqual(self.policy.authorize_batch([("admin", None, "users")], password_only, True), 0)
+        self.assertEqual(self.policy.authorize_batch([("health", None, "")], None), 1)
+
+    def test_bitmap_encoding_and_parsing(self):
+        self.assertEqual(base64.b64decode(encode_bitmap(0b1_0000_0001, 9)), bytes([0b1, 0b1]))
+        self.assertEqual(encode_bitmap(0, 0), "")
+        self.assertEqual(parse_checks(b'{"checks": [["graph", "", "nodes"]]}', 10), [("graph", None, "nodes")])
+        for body, error in (
+            (b"not json", "invalid_batch"),
+            (b'{"checks": [["graph", "X"]]}', "invalid_batch"),
+            (b'{"checks": [["graph", 7, "nodes"]]}', "invalid_batch"),
+            (b'{"checks": [["a", null, ""], ["b", null, ""]]}', "batch_too_large"),
+        ):
+            with self.subTest(body=body), self.assertRaises(BatchRequestError) as caught:
+                parse_checks(body, 1)
+            self.assertEqual(caught.exception.error, error)
+
+
+class GatewayBatchTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.env = {
+            "KEYCLOAK_ISSUER": cls.idp.url,
+            "GATEWAY_POLICY_DIR": str(example_policy_dir(Path(cls._tmp.name))),
+            "AUTHZ_BATCH_MAX_CHECKS": "50",
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls._tmp.cleanup()
+
+    def headers(self):
+        return {"Authorization": f"Bearer {self.idp.mint(groups=['AI-NC-PROJ-BANANA-PEEL-VIEW'])}"}
+
+    def test_sync_mode_validates_the_token_once_per_batch(self):
+        client = load_flask_app(**self.env).app.test_client()
+        lookups = claims_lookups()
+        response = client.post("/authz/batch", json={"checks": CHECKS}, headers=self.headers())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(decode(response.get_json()), EXPECTED)
+        self.assertEqual(claims_lookups(), lookups + 1)
+        self.assertEqual(client.post("/authz/batch", json={"checks": CHECKS}).status_code, 401)
+        too_many = client.post("/authz/batch", json={"checks": CHECKS * 8}, headers=self.headers())
+        self.assertEqual((too_many.status_code, too_many.get_json()["error"]), (413, "batch_too_large"))
+
+    def test_admin_checks_need_an_mfa_token(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        policy_dir = example_policy_dir(Path(tmp.name))
+        (policy_dir / ADMIN_ALLOWLIST_FILE).write_text('cidrs: ["127.0.0.1/32"]\n', encoding="utf-8")
+        client = load_flask_app(**{**self.env, "GATEWAY_POLICY_DIR": str(policy_dir)}).app.test_client()
+
+        def bitmap(**claims):
+            token = self.idp.mint(groups=["AI-PLATFORM-ADMINS"], **claims)
+            headers = {"Authorization": f"Bearer {token}"}
+            response = client.post("/authz/batch", json={"checks": [["admin", None, "users"]]}, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            return decode(response.get_json())
+
+        self.assertEqual(bitmap(amr=["pwd"]), [False])
+        self.assertEqual(bitmap(), [False])
+        self.assertEqual(bitmap(amr=["pwd", "otp"]), [True])
+
+    def test_async_mode_returns_the_same_bitmap(self):
+        with mock.patch.dict(os.environ, self.env):
+            app = create_app(load_config())
+        with TestClient(app) as client:
+            response = client.post("/authz/batch", json={"checks": CHECKS}, headers=self.headers())
+            malformed = client.post("/authz/batch", content=b"[]", headers=self.headers())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(decode(response.json()), EXPECTED)
+        self.assertEqual((malformed.status_code, malformed.json()["error"]), (400, "invalid_batch"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from gateway_app.support import StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            "http://upstream",
+            window_seconds=10,
+            min_calls=4,
+            failure_rate=0.5,
+            slow_call_seconds=1.0,
+            open_seconds=5,
+            half_open_calls=2,
+            clock=self.clock,
+        )
+
+    def call(self, success=True, elapsed=0.01):
+        self.breaker.record(self.breaker.acquire(), success, elapsed)
+
+    def test_opens_on_failure_rate_and_fails_fast(self):
+        self.call()
+        self.call()
+        self.call(success=False)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.call(elapsed=1.5)  # slow calls count as failures
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now += 2
+        with self.assertRaises(CircuitOpenError) as caught:
+            self.breaker.acquire()
+        self.assertAlmostEqual(caught.exception.retry_after, 3.0)
+
+    def test_half_open_trials_close_or_reopen(self):
+        for _ in range(4):
+            self.call(success=False)
+        self.clock.now += 5
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        first = self.breaker.acquire()
+        second = self.breaker.acquire()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.acquire()  # only half_open_calls trials at a time
+        self.breaker.record(first, True, 0.01)
+        self.breaker.record(second, False, 0.01)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.clock.now += 5
+        self.call()
+        self.call()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_old_outcomes_leave_the_window(self):
+        self.call(success=False)
+        self.call(success=False)
+        self.call(success=False)
+        self.clock.now += 11
+        self.call(success=False)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_cancelled_trial_frees_its_slot(self):
+        for _ in range(4):
+            self.call(success=False)
+        self.clock.now += 5
+        self.breaker.acquire()
+        self.breaker.cancel(self.breaker.acquire())
+        self.breaker.acquire()
+
+    def test_calls_admitted_before_half_open_are_not_trials(self):
+        late_success = self.breaker.acquire()
+        late_failure = self.breaker.acquire()
+        for _ in range(4):
+            self.call(success=False)
+        self.clock.now += 5
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        # Admitted while closed, finishing now: neither closes nor re-opens the circuit.
+        self.breaker.record(late_failure, False, 0.01)
+        self.breaker.record(late_success, True, 0.01)
+        self.breaker.cancel(late_success)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        self.call()
+        self.assertEqual(self.breaker.state, HALF_OPEN)  # one trial of two so far
+        self.call()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+class GatewayBreakerTests(unittest.TestCase):
+    def test_down_upstream_trips_the_breaker(self):
+        idp = StandInIdP()
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                "KEYCLOAK_ISSUER": idp.url,
+                "UPSTREAM_URL": "http://127.0.0.1:9",
+                "GATEWAY_POLICY_DIR": str(example_policy_dir(Path(tmp))),
+                "UPSTREAM_BREAKER_MIN_CALLS": "3",
+                "UPSTREAM_BREAKER_OPEN_SECONDS": "30",
+            }
+            try:
+                module = load_flask_app(**env)
+                client = module.app.test_client()
+                token = idp.mint(groups=["AI-NC-PROJ-BANANA-PEEL-VIEW"])
+                headers = {"Authorization": f"Bearer {token}", "X-Project-Code": "BANANA-PEEL"}
+                statuses = [client.get("/search/query", headers=headers).status_code for _ in range(3)]
+                tripped = client.get("/search/query", headers=headers)
+                health = client.get("/api/protected/health", headers=headers)
+            finally:
+                idp.close()
+
+        self.assertEqual(statuses, [502, 502, 502])
+        self.assertEqual((tripped.status_code, tripped.get_json()["error"]), (503, "upstream_circuit_open"))
+        self.assertGreaterEqual(int(tripped.headers["Retry-After"]), 1)
+        self.assertEqual(health.status_code, 503)
+        self.assertEqual(module.upstream_pool.breakers.states(), {"http://127.0.0.1:9": OPEN})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+from unittest import mock
+import time
+import unittest
+
+from gateway_app.support import StandInIdP
+
+import jwt  # noqa: E402
+
+from gateway.auth import validate_bearer_token  # noqa: E402
+from gateway.claims_cache import ClaimsCache, token_digest  # noqa: E402
+from gateway.config import GatewayConfig  # noqa: E402
+from gateway.jwks import JwksCache  # noqa: E402
+
+
+class ClaimsCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.idp = StandInIdP()
+        self.cfg = GatewayConfig(upstream_url="http://upstream", issuer=self.idp.url, audience=None)
+        self.jwks = JwksCache(self.idp.url, min_refetch_interval_seconds=0)
+
+    def tearDown(self):
+        self.idp.close()
+
+    def test_repeated_validation_skips_signature_verification(self):
+        cache = ClaimsCache(max_entries=10, ttl_seconds=60)
+        token = self.idp.mint(sub="spa-user")
+
+        with mock.patch("gateway.auth.jwt.decode", wraps=jwt.decode) as decode:
+            for _ in range(5):
+                claims = validate_bearer_token(token, self.cfg, self.jwks, cache)
+
+        self.assertEqual(claims["sub"], "spa-user")
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(cache.stats(), {"entries": 1, "hits": 4, "misses": 1, "evictions": 0})
+
+    def test_entries_expire_at_token_exp_before_cache_ttl(self):
+        now = [time.time()]
+        cache = ClaimsCache(max_entries=10, ttl_seconds=600, clock=lambda: now[0])
+        digest = token_digest("token")
+        cache.put(digest, {"sub": "a", "exp": now[0] + 30}, "test-key-1")
+
+        now[0] += 29
+        self.assertIsNotNone(cache.get(digest))
+        now[0] += 2
+        self.assertIsNone(cache.get(digest))
+        self.assertEqual(len(cache), 0)
+
+    def test_cache_is_bounded_by_entry_count(self):
+        cache = ClaimsCache(max_entries=2, ttl_seconds=60)
+        exp = time.time() + 300
+        for name in ("a", "b", "c"):
+            cache.put(token_digest(name), {"sub": name, "exp": exp}, None)
+
+        self.assertIsNone(cache.get(token_digest("a")))
+        self.assertEqual(cache.get(token_digest("c")).claims["sub"], "c")
+        self.assertEqual(cache.evictions, 1)
+
+    def test_cached_claims_are_dropped_when_signing_key_is_withdrawn(self):
+        cache = ClaimsCache(max_entries=10, ttl_seconds=60)
+        token = self.idp.mint()
+        validate_bearer_token(token, self.cfg, self.jwks, cache)
+
+        self.idp.keys = {"replacement-key": self.idp.keys["test-key-1"]}
+        self.jwks.get_signing_key("replacement-key")
+
+        with self.assertRaises(jwt.PyJWKClientError):
+            validate_bearer_token(token, self.cfg, self.jwks, cache)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from gateway_app.support import StandInIdP, example_policy_dir
+
+from gateway.auth import authenticate  # noqa: E402
+from gateway.claims_cache import ClaimsCache  # noqa: E402
+from gateway.config import GatewayConfig  # noqa: E402
+from gateway.jwks import JwksCache  # noqa: E402
+from gateway.policy import compile_policy, load_policy  # noqa: E402
+from gateway.principal import roles_at_or_above  # noqa: E402
+
+
+class GroupIndexTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as tmp:
+            cls.policy = load_policy(example_policy_dir(Path(tmp)))
+
+    def test_large_groups_claim_collapses_to_max_project_role(self):
+        noise = [f"AD-DEPT-{index:04d}" for index in range(500)]
+        groups = noise + [
+            "AI-SECURITY-AUDITORS",
+            "AI-OPS-READONLY",
+            "AI-NC-PROJ-BANANA-PEEL-VIEW",
+            "AI-NC-PROJ-BANANA-PEEL-OWNER",
+            "AI-NC-PROJ-NIGHT-PENGUIN-EDIT",
+            "AI-NC-PROJ-UNREGISTERED-OWNER",
+            "AI-NC-PROJ-LASAGNA-SUPERUSER",
+        ]
+        principal = self.policy.principal_from_claims({"sub": "u1", "groups": groups})
+
+        ranks = self.policy.project_role_ranks
+        self.assertEqual(principal.project_roles, {"BANANA-PEEL": ranks["OWNER"], "NIGHT-PENGUIN": ranks["EDIT"]})
+        auditor, ops = self.policy.role_ranks["SECURITY_AUDITOR"], self.policy.role_ranks["OPS_READONLY"]
+        self.assertEqual(principal.platform_roles, (1 << (auditor - 1)) | (1 << (ops - 1)))
+        self.assertEqual(principal.platform_rank, auditor)
+
+    def test_non_string_groups_are_ignored(self):
+        rbac = {
+            "platform_roles": {"ADMIN": {"required_groups": ["G1", "G2"]}, "VIEWER": {"required_groups": ["G3"]}},
+            "role_precedence": ["ADMIN", "VIEWER"],
+        }
+        policy = compile_policy(rbac, {"route_families": {}}, {"project_roles": {"VIEW": "VIEW"}, "projects": []})
+        groups = ["G1", {"nested": ["G2"]}, ["G3"], 7, "G2"]
+
+        principal = policy.principal_from_claims({"sub": "u1", "groups": groups})
+
+        self.assertEqual(principal.platform_roles, 1 << (policy.role_ranks["ADMIN"] - 1))
+
+    def test_role_masks_include_every_higher_precedence_role(self):
+        self.assertEqual(roles_at_or_above(0, 3), 0)
+        self.assertEqual(roles_at_or_above(1, 3), 0b111)
+        self.assertEqual(roles_at_or_above(2, 3), 0b110)
+        self.assertEqual(roles_at_or_above(3, 3), 0b100)
+
+    def test_principal_is_cached_with_the_verified_token(self):
+        idp = StandInIdP()
+        try:
+            cfg = GatewayConfig(upstream_url="http://upstream", issuer=idp.url, audience=None)
+            jwks = JwksCache(idp.url)
+            cache = ClaimsCache(max_entries=10, ttl_seconds=60)
+            token = idp.mint(groups=["AI-NC-PROJ-MASTER-EDIT"])
+
+            _, first = authenticate(token, cfg, jwks, cache, self.policy)
+            _, second = authenticate(token, cfg, jwks, cache, self.policy)
+        finally:
+            idp.close()
+
+        self.assertIs(first, second)
+        self.assertEqual(first.project_roles, {"MASTER": self.policy.project_role_ranks["EDIT"]})
+        self.assertEqual(first.policy_version, self.policy.version)
+
+
+if __name__ == "__main__":
+    unittest.main()
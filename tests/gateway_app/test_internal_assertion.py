@@ -0,0 +1,155 @@
+from pathlib import Path
+from unittest import mock
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from gateway_app.support import EchoUpstream, StandInIdP, example_policy_dir, load_flask_app
+
+from flask import Flask  # noqa: E402
+from gateway.asgi import create_app  # noqa: E402
+from gateway.assertion import ASSERTION_HEADER, AssertionSigner  # noqa: E402
+from gateway.config import load_config  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+HELPER = Path(__file__).resolve().parents[2] / "services" / "reference-app" / "internal_assertion.py"
+_spec = importlib.util.spec_from_file_location("reference_internal_assertion", HELPER)
+internal_assertion = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(internal_assertion)
+
+KEY = "k" * 32
+EDITOR_GROUPS = ["AI-NC-PROJ-BANANA-PEEL-EDIT"]
+IDENTITY = {"sub": "user-1", "platform_role": None, "projects": {"BANANA-PEEL": "EDIT"}, "policy_version": "v"}
+TARGET = ("GET", "http://search:8000/api/search/query?q=x")
+AUDIENCE = "search:8000"
+
+
+class AssertionFormatTests(unittest.TestCase):
+    def setUp(self):
+        self.now = [1_000_000.0]
+        self.signer = AssertionSigner(KEY.encode(), ttl_seconds=30, clock=lambda: self.now[0])
+
+    def verify(self, value, keys=(KEY.encode(),), now=1_000_000, audience=AUDIENCE, **request):
+        method, path = request.get("method", "GET"), request.get("path", "/api/search/query")
+        return internal_assertion.verify_assertion(value, keys, audience, method, path, now=now)
+
+    def test_round_trip_carries_identity(self):
+        payload = self.verify(self.signer.sign(IDENTITY, "req-1", *TARGET))
+        self.assertEqual({key: payload[key] for key in IDENTITY}, IDENTITY)
+        self.assertEqual((payload["rid"], payload["exp"] - payload["iat"]), ("req-1", 30))
+        self.assertEqual((payload["aud"], payload["method"], payload["path"]), (AUDIENCE, "GET", "/api/search/query"))
+
+    def test_replay_against_another_upstream_method_or_path_is_rejected(self):
+        value = self.signer.sign(IDENTITY, "req-1", *TARGET)
+        for reason, target in (
+            ("wrong_audience", {"audience": "graph:8000"}),
+            ("wrong_request", {"method": "DELETE"}),
+            ("wrong_request", {"path": "/api/admin/users"}),
+            ("no_audience_configured", {"audience": ""}),
+        ):
+            with self.subTest(target=target), self.assertRaises(internal_assertion.InvalidAssertion) as caught:
+                self.verify(value, **target)
+            self.assertEqual(str(caught.exception), reason)
+
+    def test_tampered_expired_and_wrong_key_are_rejected(self):
+        value = self.signer.sign(IDENTITY, "req-1", *TARGET)
+        version, body, mac = value.split(".")
+        forged = AssertionSigner(b"x" * 32).sign({**IDENTITY, "platform_role": "platform-admin"}, "req-1", *TARGET)
+        cases = {
+            "bad_signature": [f"{version}.{forged.split('.')[1]}.{mac}", forged],
+            "malformed": ["", "v2." + body + "." + mac, "v1.only-body"],
+        }
+        for reason, values in cases.items():
+            for candidate in values:
+                with self.assertRaises(internal_assertion.InvalidAssertion, msg=candidate) as caught:
+                    self.verify(candidate)
+                self.assertEqual(str(caught.exception), reason)
+        with self.assertRaisesRegex(internal_assertion.InvalidAssertion, "expired"):
+            self.verify(value, now=1_000_000 + 60)
+
+    def test_rotation_accepts_any_configured_key(self):
+        value = self.signer.sign(IDENTITY, "req-1", *TARGET)
+        self.assertEqual(self.verify(value, keys=(b"n" * 32, KEY.encode()))["sub"], "user-1")
+
+    def test_short_keys_are_refused(self):
+        with self.assertRaises(ValueError):
+            AssertionSigner(b"short")
+
+    def test_flask_decorator_sets_identity_or_answers_401(self):
+        upstream = Flask("upstream")
+        upstream.config["INTERNAL_ASSERTION_KEYS"] = [KEY]
+        upstream.config["INTERNAL_ASSERTION_AUDIENCE"] = "things:5000"
+
+        @upstream.route("/things", methods=["GET", "DELETE"])
+        @internal_assertion.require_assertion
+        def things():
+            return {"sub": internal_assertion.current_identity()["sub"]}
+
+        client = upstream.test_client()
+        signer = AssertionSigner(KEY.encode())
+        headers = {ASSERTION_HEADER: signer.sign(IDENTITY, "req-1", "GET", "http://things:5000/things")}
+        ok = client.get("/things", headers=headers)
+        replayed = client.delete("/things", headers=headers)
+        missing = client.get("/things")
+        self.assertEqual((ok.status_code, ok.get_json()), (200, {"sub": "user-1"}))
+        self.assertEqual((replayed.status_code, replayed.get_json()["reason"]), (401, "wrong_request"))
+        self.assertEqual((missing.status_code, missing.get_json()["error"]), (401, "invalid_internal_assertion"))
+
+
+class GatewayAssertionTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.upstream = EchoUpstream()
+        cls.env = {
+            "KEYCLOAK_ISSUER": cls.idp.url,
+            "UPSTREAM_URL": cls.upstream.url,
+            "GATEWAY_POLICY_DIR": str(example_policy_dir(Path(cls._tmp.name))),
+            "INTERNAL_ASSERTION_KEY": KEY,
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls.upstream.close()
+        cls._tmp.cleanup()
+
+    def headers(self):
+        token = self.idp.mint(groups=EDITOR_GROUPS)
+        # A client-supplied assertion must never reach the upstream.
+        return {"Authorization": f"Bearer {token}", "X-Project-Code": "BANANA-PEEL", ASSERTION_HEADER: "v1.forged.x"}
+
+    def forwarded_identity(self):
+        method, target, headers = self.upstream.requests[-1]
+        audience = self.upstream.url.removeprefix("http://")
+        return internal_assertion.verify_assertion(
+            headers[ASSERTION_HEADER], [KEY.encode()], audience, method, target.partition("?")[0]
+        )
+
+    def test_both_modes_forward_a_verifiable_assertion(self):
+        client = load_flask_app(**self.env).app.test_client()
+        self.assertEqual(client.get("/search/query", headers=self.headers()).status_code, 200)
+        sync_identity = self.forwarded_identity()
+
+        with mock.patch.dict(os.environ, self.env):
+            app = create_app(load_config())
+        with TestClient(app) as async_client:
+            self.assertEqual(async_client.get("/search/query", headers=self.headers()).status_code, 200)
+        async_identity = self.forwarded_identity()
+
+        for identity in (sync_identity, async_identity):
+            self.assertEqual(identity["sub"], "user-1")
+            self.assertEqual(identity["projects"], {"BANANA-PEEL": "EDIT"})
+
+    def test_no_key_means_no_assertion(self):
+        env = {**self.env, "INTERNAL_ASSERTION_KEY": ""}
+        client = load_flask_app(**env).app.test_client()
+        self.assertEqual(client.get("/search/query", headers=self.headers()).status_code, 200)
+        _, _, headers = self.upstream.requests[-1]
+        self.assertNotIn(ASSERTION_HEADER, headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import unittest
+
+from gateway_app.support import StandInIdP
+
+import jwt  # noqa: E402
+
+from gateway.jwks import JwksCache, fetch_json  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingFetcher:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def __call__(self, url, timeout):
+        with self._lock:
+            self.calls.append(url)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("idp unreachable")
+        return fetch_json(url, timeout)
+
+
+class JwksCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.idp = StandInIdP()
+        self.clock = FakeClock()
+        self.fetcher = CountingFetcher()
+
+    def tearDown(self):
+        self.idp.close()
+
+    def _cache(self, **kwargs):
+        kwargs.setdefault("ttl_seconds", 900)
+        kwargs.setdefault("min_refetch_interval_seconds", 10)
+        kwargs.setdefault("max_stale_seconds", 300)
+        return JwksCache(self.idp.url, fetcher=self.fetcher, clock=self.clock, **kwargs)
+
+    def test_keys_are_served_from_memory_until_ttl_expires(self):
+        cache = self._cache()
+        cache.get_signing_key("test-key-1")
+        self.clock.now += 899
+        cache.get_signing_key("test-key-1")
+        self.assertEqual(cache.fetch_count, 1)
+
+        self.clock.now += 2
+        cache.get_signing_key("test-key-1")
+        self.assertEqual(cache.fetch_count, 2)
+
+    def test_unknown_kid_refetch_is_shared_and_rate_limited(self):
+        self.fetcher.delay = 0.05
+        cache = self._cache()
+        cache.get_signing_key("test-key-1")
+        self.idp.add_key("rotated-key")
+        self.clock.now += 60
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            keys = list(pool.map(lambda _: cache.get_signing_key("rotated-key"), range(8)))
+
+        self.assertEqual({key.key_id for key in keys}, {"rotated-key"})
+        self.assertEqual(cache.fetch_count, 2)
+
+        with self.assertRaises(jwt.PyJWKClientError):
+            cache.get_signing_key("never-published")
+        self.assertEqual(cache.fetch_count, 2)
+
+    def test_last_good_keyset_is_served_while_idp_is_down(self):
+        cache = self._cache()
+        cache.get_signing_key("test-key-1")
+        self.fetcher.fail = True
+
+        self.clock.now += 950
+        self.assertEqual(cache.get_signing_key("test-key-1").key_id, "test-key-1")
+        self.assertIsNotNone(cache.last_error)
+
+        self.clock.now += 300
+        with self.assertRaises(jwt.PyJWKClientConnectionError):
+            cache.get_signing_key("test-key-1")
+
+    def test_background_refresh_runs_before_expiry(self):
+        cache = JwksCache(self.idp.url, ttl_seconds=0.4, refresh_ahead_seconds=0.2, min_refetch_interval_seconds=0.05)
+        cache.start()
+        try:
+            time.sleep(0.7)
+        finally:
+            cache.stop()
+        self.assertGreaterEqual(cache.fetch_count, 2)
+        self.assertLess(cache.age_seconds(), 0.4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+from pathlib import Path
+from unittest import mock
+import ast
+import os
+import tempfile
+import unittest
+
+from gateway_app.support import GATEWAY_DIR, EchoUpstream, StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.asgi import create_app  # noqa: E402
+from gateway.config import load_config  # noqa: E402
+from gateway.metrics import REGISTRY, REJECTION_REASONS, STAGES, reject  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class GatewayMetricsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.upstream = EchoUpstream()
+        cls.env = {
+            "KEYCLOAK_ISSUER": cls.idp.url,
+            "UPSTREAM_URL": cls.upstream.url,
+            "GATEWAY_POLICY_DIR": str(example_policy_dir(Path(cls._tmp.name))),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls.upstream.close()
+        cls._tmp.cleanup()
+
+    def test_sync_hot_path_records_every_stage(self):
+        client = load_flask_app(**self.env).app.test_client()
+        token = self.idp.mint(groups=["AI-NC-PROJ-BANANA-PEEL-VIEW"])
+        headers = {"Authorization": f"Bearer {token}", "X-Project-Code": "BANANA-PEEL"}
+        before = {stage: sample("gateway_stage_duration_seconds_count", stage=stage) for stage in STAGES}
+        hits = sample("gateway_cache_requests_total", cache="claims", result="hit")
+        denied = sample("gateway_rejections_total", reason="insufficient_project_role")
+
+        self.assertEqual(client.get("/search/query", headers=headers).status_code, 200)
+        self.assertEqual(client.get("/search/query", headers=headers).status_code, 200)
+        self.assertEqual(client.post("/ingest/upload", data=b"x", headers=headers).status_code, 403)
+        self.assertEqual(client.get("/no/such/route").status_code, 404)
+
+        for stage in STAGES:
+            self.assertGreater(sample("gateway_stage_duration_seconds_count", stage=stage), before[stage], stage)
+        self.assertEqual(sample("gateway_cache_requests_total", cache="claims", result="hit"), hits + 2)
+        self.assertEqual(sample("gateway_rejections_total", reason="insufficient_project_role"), denied + 1)
+        self.assertGreater(sample("http_requests_total", endpoint="proxy_search", method="GET", status="200"), 0)
+        self.assertGreater(sample("http_requests_total", endpoint="unmatched", method="GET", status="404"), 0)
+
+        body = client.get("/metrics").get_data(as_text=True)
+        self.assertIn('gateway_stage_duration_seconds_bucket{le="0.001",stage="signature_verify"}', body)
+
+    def test_async_mode_exposes_the_same_series(self):
+        with mock.patch.dict(os.environ, self.env):
+            app = create_app(load_config())
+        before = sample("http_requests_total", endpoint="whoami", method="GET", status="401")
+
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/whoami").status_code, 401)
+            scrape = client.get("/metrics")
+
+        self.assertEqual(sample("http_requests_total", endpoint="whoami", method="GET", status="401"), before + 1)
+        self.assertIn("text/plain", scrape.headers["content-type"])
+        self.assertIn("gateway_rejections_total", scrape.text)
+
+    def test_every_policy_denial_has_its_own_label(self):
+        # Every `return False, <status>, "<reason>", ...` in the policy engine.
+        tree = ast.parse((GATEWAY_DIR / "gateway" / "policy.py").read_text(encoding="utf-8"))
+        denials = {
+            node.value.elts[2].value
+            for node in ast.walk(tree)
+            if isinstance(node, ast.Return)
+            and isinstance(node.value, ast.Tuple)
+            and len(node.value.elts) == 4
+            and isinstance(node.value.elts[0], ast.Constant)
+            and node.value.elts[0].value is False
+        }
+        self.assertIn("mfa_required", denials)
+        self.assertEqual(denials - REJECTION_REASONS, set())
+
+    def test_unknown_rejection_reasons_fold_into_other(self):
+        before = sample("gateway_rejections_total", reason="other")
+        reject("attacker-controlled-value")
+        self.assertEqual(sample("gateway_rejections_total", reason="other"), before + 1)
+        self.assertIsNone(REGISTRY.get_sample_value("gateway_rejections_total", {"reason": "attacker-controlled-value"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
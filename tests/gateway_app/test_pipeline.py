@@ -0,0 +1,91 @@
+from pathlib import Path
+import base64
+import json
+import tempfile
+import unittest
+
+from gateway_app.support import StandInIdP, example_policy_dir
+
+from gateway.assertion import ASSERTION_HEADER  # noqa: E402
+from gateway.breaker import CircuitOpenError  # noqa: E402
+from gateway.config import GatewayConfig  # noqa: E402
+from gateway.pipeline import Admission, Incoming, Pipeline, Refusal, upstream_refusal  # noqa: E402
+from gateway.proxy import BodyTooLarge  # noqa: E402
+
+EDITOR_GROUPS = ["AI-NC-PROJ-BANANA-PEEL-EDIT"]
+
+
+def incoming(path, token=None, method="GET", query_string="", **headers):
+    if token is not None:
+        headers["Authorization"] = f"Bearer {token}"
+    return Incoming(method, path, query_string, headers, {}, "127.0.0.1", "req-1")
+
+
+class PipelineTests(unittest.TestCase):
+    """The decisions both serving modes share, checked without either framework."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.pipeline = Pipeline(
+            GatewayConfig(
+                upstream_url="http://upstream.internal:5000",
+                issuer=cls.idp.url,
+                audience=None,
+                policy_dir=str(example_policy_dir(Path(cls._tmp.name))),
+                internal_assertion_key="k" * 32,
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls._tmp.cleanup()
+
+    def test_gate_admits_or_refuses_with_the_reason(self):
+        token = self.idp.mint(sub="alice", groups=EDITOR_GROUPS)
+        scoped = incoming("/search/query", token, **{"X-Project-Code": "BANANA-PEEL"})
+
+        admitted, event = self.pipeline.gate(scoped)
+        self.assertIsInstance(admitted, Admission)
+        self.assertEqual((admitted.subject, admitted.project_code), ("alice", "BANANA-PEEL"))
+        self.assertEqual(admitted.decision.family, "search")
+        self.assertIsNone(event)  # no audit sink configured
+
+        self.assertEqual(self.pipeline.gate(incoming("/search/query", token))[0].error, "project_scope_required")
+        self.assertEqual(self.pipeline.gate(incoming("/search/query"))[0], Refusal("authentication_required", 401))
+        self.assertEqual(self.pipeline.gate(incoming("/search/query", "not.a.jwt"))[0], Refusal("invalid_token", 401))
+        # /whoami and /authz/batch are decided without the project header.
+        whoami, _ = self.pipeline.gate(incoming("/whoami", token), project_scoped=False, allowlist=False)
+        self.assertEqual(self.pipeline.whoami(whoami)["sub"], "alice")
+
+    def test_upstream_request_carries_an_assertion_bound_to_the_call(self):
+        token = self.idp.mint(sub="alice", groups=EDITOR_GROUPS)
+        scoped = incoming("/graph/nodes", token, "DELETE", "id=7", **{"X-Project-Code": "BANANA-PEEL"})
+        admitted, _ = self.pipeline.gate(scoped)
+
+        url, headers = self.pipeline.upstream_request(scoped, "graph", admitted, None, cached=False)
+
+        self.assertEqual(url, "http://upstream.internal:5000/graph/nodes?id=7")
+        payload = headers[ASSERTION_HEADER].split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        self.assertEqual((claims["sub"], claims["method"], claims["path"]), ("alice", "DELETE", "/graph/nodes"))
+        self.assertEqual(claims["aud"], "upstream.internal:5000")
+
+    def test_upstream_failures_map_to_one_answer_in_both_modes(self):
+        circuit_open = upstream_refusal(CircuitOpenError("upstream", 4.0), False, False)
+        self.assertEqual(circuit_open, Refusal("upstream_circuit_open", 503, 4.0))
+        self.assertEqual(upstream_refusal(BodyTooLarge(), True, False).status, 413)
+        self.assertEqual(upstream_refusal(OSError(), False, True).error, "upstream_timeout")
+        self.assertEqual(upstream_refusal(OSError(), False, False).error, "upstream_unavailable")
+
+    def test_body_length_refusals(self):
+        self.assertIsNone(self.pipeline.body_length(incoming("/ingest/x"), 10))
+        self.assertEqual(self.pipeline.body_length(incoming("/ingest/x", **{"Content-Length": "10"}), 10), 10)
+        self.assertEqual(self.pipeline.body_length(incoming("/ingest/x", **{"Content-Length": "11"}), 10).status, 413)
+        self.assertEqual(self.pipeline.body_length(incoming("/ingest/x", **{"Content-Length": "x"}), 10).status, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from gateway_app.support import StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.policy import compile_policy, load_policy  # noqa: E402
+
+
+class PolicyEngineTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.policy_dir = example_policy_dir(Path(cls._tmp.name))
+        cls.policy = load_policy(cls.policy_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def principal(self, *groups):
+        return self.policy.principal_from_claims({"sub": "u1", "groups": list(groups)})
+
+    def test_paths_resolve_to_route_families(self):
+        self.assertEqual(self.policy.match("/search/query").family, "search")
+        self.assertEqual(self.policy.match("/graph/mindmap/").family, "graph")
+        self.assertEqual(self.policy.match("/admin/users/42").family, "admin")
+        self.assertIsNone(self.policy.match("/search"))
+        self.assertIsNone(self.policy.match("/internal/debug"))
+
+    def test_deny_by_default_and_public_routes(self):
+        self.assertTrue(self.policy.authorize("/health", None).allowed)
+        unknown = self.policy.authorize("/internal/debug", self.principal("AI-PLATFORM-ADMINS"))
+        self.assertEqual((unknown.allowed, unknown.status), (False, 403))
+        self.assertEqual(self.policy.authorize("/whoami", None).status, 401)
+
+    def test_project_scoped_routes_use_project_role_precedence(self):
+        viewer = self.principal("AI-NC-PROJ-BANANA-PEEL-VIEW")
+        owner = self.principal("AI-NC-PROJ-BANANA-PEEL-VIEW", "AI-NC-PROJ-BANANA-PEEL-OWNER")
+
+        self.assertTrue(self.policy.authorize("/search/query", viewer, "BANANA-PEEL").allowed)
+        self.assertEqual(self.policy.authorize("/search/query", viewer).reason, "project_scope_required")
+        self.assertEqual(self.policy.authorize("/search/query", viewer, "LASAGNA").reason, "insufficient_project_role")
+        self.assertEqual(self.policy.authorize("/search/query", viewer, "NOPE").reason, "unknown_project")
+        self.assertFalse(self.policy.authorize("/ingest/upload", viewer, "BANANA-PEEL").allowed)
+        self.assertTrue(self.policy.authorize("/ingest/upload", owner, "BANANA-PEEL").allowed)
+
+    def test_platform_roles_use_role_precedence(self):
+        self.assertTrue(self.policy.authorize("/audit/events", self.principal("AI-SECURITY-AUDITORS")).allowed)
+        self.assertTrue(self.policy.authorize("/audit/events", self.principal("AI-PLATFORM-ADMINS")).allowed)
+        self.assertFalse(self.policy.authorize("/audit/events", self.principal("AI-OPS-READONLY")).allowed)
+
+        admin = self.policy.principal_from_claims({"sub": "u1", "groups": ["AI-PLATFORM-ADMINS"], "amr": ["mfa"]})
+        self.assertEqual(self.policy.authorize("/admin/users", admin).reason, "admin_allowlist_required")
+        decision = self.policy.authorize("/admin/users", admin, admin_allowlisted=True)
+        self.assertTrue(decision.allowed)
+        self.assertGreater(decision.elapsed_ns, 0)
+
+    def test_mfa_required_routes_need_a_second_factor(self):
+        password_only = self.principal("AI-PLATFORM-ADMINS")
+        decision = self.policy.authorize("/admin/users", password_only, admin_allowlisted=True)
+        self.assertEqual((decision.allowed, decision.status, decision.reason), (False, 403, "mfa_required"))
+
+        for claims in ({"amr": ["pwd", "otp"]}, {"amr": ["hwk"]}):
+            principal = self.policy.principal_from_claims({"sub": "u1", "groups": ["AI-PLATFORM-ADMINS"], **claims})
+            self.assertTrue(self.policy.authorize("/admin/users", principal, admin_allowlisted=True).allowed)
+        self.assertFalse(self.policy.principal_from_claims({"amr": "otp", "acr": "1"}).mfa)  # amr must be a list
+        self.assertFalse(self.principal("AI-OPS-READONLY").mfa)
+        self.assertTrue(self.policy.authorize("/whoami", password_only).allowed)  # only mfa_required families
+
+    def test_mfa_acr_values_come_from_rbac(self):
+        rbac = {
+            "platform_roles": {"ADMIN": {"required_groups": ["G"]}},
+            "role_precedence": ["ADMIN"],
+            "mfa_acr_values": ["gold"],
+        }
+        matrix = {"route_families": {"admin": {"paths": ["/admin/*"], "mfa_required": True}}}
+        policy = compile_policy(rbac, matrix, {"project_roles": {"VIEW": "VIEW"}, "projects": []})
+
+        gold = policy.principal_from_claims({"sub": "u1", "groups": ["G"], "acr": "gold"})
+        silver = policy.principal_from_claims({"sub": "u1", "groups": ["G"], "acr": "silver"})
+        self.assertTrue(policy.authorize("/admin/x", gold).allowed)
+        self.assertEqual(policy.authorize("/admin/x", silver).reason, "mfa_required")
+
+    def test_invalid_policy_is_rejected_at_compile_time(self):
+        rbac = {"platform_roles": {"ADMIN": {"required_groups": ["G"]}}, "role_precedence": ["ADMIN"]}
+        projects = {"project_roles": {"VIEW": "VIEW"}, "projects": []}
+        with self.assertRaises(ValueError):
+            compile_policy(rbac, {"route_families": {"x": {"paths": ["/x"], "min_platform_role": "ROOT"}}}, projects)
+        with self.assertRaises(ValueError):
+            compile_policy(
+                rbac,
+                {"route_families": {"a": {"paths": ["/x"]}, "b": {"paths": ["/x"]}}},
+                projects,
+            )
+
+    def test_whoami_is_authorized_by_the_compiled_policy(self):
+        idp = StandInIdP()
+        try:
+            module = load_flask_app(KEYCLOAK_ISSUER=idp.url, GATEWAY_POLICY_DIR=str(self.policy_dir))
+            client = module.app.test_client()
+            token = idp.mint(groups=["AI-OPS-READONLY", "AI-NC-PROJ-LASAGNA-EDIT"])
+            response = client.get("/whoami", headers={"Authorization": f"Bearer {token}"})
+            anonymous = client.get("/whoami")
+        finally:
+            idp.close()
+
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["platform_role"], "OPS_READONLY")
+        self.assertEqual(body["projects"], {"LASAGNA": "EDIT"})
+        self.assertEqual(body["policy_version"], self.policy.version)
+
+
+if __name__ == "__main__":
+    unittest.main()
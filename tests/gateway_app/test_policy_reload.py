@@ -0,0 +1,98 @@
+from pathlib import Path
+import shutil
+import tempfile
+import unittest
+
+from gateway_app.support import StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.metrics import REGISTRY  # noqa: E402
+from gateway.ratelimit import RATE_LIMITS_FILE  # noqa: E402
+from gateway.reload import PolicyWatcher  # noqa: E402
+
+NEW_PROJECT = '  - code: "NEW-PROJECT"\n    name: "New"\n    description: "Added at runtime"\n'
+
+
+def reloads(result):
+    return REGISTRY.get_sample_value("gateway_policy_reloads_total", {"result": result}) or 0.0
+
+
+class PolicyWatcherTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.policy_dir = example_policy_dir(Path(self._tmp.name))
+        self.watcher = PolicyWatcher(self.policy_dir, interval_seconds=0)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def append(self, name, text):
+        with open(self.policy_dir / name, "a", encoding="utf-8") as handle:
+            handle.write(text)
+
+    def test_unchanged_files_are_not_reloaded(self):
+        before = self.watcher.snapshot
+        self.assertFalse(self.watcher.check())
+        self.assertIs(self.watcher.snapshot, before)
+
+    def test_change_swaps_in_a_new_snapshot(self):
+        old = self.watcher.snapshot
+        self.append("projects.yaml", NEW_PROJECT)
+
+        self.assertTrue(self.watcher.check())
+        new = self.watcher.snapshot
+        self.assertNotEqual(new.version, old.version)
+        self.assertIn("NEW-PROJECT", new.policy.project_codes)
+        self.assertNotIn("NEW-PROJECT", old.policy.project_codes)  # in-flight requests keep their snapshot
+
+    def test_invalid_files_keep_the_previous_snapshot(self):
+        old = self.watcher.snapshot
+        failures = reloads("failure")
+        (self.policy_dir / "policy-matrix.yaml").write_text("route_families: [unclosed\n", encoding="utf-8")
+
+        self.assertFalse(self.watcher.check())
+        self.assertFalse(self.watcher.check())  # the same broken set is not parsed twice
+        self.assertIs(self.watcher.snapshot, old)
+        self.assertIsNotNone(self.watcher.last_error)
+        self.assertEqual(reloads("failure"), failures + 1)
+
+        shutil.rmtree(self.policy_dir)
+        self.assertFalse(self.watcher.check())
+        self.assertIs(self.watcher.snapshot, old)
+
+    def test_rate_limiter_survives_unrelated_reloads(self):
+        (self.policy_dir / RATE_LIMITS_FILE).write_text(
+            "defaults:\n  requests_per_second: 1\n  burst: 1\n", encoding="utf-8"
+        )
+        self.assertTrue(self.watcher.check())
+        limiter = self.watcher.snapshot.rate_limiter
+        self.assertEqual(limiter.acquire("alice", "search"), 0.0)
+
+        self.append("projects.yaml", NEW_PROJECT)
+        self.assertTrue(self.watcher.check())
+        self.assertIs(self.watcher.snapshot.rate_limiter, limiter)
+        self.assertGreater(limiter.acquire("alice", "search"), 0.0)
+
+
+class GatewayReloadTests(unittest.TestCase):
+    def test_health_reports_the_active_policy_version(self):
+        idp = StandInIdP()
+        with tempfile.TemporaryDirectory() as tmp:
+            policy_dir = example_policy_dir(Path(tmp))
+            try:
+                module = load_flask_app(KEYCLOAK_ISSUER=idp.url, GATEWAY_POLICY_DIR=str(policy_dir))
+                client = module.app.test_client()
+                before = client.get("/health").get_json()["policy_version"]
+                with open(policy_dir / "projects.yaml", "a", encoding="utf-8") as handle:
+                    handle.write(NEW_PROJECT)
+                module.policy_watcher.check()
+                after = client.get("/health").get_json()["policy_version"]
+            finally:
+                idp.close()
+
+        self.assertIsNotNone(before)
+        self.assertNotEqual(before, after)
+        self.assertEqual(after, module.policy_watcher.snapshot.version)
+
+
+if __name__ == "__main__":
+    unittest.main()
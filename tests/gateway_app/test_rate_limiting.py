@@ -0,0 +1,118 @@
+from pathlib import Path
+from unittest import mock
+import os
+import tempfile
+import unittest
+
+from gateway_app.support import EchoUpstream, StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.asgi import create_app  # noqa: E402
+from gateway.config import load_config  # noqa: E402
+from gateway.metrics import REGISTRY  # noqa: E402
+from gateway.ratelimit import RATE_LIMITS_FILE, Limit, RateLimiter, compile_rate_limits  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+EDITOR_GROUPS = ["AI-NC-PROJ-BANANA-PEEL-EDIT"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimiterTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(
+            {"ingest": Limit(rate=2, burst=4)}, default=Limit(rate=10, burst=10), max_entries=3, clock=self.clock
+        )
+
+    def test_burst_then_refill(self):
+        self.assertEqual([self.limiter.acquire("alice", "ingest") for _ in range(4)], [0.0] * 4)
+        self.assertAlmostEqual(self.limiter.acquire("alice", "ingest"), 0.5)
+        self.assertEqual(self.limiter.acquire("bob", "ingest"), 0.0)  # buckets are per subject
+
+        self.clock.now += 0.5
+        self.assertEqual(self.limiter.acquire("alice", "ingest"), 0.0)
+        self.assertGreater(self.limiter.acquire("alice", "ingest"), 0.0)
+
+    def test_unlisted_families_use_the_default(self):
+        before = REGISTRY.get_sample_value("gateway_rate_limited_total", {"family": "search"}) or 0.0
+        results = [self.limiter.acquire("alice", "search") for _ in range(11)]
+        self.assertEqual(results[:10], [0.0] * 10)
+        self.assertAlmostEqual(results[10], 0.1)
+        self.assertEqual(REGISTRY.get_sample_value("gateway_rate_limited_total", {"family": "search"}), before + 1)
+        self.assertEqual(RateLimiter({"ingest": Limit(2, 4)}).acquire("alice", "search"), 0.0)
+
+    def test_store_is_bounded_and_drops_refilled_buckets(self):
+        for subject in ("a", "b", "c", "d"):
+            self.limiter.acquire(subject, "ingest")
+        self.assertEqual(len(self.limiter), 3)
+        self.assertEqual(self.limiter.evictions, 1)
+
+        self.clock.now += 2  # burst / rate: every bucket is full again
+        self.limiter.acquire("e", "ingest")
+        self.assertEqual(len(self.limiter), 1)
+
+    def test_invalid_limits_are_rejected(self):
+        with self.assertRaises(ValueError):
+            compile_rate_limits({"route_families": {"search": {"requests_per_second": 0}}})
+
+
+class GatewayRateLimitTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.upstream = EchoUpstream()
+        policy_dir = example_policy_dir(Path(cls._tmp.name))
+        (policy_dir / RATE_LIMITS_FILE).write_text(
+            "route_families:\n  search:\n    requests_per_second: 0.01\n    burst: 2\n", encoding="utf-8"
+        )
+        cls.env = {
+            "KEYCLOAK_ISSUER": cls.idp.url,
+            "UPSTREAM_URL": cls.upstream.url,
+            "GATEWAY_POLICY_DIR": str(policy_dir),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls.upstream.close()
+        cls._tmp.cleanup()
+
+    def headers(self, sub):
+        token = self.idp.mint(sub=sub, groups=EDITOR_GROUPS)
+        return {"Authorization": f"Bearer {token}", "X-Project-Code": "BANANA-PEEL"}
+
+    def test_sync_mode_answers_429_with_retry_after(self):
+        client = load_flask_app(**self.env).app.test_client()
+        headers = self.headers("sync-user")
+        statuses = [client.get("/search/query", headers=headers).status_code for _ in range(2)]
+        limited = client.get("/search/query", headers=headers)
+
+        self.assertEqual(statuses, [200, 200])
+        self.assertEqual((limited.status_code, limited.get_json()["error"]), (429, "rate_limited"))
+        self.assertGreaterEqual(int(limited.headers["Retry-After"]), 1)
+        self.assertEqual(client.get("/search/query", headers=self.headers("other-user")).status_code, 200)
+        self.assertEqual(client.get("/whoami", headers=headers).status_code, 200)  # no limit for that family
+
+    def test_async_mode_answers_429_with_retry_after(self):
+        with mock.patch.dict(os.environ, self.env):
+            app = create_app(load_config())
+        headers = self.headers("async-user")
+        with TestClient(app) as client:
+            statuses = [client.get("/search/query", headers=headers).status_code for _ in range(2)]
+            limited = client.get("/search/query", headers=headers)
+
+        self.assertEqual(statuses, [200, 200])
+        self.assertEqual((limited.status_code, limited.json()["error"]), (429, "rate_limited"))
+        self.assertGreaterEqual(int(limited.headers["Retry-After"]), 1)
+        self.assertIn("X-Correlation-ID", limited.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
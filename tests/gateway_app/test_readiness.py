@@ -0,0 +1,142 @@
+from pathlib import Path
+from unittest import mock
+import os
+import socket
+import tempfile
+import time
+import unittest
+
+from gateway_app.support import StandInIdP, StubUpstream, example_policy_dir, load_flask_app
+
+from gateway.asgi import create_app  # noqa: E402
+from gateway.breaker import OPEN, CircuitOpenError  # noqa: E402
+from gateway.config import load_config  # noqa: E402
+from gateway.jwks import JwksCache  # noqa: E402
+from gateway.readiness import Readiness  # noqa: E402
+from gateway.reload import PolicyWatcher  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+
+class ReadinessReportTests(unittest.TestCase):
+    def setUp(self):
+        self.idp = StandInIdP()
+        self.addCleanup(self.idp.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.jwks = JwksCache(self.idp.url)
+        watcher = PolicyWatcher(example_policy_dir(Path(tmp.name)), interval_seconds=0)
+        self.now = 100.0
+        self.readiness = Readiness(self.jwks, watcher, interval_seconds=5, clock=lambda: self.now)
+        self.status = 200
+        self.circuit = "closed"
+        self.readiness.add_probe("upstream", lambda: self.status, lambda: self.circuit)
+
+    def test_ready_only_with_fresh_keys_and_a_recent_good_probe(self):
+        body, ready = self.readiness.report()
+        self.assertFalse(ready)
+        self.assertEqual(body["deps"], {"idp_jwks": False, "policy": True, "upstream": False})
+
+        self.jwks.get_signing_key(None)
+        self.readiness.probe()
+        body, ready = self.readiness.report()
+        self.assertTrue(ready)
+        self.assertEqual(body["status"], "ok")
+        self.assertEqual(body["probes"]["upstream"], {"ok": True, "detail": "200", "age_seconds": 0.0})
+        self.assertEqual(body["circuits"], {"upstream": "closed"})
+        self.assertIsNotNone(body["policy"]["version"])
+
+        self.now += 16  # probe thread stalled for more than three rounds
+        self.assertFalse(self.readiness.report()[1])
+
+    def test_failing_probe_and_open_circuit(self):
+        self.jwks.get_signing_key(None)
+        self.status = 503
+        self.readiness.probe()
+        self.assertEqual(self.readiness.report()[0]["probes"]["upstream"]["detail"], "503")
+        self.assertFalse(self.readiness.report()[1])
+
+        self.status = 200
+        self.readiness.probe()
+        self.circuit = OPEN
+        self.assertFalse(self.readiness.report()[1])
+
+        def refuse():
+            raise CircuitOpenError("upstream", 5)
+
+        self.readiness.add_probe("upstream", refuse, lambda: OPEN)
+        self.readiness.probe()
+        self.assertEqual(self.readiness.report()[0]["probes"]["upstream"]["detail"], "circuit_open")
+
+    def test_probe_rounds_notify_the_systemd_watchdog(self):
+        self.jwks.get_signing_key(None)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        address = os.path.join(tmp.name, "notify")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.addCleanup(listener.close)
+        listener.bind(address)
+        listener.settimeout(5)
+
+        readiness = Readiness(self.jwks, self.readiness.policy_watcher, interval_seconds=0.05)
+        readiness.add_probe("upstream", lambda: 200, lambda: "closed")
+        with mock.patch.dict(os.environ, {"NOTIFY_SOCKET": address}):
+            readiness.start()
+            try:
+                messages = [listener.recv(64), listener.recv(64), listener.recv(64)]
+            finally:
+                readiness.stop()
+        self.assertEqual(messages[:2], [b"READY=1", b"WATCHDOG=1"])
+        self.assertEqual(messages[2], b"WATCHDOG=1")  # READY=1 is only sent once
+
+
+class GatewayReadyTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.upstream = StubUpstream()
+        cls.env = {
+            "KEYCLOAK_ISSUER": cls.idp.url,
+            "UPSTREAM_URL": cls.upstream.url,
+            "GATEWAY_POLICY_DIR": str(example_policy_dir(Path(cls._tmp.name))),
+            "READINESS_PROBE_INTERVAL_SECONDS": "0.05",
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls.upstream.close()
+        cls._tmp.cleanup()
+
+    def test_sync_mode_answers_from_memory(self):
+        gateway = load_flask_app(**self.env)
+        client = gateway.app.test_client()
+        self.assertEqual(client.get("/ready").status_code, 503)
+
+        gateway.jwks_cache.get_signing_key(None)
+        gateway.readiness.probe()
+        idp_hits, upstream_hits = sum(self.idp.hits.values()), self.upstream.hits.get("/health", 0)
+        responses = [client.get("/ready") for _ in range(50)]
+
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertEqual(responses[0].get_json()["deps"], {"idp_jwks": True, "policy": True, "upstream": True})
+        self.assertEqual(sum(self.idp.hits.values()), idp_hits)
+        self.assertEqual(self.upstream.hits.get("/health", 0), upstream_hits)
+        self.assertNotIn(self.upstream.url, responses[0].get_data(as_text=True))
+
+    def test_async_mode_probes_in_the_background(self):
+        with mock.patch.dict(os.environ, self.env):
+            app = create_app(load_config())
+        with TestClient(app) as client:
+            deadline = time.monotonic() + 5
+            response = client.get("/ready")
+            while response.status_code != 200 and time.monotonic() < deadline:
+                time.sleep(0.05)
+                response = client.get("/ready")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["probes"]["upstream"]["detail"], "200")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,243 @@
+from pathlib import Path
+from unittest import mock
+import gzip
+import os
+import tempfile
+import unittest
+
+from gateway_app.support import EchoUpstream, StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.asgi import create_app  # noqa: E402
+from gateway.config import load_config  # noqa: E402
+from gateway.principal import Principal  # noqa: E402
+from gateway.response_cache import ResponseCache, acl_fingerprint, if_none_match  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+VIEWER_GROUPS = ["AI-NC-PROJ-BANANA-PEEL-VIEW"]
+EDITOR_GROUPS = ["AI-NC-PROJ-BANANA-PEEL-EDIT"]
+NODES = "/graph/nodes?size=5000&as=json"
+JSON = [("Content-Type", "application/json")]
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = ResponseCache(
+            ["/graph/nodes", "/graph/mindmap"], max_entries=3, max_bytes=250, ttl_seconds=10, clock=lambda: self.now
+        )
+        self.viewer = Principal("alice", 0, {"BANANA-PEEL": 1})
+
+    def test_routes_and_fingerprints(self):
+        self.assertTrue(self.cache.covers("GET", "/graph/nodes"))
+        self.assertTrue(self.cache.covers("GET", "/graph/mindmap/42/"))
+        self.assertFalse(self.cache.covers("GET", "/graph/nodes-export"))
+        self.assertFalse(self.cache.covers("POST", "/graph/nodes"))
+
+        same_roles = Principal("bob", 0, {"BANANA-PEEL": 1})
+        fingerprint = acl_fingerprint(self.viewer, "v1", "BANANA-PEEL", shared=True)
+        self.assertEqual(acl_fingerprint(same_roles, "v1", "BANANA-PEEL", shared=True), fingerprint)
+        own = acl_fingerprint(self.viewer, "v1", "BANANA-PEEL")
+        self.assertNotEqual(acl_fingerprint(same_roles, "v1", "BANANA-PEEL"), own)
+        self.assertNotEqual(own, fingerprint)
+        editor = Principal("bob", 0, {"BANANA-PEEL": 2})
+        self.assertNotEqual(acl_fingerprint(editor, "v1", "BANANA-PEEL", shared=True), fingerprint)
+        self.assertNotEqual(acl_fingerprint(self.viewer, "v2", "BANANA-PEEL", shared=True), fingerprint)
+        self.assertNotEqual(acl_fingerprint(self.viewer, "v1", "LASAGNA", shared=True), fingerprint)
+
+    def test_entries_expire_and_a_newer_policy_drops_everything(self):
+        key = self.cache.key(self.viewer, "v1", "BANANA-PEEL", "/graph/nodes", "")
+        stored = self.cache.put(key, 0, [*JSON, ("ETag", '"upstream"')], b"[1, 2]")
+        self.assertIs(self.cache.get(key, 0), stored)
+        self.assertNotEqual(stored.etag, '"upstream"')
+        self.assertEqual(dict(stored.response_headers())["Content-Length"], "6")
+
+        self.now = 10
+        self.assertIsNone(self.cache.get(key, 0))
+        self.cache.put(key, 0, JSON, b"[1, 2]")
+        self.assertIsNone(self.cache.get(self.cache.key(self.viewer, "v2", "BANANA-PEEL", "/graph/nodes", ""), 1))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_requests_on_an_older_policy_neither_clear_nor_store(self):
+        old = self.cache.key(self.viewer, "v1", None, "/graph/nodes", "")
+        new = self.cache.key(self.viewer, "v2", None, "/graph/nodes", "")
+        stored = self.cache.put(new, 2, JSON, b"[2]")
+
+        self.assertIsNone(self.cache.get(old, 1))  # a request still finishing on the old snapshot
+        self.assertIsNotNone(self.cache.put(old, 1, JSON, b"[1]"))  # tagged for its client, not kept
+        self.assertIs(self.cache.get(new, 2), stored)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_bounded_by_entries_and_bytes(self):
+        keys = [self.cache.key(self.viewer, "v1", None, "/graph/nodes", f"page={n}") for n in range(4)]
+        for key in keys:
+            self.cache.put(key, 0, JSON, b"x" * 10)
+        self.assertEqual(len(self.cache), 3)
+        self.assertIsNone(self.cache.get(keys[0], 0))
+
+        self.cache.put(keys[0], 0, JSON, b"x" * 245)
+        self.assertEqual(self.cache.stats()["bytes"], 245)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_only_public_responses_are_shared_between_subjects(self):
+        colleague = Principal("bob", 0, {"BANANA-PEEL": 1})
+        mine = self.cache.key(self.viewer, "v1", "BANANA-PEEL", "/graph/nodes", "")
+        theirs = self.cache.key(colleague, "v1", "BANANA-PEEL", "/graph/nodes", "")
+
+        filtered = self.cache.put(mine, 0, JSON, b'["alice-only"]')
+        self.assertIs(self.cache.get(mine, 0), filtered)
+        self.assertIsNone(self.cache.get(theirs, 0))
+
+        public = self.cache.put(mine, 0, [*JSON, ("Cache-Control", "public, max-age=10")], b"[]")
+        self.assertIs(self.cache.get(theirs, 0), public)
+        self.assertIs(self.cache.get(mine, 0), filtered)  # the subject's own entry still wins
+
+    def test_uncacheable_responses_are_tagged_elsewhere_but_not_stored(self):
+        key = self.cache.key(self.viewer, "v1", None, "/graph/nodes", "")
+        for header in (
+            ("Cache-Control", "private"),
+            ("Cache-Control", "public, no-store"),
+            ("Set-Cookie", "a=b"),
+            ("Vary", "Authorization"),
+            ("Vary", "Accept-Encoding, X-Identity-Assertion"),
+            ("Vary", "*"),
+        ):
+            with self.subTest(header=header):
+                self.assertIsNone(self.cache.put(key, 0, [*JSON, header], b"{}"))
+        self.assertIsNotNone(self.cache.put(key, 0, [*JSON, ("Vary", "accept-encoding")], b"{}"))
+        self.assertEqual(len(self.cache), 1)
+
+    def test_if_none_match_uses_weak_comparison(self):
+        self.assertTrue(if_none_match('"a", "b"', '"b"'))
+        self.assertTrue(if_none_match('W/"b"', '"b"'))
+        self.assertTrue(if_none_match('"b"', 'W/"b"'))
+        self.assertTrue(if_none_match("*", '"b"'))
+        self.assertFalse(if_none_match('"a"', '"b"'))
+        self.assertFalse(if_none_match(None, '"b"'))
+
+
+class GatewayConditionalGetTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.upstream = EchoUpstream()
+        cls.env = {
+            "KEYCLOAK_ISSUER": cls.idp.url,
+            "UPSTREAM_URL": cls.upstream.url,
+            "COMPRESSION_ENCODINGS": "gzip",
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls.upstream.close()
+        cls._tmp.cleanup()
+
+    def setUp(self):
+        self.policy_dir = example_policy_dir(Path(tempfile.mkdtemp(dir=self._tmp.name)))
+
+    def headers(self, groups=VIEWER_GROUPS, sub="viewer", **extra):
+        token = self.idp.mint(sub=sub, groups=groups)
+        return {"Authorization": f"Bearer {token}", "X-Project-Code": "BANANA-PEEL", **extra}
+
+    def upstream_calls(self, path="/graph/nodes"):
+        return sum(1 for _, target, _ in self.upstream.requests if target.startswith(path))
+
+    def test_sync_mode_answers_repeat_polls_with_304(self):
+        gateway = load_flask_app(**self.env, GATEWAY_POLICY_DIR=str(self.policy_dir))
+        client = gateway.app.test_client()
+        calls = self.upstream_calls()
+
+        first = client.get(NODES, headers=self.headers())
+        etag = first.headers["ETag"]
+        again = client.get(NODES, headers=self.headers(**{"If-None-Match": etag}))
+        editor = client.get(NODES, headers=self.headers(EDITOR_GROUPS, **{"If-None-Match": etag}))
+        compressed = client.get(NODES, headers=self.headers(**{"Accept-Encoding": "gzip", "If-None-Match": etag}))
+
+        self.assertEqual(first.status_code, 200)
+        self.assertFalse(etag.startswith("W/"))
+        self.assertEqual(len(first.data), 5000)
+        self.assertEqual((again.status_code, again.data, again.headers["ETag"]), (304, b"", etag))
+        self.assertEqual(editor.status_code, 200)
+        self.assertNotEqual(editor.headers["ETag"], etag)
+        self.assertEqual((compressed.status_code, compressed.headers["ETag"]), (304, f"W/{etag}"))
+        self.assertEqual(self.upstream_calls() - calls, 2)  # viewer and editor; the rest came from the cache
+
+        plain = client.get(NODES, headers=self.headers(**{"Accept-Encoding": "gzip"}))
+        self.assertEqual(gzip.decompress(plain.data), b"x" * 5000)
+
+    def test_subjects_with_the_same_roles_share_only_public_responses(self):
+        client = load_flask_app(**self.env, GATEWAY_POLICY_DIR=str(self.policy_dir)).app.test_client()
+        calls = self.upstream_calls()
+
+        etag = client.get(NODES, headers=self.headers(sub="alice")).headers["ETag"]
+        bob = client.get(NODES, headers=self.headers(sub="bob", **{"If-None-Match": etag}))
+        self.assertEqual(bob.status_code, 200)  # filtered for alice, so bob goes to the upstream
+        self.assertNotEqual(bob.headers["ETag"], etag)
+        self.assertEqual(self.upstream_calls() - calls, 2)
+
+        public = f"{NODES}&cache=public"
+        shared_etag = client.get(public, headers=self.headers(sub="alice")).headers["ETag"]
+        carol = client.get(public, headers=self.headers(sub="carol", **{"If-None-Match": shared_etag}))
+        self.assertEqual(carol.status_code, 304)
+        self.assertEqual(self.upstream_calls() - calls, 3)
+
+        varied = f"{NODES}&cache=public&vary=Authorization"
+        client.get(varied, headers=self.headers(sub="alice"))
+        client.get(varied, headers=self.headers(sub="alice"))
+        self.assertEqual(self.upstream_calls() - calls, 5)  # never stored
+
+    def test_policy_change_invalidates_cached_responses(self):
+        gateway = load_flask_app(**self.env, GATEWAY_POLICY_DIR=str(self.policy_dir))
+        client = gateway.app.test_client()
+        etag = client.get(NODES, headers=self.headers()).headers["ETag"]
+        calls = self.upstream_calls()
+
+        with open(self.policy_dir / "projects.yaml", "a", encoding="utf-8") as handle:
+            handle.write('  - code: "NEW-PROJECT"\n    name: "New"\n    description: "Added at runtime"\n')
+        self.assertTrue(gateway.policy_watcher.check())
+        refetched = client.get(NODES, headers=self.headers(**{"If-None-Match": etag}))
+
+        self.assertEqual(refetched.status_code, 200)
+        self.assertNotEqual(refetched.headers["ETag"], etag)
+        self.assertEqual(self.upstream_calls() - calls, 1)
+
+    def test_unchanged_body_is_304_even_without_a_fresh_entry(self):
+        gateway = load_flask_app(
+            **self.env, GATEWAY_POLICY_DIR=str(self.policy_dir), RESPONSE_CACHE_TTL_SECONDS="0"
+        )
+        client = gateway.app.test_client()
+        calls = self.upstream_calls()
+        etag = client.get(NODES, headers=self.headers()).headers["ETag"]
+        again = client.get(NODES, headers=self.headers(**{"If-None-Match": etag}))
+
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.upstream_calls() - calls, 2)
+
+    def test_large_and_uncovered_responses_stream_untagged(self):
+        client = load_flask_app(**self.env, GATEWAY_POLICY_DIR=str(self.policy_dir)).app.test_client()
+        large = client.get("/graph/nodes?size=2000000", headers=self.headers())
+        other = client.get("/graph/edges-export?size=5000&as=json", headers=self.headers())
+
+        self.assertEqual(len(large.data), 2000000)
+        self.assertNotIn("ETag", large.headers)
+        self.assertNotIn("ETag", other.headers)
+
+    def test_async_mode_answers_repeat_polls_with_304(self):
+        env = {**self.env, "GATEWAY_POLICY_DIR": str(self.policy_dir)}
+        with mock.patch.dict(os.environ, env):
+            app = create_app(load_config())
+        calls = self.upstream_calls("/graph/mindmap")
+        with TestClient(app) as client:
+            first = client.get("/graph/mindmap?size=5000&as=json", headers=self.headers())
+            etag = first.headers["etag"]
+            again = client.get("/graph/mindmap?size=5000&as=json", headers=self.headers(**{"If-None-Match": etag}))
+
+        self.assertEqual(len(first.content), 5000)
+        self.assertEqual((again.status_code, again.content, again.headers["etag"]), (304, b"", etag))
+        self.assertIn("x-correlation-id", again.headers)
+        self.assertEqual(self.upstream_calls("/graph/mindmap") - calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
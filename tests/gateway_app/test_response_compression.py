@@ -0,0 +1,130 @@
+from pathlib import Path
+from unittest import mock
+import gzip
+import os
+import tempfile
+import unittest
+import zlib
+
+from gateway_app.support import EchoUpstream, StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.asgi import create_app  # noqa: E402
+from gateway.compression import CompressionPolicy, compress_chunks, compressed_headers, negotiate  # noqa: E402
+from gateway.config import COMPRESSIBLE_TYPES, load_config  # noqa: E402
+from gateway.metrics import REGISTRY  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+VIEWER_GROUPS = ["AI-NC-PROJ-BANANA-PEEL-VIEW"]
+JSON_HEADERS = [("Content-Type", "application/json"), ("Content-Length", "200000"), ("ETag", '"v1"')]
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class NegotiationTests(unittest.TestCase):
+    def setUp(self):
+        self.policy = CompressionPolicy(("gzip",), min_bytes=1024, level=5, content_types=COMPRESSIBLE_TYPES)
+
+    def test_accept_encoding_quality_values(self):
+        self.assertEqual(negotiate("gzip, deflate, br", ("br", "gzip")), "br")
+        self.assertEqual(negotiate("gzip;q=1.0, br;q=0.5", ("br", "gzip")), "gzip")
+        self.assertEqual(negotiate("br;q=0, *", ("br", "gzip")), "gzip")
+        self.assertIsNone(negotiate("identity", ("br", "gzip")))
+        self.assertIsNone(negotiate("gzip;q=0", ("gzip",)))
+        self.assertIsNone(negotiate(None, ("gzip",)))
+
+    def test_threshold_type_and_existing_encoding_are_respected(self):
+        self.assertEqual(self.policy.choose("gzip", "GET", 200, JSON_HEADERS), "gzip")
+        small = [("Content-Type", "application/json"), ("Content-Length", "500")]
+        self.assertIsNone(self.policy.choose("gzip", "GET", 200, small))
+        self.assertIsNone(self.policy.choose("gzip", "GET", 200, [("Content-Type", "image/png")]))
+        self.assertIsNone(self.policy.choose("gzip", "GET", 200, [*JSON_HEADERS, ("Content-Encoding", "br")]))
+        self.assertIsNone(self.policy.choose("gzip", "HEAD", 200, JSON_HEADERS))
+        self.assertIsNone(self.policy.choose("gzip", "GET", 304, JSON_HEADERS))
+        chunked = [("Content-Type", "application/json; charset=utf-8")]  # unknown length
+        self.assertEqual(self.policy.choose("gzip", "GET", 200, chunked), "gzip")
+
+    def test_headers_describe_the_compressed_representation(self):
+        headers = dict(compressed_headers([*JSON_HEADERS, ("Vary", "Origin")], "gzip"))
+        self.assertNotIn("Content-Length", headers)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Vary"], "Origin, Accept-Encoding")
+        self.assertEqual(headers["ETag"], 'W/"v1"')
+
+    def test_stream_output_round_trips_and_is_counted(self):
+        saved = sample("gateway_compression_bytes_saved_total", encoding="gzip")
+        payload = [b'{"node": %d, "label": "banana peel"},' % index * 50 for index in range(200)]
+        compressor = self.policy.compressor("gzip")
+        stream = compress_chunks(iter(payload), compressor)
+        first = next(stream)  # output starts before the input is exhausted
+        body = first + b"".join(stream)
+
+        self.assertLess(len(first), sum(map(len, payload)))
+        self.assertEqual(gzip.decompress(body), b"".join(payload))
+        self.assertEqual(compressor.bytes_out, len(body))
+        self.assertEqual(compressor.bytes_in, len(b"".join(payload)))
+        self.assertEqual(
+            sample("gateway_compression_bytes_saved_total", encoding="gzip"), saved + compressor.bytes_in - len(body)
+        )
+        cpu_seconds = sample("gateway_compression_cpu_seconds_total", encoding="gzip")
+        self.assertGreaterEqual(cpu_seconds, compressor.cpu_seconds)
+
+    def test_brotli_is_only_offered_when_installed(self):
+        with mock.patch("gateway.compression.brotli", None):
+            self.assertEqual(CompressionPolicy(("br", "gzip")).encodings, ("gzip",))
+            self.assertIsNone(CompressionPolicy(("br",)).encodings or None)
+
+
+class GatewayCompressionTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.upstream = EchoUpstream()
+        cls.env = {
+            "KEYCLOAK_ISSUER": cls.idp.url,
+            "UPSTREAM_URL": cls.upstream.url,
+            "GATEWAY_POLICY_DIR": str(example_policy_dir(Path(cls._tmp.name))),
+            "COMPRESSION_ENCODINGS": "gzip",
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls.upstream.close()
+        cls._tmp.cleanup()
+
+    def headers(self, **extra):
+        token = self.idp.mint(groups=VIEWER_GROUPS)
+        return {"Authorization": f"Bearer {token}", "X-Project-Code": "BANANA-PEEL", **extra}
+
+    def test_sync_mode_compresses_large_json(self):
+        client = load_flask_app(**self.env).app.test_client()
+        gzip_ok = self.headers(**{"Accept-Encoding": "gzip"})
+        compressed = client.get("/graph/mindmap?size=300000&as=json", headers=gzip_ok)
+        plain = client.get("/graph/mindmap?size=300000&as=json", headers=self.headers())
+        binary = client.get("/graph/mindmap?size=300000", headers=gzip_ok)
+
+        self.assertEqual(compressed.headers["Content-Encoding"], "gzip")
+        self.assertEqual(compressed.headers["Vary"], "Accept-Encoding")
+        self.assertEqual(zlib.decompress(compressed.data, 16 + zlib.MAX_WBITS), b"x" * 300000)
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertEqual(len(plain.data), 300000)
+        self.assertNotIn("Content-Encoding", binary.headers)
+        self.assertEqual(len(binary.data), 300000)
+        self.assertEqual(self.upstream.requests[-1][2].get("Accept-Encoding"), "identity")
+
+    def test_async_mode_compresses_large_json(self):
+        with mock.patch.dict(os.environ, self.env):
+            app = create_app(load_config())
+        with TestClient(app) as client:
+            headers = self.headers(**{"Accept-Encoding": "gzip"})
+            response = client.get("/search/query?size=250000&as=json", headers=headers)
+
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.content, b"x" * 250000)  # httpx decodes the gzip body
+
+
+if __name__ == "__main__":
+    unittest.main()
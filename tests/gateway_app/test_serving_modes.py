@@ -0,0 +1,68 @@
+from unittest import mock
+import os
+import unittest
+
+from gateway_app.support import StandInIdP, StubUpstream, load_flask_app
+
+from gateway import asgi  # noqa: E402
+from gateway.asgi import create_app  # noqa: E402
+from gateway.config import load_config  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+
+class ServingModeTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.idp = StandInIdP()
+        cls.upstream = StubUpstream()
+        cls.env = {"KEYCLOAK_ISSUER": cls.idp.url, "UPSTREAM_URL": cls.upstream.url}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls.upstream.close()
+
+    def test_server_mode_is_validated(self):
+        with mock.patch.dict(os.environ, {"GATEWAY_SERVER_MODE": "async"}):
+            self.assertEqual(load_config().server_mode, "async")
+        with mock.patch.dict(os.environ, {"GATEWAY_SERVER_MODE": "gevent"}):
+            with self.assertRaises(ValueError):
+                load_config()
+
+    def test_async_app_is_built_by_the_factory_not_at_import(self):
+        self.assertFalse(hasattr(asgi, "app"))
+
+    def test_sync_mode_validates_token_and_calls_upstream(self):
+        module = load_flask_app(**self.env)
+        client = module.app.test_client()
+        headers = {"Authorization": f"Bearer {self.idp.mint()}"}
+
+        self.assertEqual(client.get("/api/protected/health").status_code, 401)
+        before = self.upstream.hits.get("/health", 0)
+        first = client.get("/api/protected/health", headers=headers)
+        second = client.get("/api/protected/health", headers=headers)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.get_json()["upstream_body"], {"status": "healthy"})
+        # The second call is answered from the short-lived upstream health cache.
+        self.assertEqual(self.upstream.hits["/health"], before + 1)
+
+    def test_async_mode_serves_same_routes(self):
+        with mock.patch.dict(os.environ, self.env):
+            app = create_app(load_config())
+        token = self.idp.mint(sub="async-user")
+
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/health").json()["status"], "ok")
+            self.assertEqual(client.get("/api/protected/health").status_code, 401)
+            invalid = client.get("/api/protected/health", headers={"Authorization": "Bearer not.a.jwt"})
+            response = client.get("/api/protected/health", headers={"Authorization": f"Bearer {token}"})
+
+        self.assertEqual(invalid.status_code, 401)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["claims_subject"], "async-user")
+        self.assertEqual(response.json()["upstream_status"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+import unittest
+
+import gateway_app.support  # noqa: F401  (puts infrastructure/gateway on sys.path)
+
+from gateway.metrics import REGISTRY  # noqa: E402
+from gateway.singleflight import AsyncSingleFlight, SingleFlight  # noqa: E402
+
+
+class SingleFlightTests(unittest.TestCase):
+    def test_concurrent_threads_share_one_call(self):
+        flight = SingleFlight("test_threads")
+        calls = []
+        barrier = threading.Barrier(8)
+        results = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return "keys"
+
+        def worker():
+            barrier.wait()
+            results.append(flight.do("jwks", fetch))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["keys"] * 8)
+        self.assertEqual((flight.leaders, flight.coalesced), (1, 7))
+        coalesced = REGISTRY.get_sample_value(
+            "gateway_singleflight_calls_total", {"flight": "test_threads", "role": "coalesced"}
+        )
+        self.assertEqual(coalesced, 7)
+
+        self.assertEqual(flight.do("jwks", lambda: "fresh"), "fresh")  # nothing is cached after completion
+
+    def test_waiters_receive_the_leaders_exception(self):
+        flight = SingleFlight("test_errors")
+        started = threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            time.sleep(0.1)
+            raise ConnectionError("idp down")
+
+        def waiter():
+            started.wait()
+            try:
+                flight.do("k", lambda: "unused")
+            except ConnectionError as exc:
+                errors.append(exc)
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        with self.assertRaises(ConnectionError):
+            flight.do("k", failing)
+        thread.join()
+        self.assertEqual(len(errors), 1)
+
+    def test_async_callers_share_one_task(self):
+        flight = AsyncSingleFlight("test_async")
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"status": "healthy"}
+
+        async def scenario():
+            first = asyncio.ensure_future(flight.do("/health", fetch))
+            await asyncio.sleep(0)
+            first.cancel()  # the leader's caller going away must not cancel the shared fetch
+            results = await asyncio.gather(*(flight.do("/health", fetch) for _ in range(5)))
+            return first, results
+
+        first, results = asyncio.run(scenario())
+        self.assertTrue(first.cancelled())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"status": "healthy"}] * 5)
+        self.assertEqual((flight.leaders, flight.coalesced), (1, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
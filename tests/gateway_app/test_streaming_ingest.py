@@ -0,0 +1,252 @@
+from pathlib import Path
+from unittest import mock
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from gateway_app.support import EchoUpstream, StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.asgi import create_app  # noqa: E402
+from gateway.config import load_config  # noqa: E402
+from gateway.ingest import INGEST_QUOTAS_FILE, IngestError, IngestStore, Quota  # noqa: E402
+from gateway.shared_cache import SharedCache  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+EDITOR_GROUPS = ["AI-NC-PROJ-BANANA-PEEL-EDIT"]
+BOUNDARY = "gateway-test-boundary"
+
+
+def multipart(payload, filename="scan.pdf", field="file", extra=b""):
+    head = (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nhello\r\n"
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    return head + payload + b"\r\n" + extra + f"--{BOUNDARY}--\r\n".encode()
+
+
+def chunks(data, size=64 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+class IngestStoreTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = IngestStore(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def spooled(self, project="BANANA-PEEL"):
+        return sorted(path.name for path in (Path(self._tmp.name) / project).iterdir())
+
+    def upload(self, body, quota=Quota(), chunk_size=7):
+        upload = self.store.upload("BANANA-PEEL", BOUNDARY.encode(), quota, max_body_bytes=1 << 30)
+        for chunk in chunks(body, chunk_size):
+            upload.feed(chunk)
+        upload.feed(None)
+        return upload.finish({"sub": "alice"})
+
+    def test_hashes_exactly_the_stored_bytes(self):
+        payload = os.urandom(200_000)
+        stored = self.upload(multipart(payload), chunk_size=4093)
+
+        digest = hashlib.sha256(payload).hexdigest()
+        self.assertEqual((stored.sha256, stored.size, stored.filename), (digest, len(payload), "scan.pdf"))
+        blob = Path(self._tmp.name) / "BANANA-PEEL" / digest
+        self.assertEqual(hashlib.sha256(blob.read_bytes()).hexdigest(), digest)
+        receipt = json.loads((blob.parent / f"{digest}.receipts.jsonl").read_text(encoding="utf-8"))
+        self.assertEqual((receipt["sub"], receipt["hash_algorithm"]), ("alice", "SHA-256"))
+
+    def test_quota_rejection_leaves_nothing_behind(self):
+        with self.assertRaises(IngestError) as caught:
+            self.upload(multipart(b"x" * 5000), Quota(max_project_bytes=4096))
+        self.assertEqual((caught.exception.error, caught.exception.status), ("ingest_quota_exceeded", 413))
+        self.assertEqual(self.spooled(), [])
+        self.assertEqual(self.store.used("BANANA-PEEL"), 0)
+
+        with self.assertRaises(IngestError) as caught:
+            self.upload(multipart(b"x" * 5000), Quota(max_file_bytes=4096))
+        self.assertEqual(caught.exception.error, "request_body_too_large")
+
+    def test_duplicate_keeps_one_copy_and_one_charge(self):
+        first = self.upload(multipart(b"same bytes"))
+        second = self.upload(multipart(b"same bytes", filename="copy.pdf"))
+
+        self.assertFalse(first.duplicate)
+        self.assertTrue(second.duplicate)
+        self.assertEqual(self.store.used("BANANA-PEEL"), len(b"same bytes"))
+        self.assertEqual(self.spooled(), [first.sha256, f"{first.sha256}.receipts.jsonl"])
+        self.assertEqual(IngestStore(self._tmp.name).used("BANANA-PEEL"), len(b"same bytes"))  # rescanned
+
+    def test_concurrent_duplicates_are_charged_once(self):
+        payload = os.urandom(50_000)
+        uploads = []
+        for _ in range(8):
+            upload = self.store.upload("BANANA-PEEL", BOUNDARY.encode(), Quota(), max_body_bytes=1 << 30)
+            upload.feed(multipart(payload))
+            upload.feed(None)
+            uploads.append(upload)
+        start = threading.Barrier(len(uploads))
+        results = []
+
+        def finish(upload):
+            start.wait()
+            results.append(upload.finish({"sub": "alice"}))
+
+        threads = [threading.Thread(target=finish, args=(upload,)) for upload in uploads]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(stored.duplicate for stored in results), [False] + [True] * 7)
+        self.assertEqual(self.store.used("BANANA-PEEL"), len(payload))
+        digest = hashlib.sha256(payload).hexdigest()
+        self.assertEqual(self.spooled(), [digest, f"{digest}.receipts.jsonl"])
+
+    def test_malformed_bodies_are_refused(self):
+        cases = {
+            "missing_file": multipart(b"abc", field="other"),
+            "multiple_files": multipart(
+                b"abc",
+                extra=(
+                    f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"b\"\r\n\r\nxyz\r\n"
+                ).encode(),
+            ),
+            "invalid_multipart": multipart(b"abc")[:-10],
+        }
+        for error, body in cases.items():
+            with self.subTest(error=error), self.assertRaises(IngestError) as caught:
+                self.upload(body)
+            self.assertEqual(caught.exception.error, error)
+        self.assertEqual(self.spooled(), [])
+
+
+
+class SharedQuotaTests(unittest.TestCase):
+    """Worker processes enforce one quota through the shared store."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name) / "spool"
+        self.shared = SharedCache(Path(tmp.name) / "shared")
+
+    def test_workers_cannot_jointly_overshoot(self):
+        quota = Quota(max_project_bytes=10_000)
+        ready_r, ready_w = os.pipe()
+        go_r, go_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                upload = IngestStore(self.root, self.shared).upload("BANANA-PEEL", BOUNDARY.encode(), quota, 1 << 30)
+                upload.feed(multipart(b"a" * 6000)[:-40])  # still in flight
+            finally:
+                os.write(ready_w, b"x")
+                os.read(go_r, 1)
+                os._exit(0)  # dies without releasing its reservation
+        os.read(ready_r, 1)
+        store = IngestStore(self.root, self.shared)
+
+        with self.assertRaises(IngestError) as caught:
+            feed(store, multipart(b"b" * 6000), quota)
+        self.assertEqual(caught.exception.error, "ingest_quota_exceeded")
+        self.assertGreater(store.used("BANANA-PEEL"), 5000)
+
+        os.write(go_w, b"x")
+        os.waitpid(pid, 0)
+        self.assertEqual(store.used("BANANA-PEEL"), 0)  # a dead worker's reservation is dropped
+        self.assertFalse(feed(store, multipart(b"b" * 6000), quota).duplicate)
+        self.assertEqual(IngestStore(self.root, self.shared).used("BANANA-PEEL"), 6000)
+
+
+def feed(store, body, quota):
+    upload = store.upload("BANANA-PEEL", BOUNDARY.encode(), quota, max_body_bytes=1 << 30)
+    upload.feed(body)
+    upload.feed(None)
+    return upload.finish({"sub": "alice"})
+
+class GatewayIngestTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.upstream = EchoUpstream()
+        policy_dir = example_policy_dir(Path(cls._tmp.name))
+        (policy_dir / INGEST_QUOTAS_FILE).write_text(
+            "defaults:\n  max_file_bytes: 4194304\n", encoding="utf-8"
+        )
+        cls.env = {
+            "KEYCLOAK_ISSUER": cls.idp.url,
+            "UPSTREAM_URL": cls.upstream.url,
+            "GATEWAY_POLICY_DIR": str(policy_dir),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls.upstream.close()
+        cls._tmp.cleanup()
+
+    def env_with_spool(self, name):
+        return {**self.env, "INGEST_SPOOL_DIR": str(Path(self._tmp.name) / name)}
+
+    def headers(self, **extra):
+        token = self.idp.mint(groups=EDITOR_GROUPS)
+        return {
+            "Authorization": f"Bearer {token}",
+            "X-Project-Code": "BANANA-PEEL",
+            "Content-Type": f"multipart/form-data; boundary={BOUNDARY}",
+            **extra,
+        }
+
+    def test_sync_mode_spools_and_returns_the_digest(self):
+        client = load_flask_app(**self.env_with_spool("sync")).app.test_client()
+        payload = os.urandom(3 * 1024 * 1024)
+
+        correlated = self.headers(**{"X-Correlation-ID": "c-1"})
+        upload = client.post("/ingest/upload", data=multipart(payload), headers=correlated)
+        again = client.post("/ingest/upload", data=multipart(payload), headers=self.headers())
+        too_big = client.post("/ingest/upload", data=multipart(b"x" * (4 * 1024 * 1024 + 1)), headers=self.headers())
+        wrong_type = client.post("/ingest/upload", data=b"raw", headers=self.headers(**{"Content-Type": "text/plain"}))
+        viewer = client.post(
+            "/ingest/upload",
+            data=multipart(b"abc"),
+            headers=self.headers(Authorization=f"Bearer {self.idp.mint(groups=['AI-NC-PROJ-BANANA-PEEL-VIEW'])}"),
+        )
+
+        self.assertEqual(upload.status_code, 201)
+        self.assertEqual(upload.get_json()["sha256"], hashlib.sha256(payload).hexdigest())
+        self.assertEqual(upload.get_json()["size"], len(payload))
+        self.assertEqual(upload.headers["X-Correlation-ID"], "c-1")
+        self.assertEqual((again.status_code, again.get_json()["duplicate"]), (200, True))
+        self.assertEqual((too_big.status_code, too_big.get_json()["error"]), (413, "request_body_too_large"))
+        self.assertEqual((wrong_type.status_code, wrong_type.get_json()["error"]), (415, "unsupported_media_type"))
+        self.assertEqual((viewer.status_code, viewer.get_json()["error"]), (403, "insufficient_project_role"))
+        relayed = [path for _, path, _ in self.upstream.requests if path.startswith("/ingest")]
+        self.assertEqual(relayed, [])  # readiness probes aside, nothing reached the upstream
+
+    def test_async_mode_spools_chunked_uploads(self):
+        with mock.patch.dict(os.environ, self.env_with_spool("async")):
+            app = create_app(load_config())
+        payload = os.urandom(2 * 1024 * 1024)
+
+        with TestClient(app) as client:
+            upload = client.post("/ingest/upload", content=chunks(multipart(payload)), headers=self.headers())
+            missing = client.post("/ingest/upload", content=multipart(b"abc", field="other"), headers=self.headers())
+
+        self.assertEqual(upload.status_code, 201)
+        body = upload.json()
+        self.assertEqual((body["sha256"], body["size"]), (hashlib.sha256(payload).hexdigest(), len(payload)))
+        stored = Path(self._tmp.name) / "async" / "BANANA-PEEL" / body["sha256"]
+        self.assertEqual(stored.stat().st_size, len(payload))
+        self.assertEqual((missing.status_code, missing.json()["error"]), (400, "missing_file"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+from pathlib import Path
+from unittest import mock
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+
+from gateway_app.support import EchoUpstream, StandInIdP, example_policy_dir, load_flask_app
+
+from gateway.asgi import create_app  # noqa: E402
+from gateway.config import GatewayConfig, load_config  # noqa: E402
+from gateway.upstream import UpstreamPool  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+EDITOR_GROUPS = ["AI-NC-PROJ-BANANA-PEEL-EDIT"]
+
+
+class StreamingProxyTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.idp = StandInIdP()
+        cls.upstream = EchoUpstream()
+        cls.env = {
+            "KEYCLOAK_ISSUER": cls.idp.url,
+            "UPSTREAM_URL": "http://127.0.0.1:9",
+            "UPSTREAM_ROUTES": f"search={cls.upstream.url},graph={cls.upstream.url},ingest={cls.upstream.url}",
+            "GATEWAY_POLICY_DIR": str(example_policy_dir(Path(cls._tmp.name))),
+            "PROXY_MAX_BODY_BYTES": str(8 * 1024 * 1024),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.idp.close()
+        cls.upstream.close()
+        cls._tmp.cleanup()
+
+    def headers(self, **extra):
+        token = self.idp.mint(groups=EDITOR_GROUPS)
+        return {"Authorization": f"Bearer {token}", "X-Project-Code": "BANANA-PEEL", **extra}
+
+    def test_sync_proxy_streams_upload_and_download(self):
+        client = load_flask_app(**self.env).app.test_client()
+        payload = os.urandom(3 * 1024 * 1024)
+
+        self.assertEqual(client.post("/ingest/upload", data=b"x").status_code, 401)
+        upload = client.post(
+            "/ingest/upload?mode=raw",
+            data=payload,
+            headers=self.headers(**{"X-Correlation-ID": "corr-1", "Content-Type": "application/octet-stream"}),
+        )
+        download = client.get("/graph/mindmap?size=2000000", headers=self.headers())
+
+        self.assertEqual(upload.status_code, 200)
+        echoed = upload.get_json()
+        self.assertEqual((echoed["bytes"], echoed["sha256"]), (len(payload), hashlib.sha256(payload).hexdigest()))
+        self.assertEqual(echoed["content_length"], str(len(payload)))
+        self.assertEqual(echoed["correlation_id"], "corr-1")
+        self.assertTrue(echoed["authorization"].startswith("Bearer "))
+        self.assertEqual(upload.headers["X-Correlation-ID"], "corr-1")
+        self.assertEqual(upload.headers["X-Upstream"], "echo")
+
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(len(download.data), 2_000_000)
+        self.assertTrue(download.headers["X-Correlation-ID"].startswith("req-"))
+
+    def test_sync_proxy_rejects_oversized_and_unauthorized_bodies(self):
+        client = load_flask_app(**self.env).app.test_client()
+        viewer = {"Authorization": f"Bearer {self.idp.mint(groups=['AI-NC-PROJ-BANANA-PEEL-VIEW'])}"}
+
+        denied = client.post("/ingest/upload", data=b"x", headers={**viewer, "X-Project-Code": "BANANA-PEEL"})
+        too_large = client.put("/ingest/upload", data=b"x" * (8 * 1024 * 1024 + 1), headers=self.headers())
+        unknown = client.get("/search/other", headers=self.headers())
+
+        self.assertEqual((denied.status_code, denied.get_json()["error"]), (403, "insufficient_project_role"))
+        self.assertEqual((too_large.status_code, too_large.get_json()["error"]), (413, "request_body_too_large"))
+        self.assertEqual(unknown.status_code, 403)
+
+    def test_async_proxy_streams_chunked_upload(self):
+        with mock.patch.dict(os.environ, self.env):
+            app = create_app(load_config())
+        payload = os.urandom(2 * 1024 * 1024)
+
+        def chunks(data):
+            for start in range(0, len(data), 256 * 1024):
+                yield data[start : start + 256 * 1024]
+
+        with TestClient(app) as client:
+            upload = client.post("/ingest/upload", content=chunks(payload), headers=self.headers())
+            download = client.get("/search/query?size=1500000", headers=self.headers())
+            oversized = client.post(
+                "/ingest/upload", content=chunks(b"y" * (8 * 1024 * 1024 + 1)), headers=self.headers()
+            )
+
+        self.assertEqual(upload.status_code, 200)
+        echoed = upload.json()
+        self.assertEqual((echoed["bytes"], echoed["sha256"]), (len(payload), hashlib.sha256(payload).hexdigest()))
+        self.assertEqual(echoed["transfer_encoding"], "chunked")
+        self.assertEqual(upload.headers["x-correlation-id"], echoed["correlation_id"])
+        self.assertEqual(len(download.content), 1_500_000)
+        self.assertEqual((oversized.status_code, oversized.json()["error"]), (413, "request_body_too_large"))
+
+    def test_sync_pool_caps_connections_per_host(self):
+        cfg = GatewayConfig(self.upstream.url, self.idp.url, None, upstream_pool_max_per_host=1)
+        pool = UpstreamPool(cfg)
+        self.addCleanup(pool.close)
+        held = pool.stream("GET", f"{self.upstream.url}/held?size=10", {})
+        second = []
+        waiter = threading.Thread(target=lambda: second.append(pool.get(f"{self.upstream.url}/next?size=1")))
+        waiter.start()
+
+        waiter.join(timeout=0.5)
+        self.assertTrue(waiter.is_alive())  # waits for the one connection instead of opening another
+        held.close()
+        waiter.join(timeout=5)
+        self.assertEqual(second[0].status_code, 200)
+
+    def test_unreachable_upstream_is_a_bad_gateway(self):
+        env = {**self.env, "UPSTREAM_ROUTES": "search=http://127.0.0.1:9"}
+        client = load_flask_app(**env).app.test_client()
+        response = client.get("/search/query", headers=self.headers())
+        self.assertEqual((response.status_code, response.get_json()["error"]), (502, "upstream_unavailable"))
+
+        with mock.patch.dict(os.environ, env):
+            app = create_app(load_config())
+        with TestClient(app) as async_client:
+            response = async_client.get("/search/query", headers=self.headers())
+        self.assertEqual((response.status_code, response.json()["error"]), (502, "upstream_unavailable"))
+
+
+if __name__ == "__main__":
+    unittest.main()
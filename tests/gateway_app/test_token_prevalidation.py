@@ -0,0 +1,112 @@
+from unittest import mock
+import time
+import unittest
+
+from gateway_app.support import StandInIdP
+
+import jwt  # noqa: E402
+
+from gateway.auth import validate_bearer_token  # noqa: E402
+from gateway.claims_cache import ClaimsCache, RejectedTokenCache  # noqa: E402
+from gateway.config import GatewayConfig  # noqa: E402
+from gateway.jwks import JwksCache  # noqa: E402
+from gateway.metrics import REGISTRY  # noqa: E402
+
+
+def rejections(reason):
+    return REGISTRY.get_sample_value("gateway_token_rejections_total", {"reason": reason}) or 0.0
+
+
+class TokenPrevalidationTests(unittest.TestCase):
+    def setUp(self):
+        self.idp = StandInIdP()
+        self.cfg = GatewayConfig(upstream_url="http://upstream", issuer=self.idp.url, audience=None)
+        self.jwks = JwksCache(self.idp.url, min_refetch_interval_seconds=60)
+        self.rejected = RejectedTokenCache(max_entries=10, ttl_seconds=60)
+
+    def tearDown(self):
+        self.idp.close()
+
+    def validate(self, token):
+        return validate_bearer_token(token, self.cfg, self.jwks, ClaimsCache(), self.rejected)
+
+    def test_cheap_rejections_never_touch_jwks_or_crypto(self):
+        now = int(time.time())
+        bad_tokens = {
+            "expired": self.idp.mint(exp=now - 120),
+            "wrong_issuer": self.idp.mint(iss="https://evil.example"),
+            "unsupported_alg": jwt.encode({"iss": self.idp.url, "exp": now + 60}, "k" * 32, algorithm="HS256"),
+            "malformed": "not-a-jwt",
+            "missing_claim": self.idp.mint(exp=None),
+        }
+
+        with mock.patch("gateway.auth.jwt.decode", wraps=jwt.decode) as decode:
+            for reason, token in bad_tokens.items():
+                before = rejections(reason)
+                with self.assertRaises(jwt.InvalidTokenError, msg=reason):
+                    self.validate(token)
+                self.assertEqual(rejections(reason), before + 1, reason)
+
+        self.assertEqual(decode.call_count, 0)
+        self.assertEqual(self.idp.hits.get("/jwks", 0), 0)
+        self.assertEqual(self.jwks.fetch_count, 0)
+
+    def test_expiry_allows_clock_skew(self):
+        token = self.idp.mint(exp=int(time.time()) - 30)
+        self.assertEqual(self.validate(token)["sub"], "user-1")
+
+    def test_repeat_offenders_are_refused_from_the_negative_cache(self):
+        forged = self.idp.mint()[:-8] + "AAAAAAAA"
+        with self.assertRaises(jwt.InvalidSignatureError):
+            self.validate(forged)
+
+        before = rejections("recently_rejected")
+        with mock.patch("gateway.auth.prevalidate") as prevalidate:
+            for _ in range(3):
+                with self.assertRaises(jwt.InvalidTokenError):
+                    self.validate(forged)
+        prevalidate.assert_not_called()
+        self.assertEqual(rejections("recently_rejected"), before + 3)
+        self.assertEqual(self.rejected.hits, 3)
+
+    def test_unknown_kid_and_idp_outage_are_not_negative_cached(self):
+        self.idp.add_key("rotated-key")
+        unknown = self.idp.mint(kid="rotated-key")
+        self.idp.keys.pop("rotated-key")
+        with self.assertRaises(jwt.PyJWKClientError):
+            self.validate(unknown)
+        self.assertEqual(len(self.rejected), 0)
+
+        offline = JwksCache("http://127.0.0.1:9", fetch_timeout_seconds=0.2)
+        cfg = GatewayConfig(upstream_url="http://upstream", issuer="http://127.0.0.1:9", audience=None)
+        token = jwt.encode(
+            {"iss": "http://127.0.0.1:9", "exp": int(time.time()) + 60},
+            self.idp.keys["test-key-1"],
+            algorithm="RS256",
+            headers={"kid": "test-key-1"},
+        )
+        with self.assertRaises(jwt.PyJWKClientConnectionError):
+            validate_bearer_token(token, cfg, offline, None, self.rejected)
+        self.assertEqual(len(self.rejected), 0)
+
+    def test_not_yet_valid_is_not_negative_cached(self):
+        early = self.idp.mint(nbf=int(time.time()) + self.cfg.clock_skew_seconds + 30)
+        for _ in range(2):
+            with self.assertRaises(jwt.ImmatureSignatureError):
+                self.validate(early)
+        self.assertEqual(len(self.rejected), 0)
+
+    def test_negative_cache_is_bounded_and_expires(self):
+        now = [0.0]
+        cache = RejectedTokenCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+        for digest in (b"a", b"b", b"c"):
+            cache.add(digest)
+        self.assertNotIn(b"a", cache)
+        self.assertIn(b"c", cache)
+        self.assertEqual(cache.evictions, 1)
+        now[0] = 11
+        self.assertNotIn(b"c", cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,241 @@
+from pathlib import Path
+from unittest import mock
+import multiprocessing
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from gateway_app.support import GATEWAY_DIR, StandInIdP, StubUpstream, example_policy_dir
+
+import jwt  # noqa: E402
+from prometheus_client.parser import text_string_to_metric_families  # noqa: E402
+import requests  # noqa: E402
+
+from gateway.auth import validate_bearer_token  # noqa: E402
+from gateway.claims_cache import ClaimsCache  # noqa: E402
+from gateway.config import GatewayConfig  # noqa: E402
+from gateway.jwks import JwksCache  # noqa: E402
+from gateway.ratelimit import RATE_LIMITS_FILE, Limit, RateLimiter  # noqa: E402
+from gateway.shared_cache import SharedCache  # noqa: E402
+from gateway.workers import NotifyRelay, listen, watch_spawned_workers  # noqa: E402
+
+
+class SharedCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.idp = StandInIdP()
+        self.addCleanup(self.idp.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.shared = SharedCache(Path(tmp.name) / "shared")
+        self.cfg = GatewayConfig(upstream_url="http://upstream", issuer=self.idp.url, audience=None)
+
+    def worker(self):
+        """The caches one worker process would build."""
+        jwks = JwksCache(self.idp.url, min_refetch_interval_seconds=0, shared=self.shared)
+        return jwks, ClaimsCache(shared=self.shared)
+
+    def test_second_worker_reuses_keys_and_verified_claims(self):
+        first_jwks, first_claims = self.worker()
+        second_jwks, second_claims = self.worker()
+        token = self.idp.mint(sub="shared-user")
+
+        validate_bearer_token(token, self.cfg, first_jwks, first_claims)
+        second_jwks.get_signing_key(None)  # the refresh thread warms a new worker
+        with mock.patch("gateway.auth.jwt.decode", wraps=jwt.decode) as decode:
+            claims = validate_bearer_token(token, self.cfg, second_jwks, second_claims)
+
+        self.assertEqual(claims["sub"], "shared-user")
+        self.assertEqual(decode.call_count, 0)
+        self.assertEqual(self.idp.hits["/jwks"], 1)
+        self.assertEqual((first_jwks.fetch_count, second_jwks.fetch_count), (1, 0))
+        self.assertIsNotNone(second_jwks.age_seconds())
+
+    def test_unknown_kid_is_fetched_once_for_all_workers(self):
+        first_jwks, _ = self.worker()
+        second_jwks, _ = self.worker()
+        first_jwks.get_signing_key(None)
+        second_jwks.get_signing_key(None)
+
+        self.idp.add_key("rotated")
+        first_jwks.get_signing_key("rotated")
+        second_jwks.get_signing_key("rotated")  # adopts the keyset the first worker just published
+        self.assertEqual(self.idp.hits["/jwks"], 2)
+
+    def test_workers_spend_one_rate_limit_bucket(self):
+        limits = {"search": Limit(rate=0.01, burst=4)}
+        first, second = RateLimiter(limits, shared=self.shared), RateLimiter(limits, shared=self.shared)
+
+        waits = [limiter.acquire("alice", "search") for limiter in (first, second) * 3]
+        self.assertEqual(waits[:4], [0.0] * 4)
+        self.assertTrue(all(wait > 0 for wait in waits[4:]))
+        self.assertEqual(first.acquire("bob", "search"), 0.0)
+        self.assertEqual(len(first) + len(second), 0)  # nothing held in the workers' own LRUs
+
+    def test_directory_must_be_private(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        os.chmod(tmp.name, 0o755)
+        with self.assertRaises(PermissionError):
+            SharedCache(tmp.name)
+
+
+class NotifyRelayTests(unittest.TestCase):
+    def setUp(self):
+        self.relay = NotifyRelay(2, "unused")
+        self.addCleanup(self.relay.close)
+
+    def test_ready_once_every_worker_is_ready(self):
+        self.assertEqual(self.relay.handle(11, "READY=1"), [])
+        self.assertEqual(self.relay.handle(11, "READY=1"), [])
+        self.assertEqual(self.relay.handle(12, "READY=1"), ["READY=1"])
+        self.assertEqual(self.relay.handle(13, "READY=1"), [])  # a restarted worker
+
+    def test_a_wedged_worker_starves_the_watchdog(self):
+        self.assertEqual(self.relay.handle(11, "WATCHDOG=1"), [])
+        self.assertEqual(self.relay.handle(12, "WATCHDOG=1"), ["WATCHDOG=1"])
+        for _ in range(3):
+            self.assertEqual(self.relay.handle(11, "WATCHDOG=1"), [])
+
+
+class WorkerProcessTests(unittest.TestCase):
+    def test_exits_of_spawned_workers_are_reported(self):
+        # uvicorn's workers: spawned by multiprocessing, never reported to the gateway.
+        worker = multiprocessing.get_context("spawn").Process(target=time.sleep, args=(0.5,))
+        worker.start()
+        exited = []
+        self.addCleanup(watch_spawned_workers(exited.append, interval_seconds=0.05).set)
+        worker.join()
+        deadline = time.monotonic() + 5
+        while not exited and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(exited, [worker.pid])
+
+    def test_sync_workers_share_one_jwks_fetch_limits_and_metrics(self):
+        idp = StandInIdP()
+        self.addCleanup(idp.close)
+        upstream = StubUpstream()
+        self.addCleanup(upstream.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        policy_dir = example_policy_dir(Path(tmp.name))
+        (policy_dir / RATE_LIMITS_FILE).write_text(
+            "defaults:\n  requests_per_second: 0.01\n  burst: 5\n", encoding="utf-8"
+        )
+        with listen("127.0.0.1", 0) as probe:
+            port = probe.getsockname()[1]
+        env = dict(
+            os.environ,
+            KEYCLOAK_ISSUER=idp.url,
+            UPSTREAM_URL=upstream.url,
+            GATEWAY_POLICY_DIR=str(policy_dir),
+            GATEWAY_SHARED_CACHE_DIR=str(Path(tmp.name) / "shared"),
+            GATEWAY_WORKERS="3",
+            GATEWAY_BIND_HOST="127.0.0.1",
+            GATEWAY_BIND_PORT=str(port),
+            PROMETHEUS_MULTIPROC_DIR=str(Path(tmp.name) / "metrics"),
+        )
+        proc = subprocess.Popen(
+            [sys.executable, "app.py"], cwd=GATEWAY_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self.addCleanup(proc.kill)
+        base = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            try:
+                requests.get(f"{base}/health", timeout=0.5)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+
+        def whoami(token):
+            headers = {"Authorization": f"Bearer {token}", "Connection": "close"}
+            return requests.get(f"{base}/whoami", headers=headers).status_code
+
+        statuses = {whoami(idp.mint(sub=f"u{n}")) for n in range(24)}
+        token = idp.mint(sub="busy-user")
+        limited = [whoami(token) for _ in range(12)]
+        scrape = requests.get(f"{base}/metrics", headers={"Connection": "close"}).text
+        workers = subprocess.run(["pgrep", "-P", str(proc.pid)], capture_output=True, text=True).stdout.split()
+        proc.send_signal(signal.SIGTERM)
+
+        self.assertEqual(statuses, {200})
+        self.assertEqual(len(workers), 3)
+        self.assertEqual(idp.hits["/jwks"], 1)
+        # One bucket for the whole gateway, not one per worker.
+        self.assertEqual(limited, [200] * 5 + [429] * 7)
+        # Every worker's requests, whichever worker answered the scrape.
+        self.assertEqual(requests_total(scrape, "200"), 29)
+        self.assertEqual(requests_total(scrape, "429"), 7)
+        self.assertEqual(proc.wait(timeout=15), 0)
+
+    def test_systemd_hears_only_from_the_main_process(self):
+        idp = StandInIdP()
+        self.addCleanup(idp.close)
+        upstream = StubUpstream()
+        self.addCleanup(upstream.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with listen("127.0.0.1", 0) as probe:
+            port = probe.getsockname()[1]
+        env = dict(
+            os.environ,
+            KEYCLOAK_ISSUER=idp.url,
+            UPSTREAM_URL=upstream.url,
+            GATEWAY_POLICY_DIR=str(example_policy_dir(Path(tmp.name))),
+            GATEWAY_SHARED_CACHE_DIR=str(Path(tmp.name) / "shared"),
+            GATEWAY_WORKERS="2",
+            GATEWAY_BIND_HOST="127.0.0.1",
+            GATEWAY_BIND_PORT=str(port),
+            READINESS_PROBE_INTERVAL_SECONDS="0.2",
+        )
+        for mode in ("sync", "async"):
+            with self.subTest(mode=mode):
+                address = str(Path(tmp.name) / f"notify-{mode}")
+                notify = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self.addCleanup(notify.close)
+                notify.setsockopt(socket.SOL_SOCKET, socket.SO_PASSCRED, 1)
+                notify.bind(address)
+                notify.settimeout(20)
+                proc = subprocess.Popen(
+                    [sys.executable, "app.py"],
+                    cwd=GATEWAY_DIR,
+                    env=dict(env, GATEWAY_SERVER_MODE=mode, NOTIFY_SOCKET=address),
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                self.addCleanup(proc.kill)
+                messages = []
+                while {b"READY=1", b"WATCHDOG=1"} - {message for message, _ in messages}:
+                    messages.append(receive(notify))
+                proc.send_signal(signal.SIGTERM)
+                proc.wait(timeout=15)
+
+                self.assertEqual([message for message, _ in messages].count(b"READY=1"), 1)
+                self.assertEqual({sender for _, sender in messages}, {proc.pid})
+
+
+def receive(sock):
+    """One datagram and the PID that sent it."""
+    credentials = struct.Struct("3i")
+    data, ancillary, _, _ = sock.recvmsg(64, socket.CMSG_SPACE(credentials.size))
+    pid, _, _ = credentials.unpack(ancillary[0][2][: credentials.size])
+    return data, pid
+
+
+def requests_total(payload, status):
+    for family in text_string_to_metric_families(payload):
+        for sample in family.samples:
+            labels = {"endpoint": "whoami", "method": "GET", "status": status}
+            if sample.name == "http_requests_total" and sample.labels == labels:
+                return sample.value
+    return 0.0
+
+
+if __name__ == "__main__":
+    unittest.main()
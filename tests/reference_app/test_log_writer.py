@@ -0,0 +1,112 @@
+from pathlib import Path
+from unittest import mock
+import io
+import json
+import sys
+import threading
+import unittest
+
+
+REFERENCE_APP_DIR = Path(__file__).resolve().parents[2] / "services" / "reference-app"
+sys.path.insert(0, str(REFERENCE_APP_DIR))
+
+import app as reference_app  # noqa: E402
+from log_writer import LogWriter  # noqa: E402
+
+
+class RecordingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+
+
+class BlockedStream(RecordingStream):
+    """Holds the writer thread in its first write until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.writing.set()
+        self.release.wait(5)
+        return super().write(text)
+
+
+class LogWriterTests(unittest.TestCase):
+    def lines(self, stream):
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    def test_lines_are_batched_into_few_flushes(self):
+        stream = RecordingStream()
+        writer = LogWriter(stream, batch_max_lines=4, flush_interval_seconds=60)
+        for index in range(10):
+            writer.emit({"n": index})
+        writer.stop()
+
+        self.assertEqual([line["n"] for line in self.lines(stream)], list(range(10)))
+        self.assertLessEqual(stream.flushes, 3)  # two full batches of 4, then the rest at stop
+        self.assertEqual(writer.written, 10)
+
+    def test_partial_batch_is_flushed_after_the_interval(self):
+        stream = RecordingStream()
+        writer = LogWriter(stream, batch_max_lines=100, flush_interval_seconds=0.05)
+        self.addCleanup(writer.stop)
+        writer.emit({"message": "one"})
+        for _ in range(100):
+            if stream.getvalue():
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(self.lines(stream), [{"message": "one"}])
+
+    def test_full_queue_drops_and_counts_instead_of_blocking(self):
+        stream = BlockedStream()
+        counted = []
+        writer = LogWriter(stream, max_entries=2, batch_max_lines=1, on_drop=lambda kind, count: counted.append(kind))
+        writer.emit({"n": 0})
+        stream.writing.wait(5)  # writer thread is now stuck in stdout
+        results = [writer.emit({"n": n}, kind="audit") for n in range(1, 6)]
+        stream.release.set()
+        writer.stop()
+
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertEqual(writer.dropped, {"audit": 3})
+        self.assertEqual(counted, ["audit"] * 3)
+        self.assertEqual(len(self.lines(stream)), 3)
+
+    def test_zero_queue_writes_inline(self):
+        stream = RecordingStream()
+        writer = LogWriter(stream, max_entries=0)
+        writer.emit({"n": 1})
+        self.assertEqual((self.lines(stream), stream.flushes), ([{"n": 1}], 1))
+        self.assertIsNone(writer._thread)
+
+
+class LoginLoggingTests(unittest.TestCase):
+    def test_login_queues_one_log_line_and_one_audit_event(self):
+        stream = RecordingStream()
+        writer = LogWriter(stream)
+        with mock.patch.object(reference_app, "log_writer", writer):
+            response = reference_app.app.test_client().post(
+                "/api/login", json={"username": "ada", "password": "invalid"}, headers={"X-Correlation-ID": "req-1"}
+            )
+        writer.stop()
+
+        log, audit = (json.loads(line) for line in stream.getvalue().splitlines())
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual((log["message"], log["correlation_id"]), ("Login failure", "req-1"))
+        self.assertEqual((audit["event_type"], audit["actor"]["id"]), ("authentication.login_failure", "ada"))
+        self.assertEqual(stream.flushes, 1)
+
+    def test_dropped_lines_are_exported(self):
+        reference_app.log_entries_dropped_total.labels(kind="audit").inc(0)
+        body = reference_app.app.test_client().get("/metrics").get_data(as_text=True)
+        self.assertIn('log_entries_dropped_total{kind="audit"}', body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+from pathlib import Path
+from unittest import mock
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+REFERENCE_APP_DIR = Path(__file__).resolve().parents[2] / "services" / "reference-app"
+sys.path.insert(0, str(REFERENCE_APP_DIR))
+
+from prometheus_client.parser import text_string_to_metric_families  # noqa: E402
+
+import multiprocess_metrics  # noqa: E402
+from multiprocess_metrics import prepare_directory, scrape, worker_exited  # noqa: E402
+
+# One "worker": imports the app with the multiprocess directory set, serves N logins and exits.
+WORKER = """
+import sys
+from app import app
+client = app.test_client()
+for _ in range(int(sys.argv[1])):
+    client.post("/api/login", json={"password": "demo-password"})
+client.get("/missing")
+print(__import__("os").getpid())
+"""
+
+
+def value(payload, sample_name, **labels):
+    for family in text_string_to_metric_families(payload.decode("utf-8")):
+        for sample in family.samples:
+            if sample.name == sample_name and all(sample.labels.get(k) == v for k, v in labels.items()):
+                return sample.value
+    return 0.0
+
+
+class MultiprocessMetricsTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "metrics")
+        prepare_directory(self.path)
+
+    def run_worker(self, logins):
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=self.path, LOG_QUEUE_MAX_ENTRIES="0")
+        result = subprocess.run(
+            [sys.executable, "-c", WORKER, str(logins)],
+            cwd=REFERENCE_APP_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return int(result.stdout.split()[-1])
+
+    def logins(self, payload):
+        return value(payload, "http_requests_total", endpoint="/api/login", method="POST", status="200")
+
+    def test_scrape_sums_workers_and_survives_their_exit(self):
+        pids = [self.run_worker(logins) for logins in (3, 5, 7)]
+        payload, content_type = scrape(self.path)
+
+        self.assertIn("text/plain", content_type)
+        self.assertEqual(self.logins(payload), 15)
+        self.assertEqual(value(payload, "http_requests_total", endpoint="unmatched", status="404"), 3)
+        self.assertEqual(
+            value(payload, "http_request_duration_seconds_count", endpoint="/api/login", method="POST"), 15
+        )
+        self.assertEqual(value(payload, "auth_login_attempts_total", result="success"), 15)
+
+        for pid in pids:
+            worker_exited(pid, self.path)
+        folded, _ = scrape(self.path)
+
+        self.assertEqual(self.logins(folded), 15)
+        self.assertEqual(value(folded, "http_request_duration_seconds_count", endpoint="/api/login"), 15)
+        self.assertEqual(
+            value(folded, "http_request_duration_seconds_bucket", endpoint="/api/login", le="+Inf"),
+            value(payload, "http_request_duration_seconds_bucket", endpoint="/api/login", le="+Inf"),
+        )
+        self.assertEqual(
+            sorted(os.path.basename(name) for name in glob.glob(os.path.join(self.path, "*.db"))),
+            ["counter_archive.db", "histogram_archive.db"],
+        )
+
+        self.run_worker(2)  # a replacement worker adds to the archived totals
+        self.assertEqual(self.logins(scrape(self.path)[0]), 17)
+
+    def test_other_prometheus_client_versions_keep_dead_files(self):
+        pid = self.run_worker(4)
+        with mock.patch.object(multiprocess_metrics, "FOLD_VERSION", "0.0.0"), self.assertLogs(
+            "multiprocess_metrics", "WARNING"
+        ):
+            worker_exited(pid, self.path)
+
+        self.assertEqual(self.logins(scrape(self.path)[0]), 4)
+        self.assertFalse(glob.glob(os.path.join(self.path, "*_archive.db")))
+        self.assertTrue(os.path.exists(os.path.join(self.path, f"counter_{pid}.db")))
+
+    def test_prepare_directory_resets_totals(self):
+        self.run_worker(1)
+        prepare_directory(self.path)
+        self.assertEqual(self.logins(scrape(self.path)[0]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
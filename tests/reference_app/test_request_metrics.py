@@ -0,0 +1,62 @@
+from pathlib import Path
+import sys
+import unittest
+
+
+REFERENCE_APP_DIR = Path(__file__).resolve().parents[2] / "services" / "reference-app"
+sys.path.insert(0, str(REFERENCE_APP_DIR))
+
+from flask import Flask, request  # noqa: E402
+from prometheus_client import REGISTRY, CollectorRegistry, Counter  # noqa: E402
+
+import app as reference_app  # noqa: E402
+from request_metrics import BoundedMetric, route_template  # noqa: E402
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class RequestMetricsTests(unittest.TestCase):
+    def test_requests_are_labelled_with_their_url_rule(self):
+        app = Flask(__name__)
+        app.add_url_rule("/api/items/<int:item_id>", "item", lambda item_id: "")
+
+        with app.test_request_context("/api/items/42"):
+            self.assertEqual(route_template(request), "/api/items/<int:item_id>")
+        with app.test_request_context("/wp-login.php"):
+            self.assertEqual(route_template(request), "unmatched")
+
+    def test_scans_fold_into_one_unmatched_series(self):
+        client = reference_app.app.test_client()
+        before = sample("http_requests_total", endpoint="unmatched", method="GET", status="404")
+        folded = sample("metrics_label_sets_folded_total", metric="http_requests_total", reason="unmatched")
+        series = reference_app.http_requests_total.series_count()
+
+        for index in range(25):
+            self.assertEqual(client.get(f"/scan/{index}/.env").status_code, 404)
+        client.open("/health", method="PROPFIND")
+        client.post("/api/login", json={"password": "invalid"})
+
+        self.assertEqual(sample("http_requests_total", endpoint="unmatched", method="GET", status="404"), before + 25)
+        self.assertEqual(
+            sample("metrics_label_sets_folded_total", metric="http_requests_total", reason="unmatched"), folded + 26
+        )
+        self.assertEqual(sample("http_requests_total", endpoint="unmatched", method="OTHER", status="405"), 1)
+        self.assertGreaterEqual(sample("http_requests_total", endpoint="/api/login", method="POST", status="401"), 1)
+        self.assertLessEqual(reference_app.http_requests_total.series_count(), series + 3)
+
+    def test_series_beyond_the_cap_are_folded(self):
+        registry = CollectorRegistry()
+        metric = BoundedMetric(Counter, "capped_total", "Capped", ["endpoint"], max_series=2, registry=registry)
+        for endpoint in ("/a", "/b", "/c", "/d", "/a"):
+            metric.labels(endpoint=endpoint).inc()
+
+        self.assertEqual(metric.series_count(), 2)
+        self.assertEqual(registry.get_sample_value("capped_total", {"endpoint": "/a"}), 2)
+        self.assertEqual(registry.get_sample_value("capped_total", {"endpoint": "other"}), 2)
+        self.assertEqual(sample("metrics_label_sets_folded_total", metric="capped_total", reason="series_limit"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()